@@ -0,0 +1,199 @@
+"""
+Boots the ASGI app with uvicorn against the AbstractAPI simulator of
+`st_auth.abstractapi_simulator`, drives a mixed workload against it and prints, or writes,
+a JSON report of the RPS and latency percentiles per endpoint:
+
+    python -m benchmarks --duration 30 --concurrency 20 --output head.json
+
+The app uses the database, Redis and broker configured by the environment, like
+`manage.py runserver` does. Run it against a database you can fill with benchmark users.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+from .workload import DEFAULT_MIX, Workload
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _serve(command: list[str], port: int, env: dict | None = None):
+    process = subprocess.Popen(
+        [sys.executable, *command, "--port", str(port)], cwd=ROOT_DIR, env=env
+    )
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url)
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def _app_env(simulator_url: str) -> dict:
+    env = {
+        **os.environ,
+        "ABSTRACT_API_EMAIL_URL": f"{simulator_url}/email/",
+        "ABSTRACT_API_GEOLOCATION_URL": f"{simulator_url}/geolocation/",
+        "ABSTRACT_API_HOLIDAY_URL": f"{simulator_url}/holiday/",
+        "ABSTRACT_API_EMAIL_KEY": "benchmark",
+        "ABSTRACT_API_GEOLOCATION_KEY": "benchmark",
+        "ABSTRACT_API_HOLIDAY_KEY": "benchmark",
+    }
+    # The rate limits of the real api would measure the limiter, unless asked for.
+    for api in ("EMAIL", "GEOLOCATION", "HOLIDAY"):
+        env.setdefault(f"ABSTRACT_API_{api}_RATE_LIMIT", "0")
+    return env
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_mix(mix: str) -> dict[str, int]:
+    """Parses `endpoint=weight` pairs separated by commas."""
+    weights = dict(DEFAULT_MIX)
+    for pair in filter(None, mix.split(",")):
+        endpoint, weight = pair.split("=")
+        if endpoint not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {endpoint}")
+        weights[endpoint] = int(weight)
+    return {endpoint: weight for endpoint, weight in weights.items() if weight > 0}
+
+
+async def _benchmark(base_url: str, args: argparse.Namespace) -> dict:
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        workload = Workload(client, args.mix)
+        await workload.setup(args.users, args.posts_per_user)
+        if args.warmup:
+            await workload.run(args.concurrency, args.warmup)
+
+        recorder, duration = await workload.run(args.concurrency, args.duration)
+
+    return recorder.report(duration)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--posts-per-user", type=int, default=5)
+    parser.add_argument(
+        "--mix",
+        type=_parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="endpoint=weight pairs, like signup=0,post_list=80",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=30, help="request timeout")
+    parser.add_argument(
+        "--simulator-latency", type=float, default=0.05, help="median seconds"
+    )
+    parser.add_argument("--simulator-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--simulator-rate-limit-rate", type=float, default=0)
+    parser.add_argument("--simulator-error-rate", type=float, default=0)
+    parser.add_argument("--simulator-timeout-rate", type=float, default=0)
+    parser.add_argument("--output", type=Path, help="JSON report, default stdout")
+    args = parser.parse_args(argv)
+
+    simulator_command = [
+        "manage.py",
+        "run_abstractapi_simulator",
+        "--latency",
+        str(args.simulator_latency),
+        "--latency-sigma",
+        str(args.simulator_latency_sigma),
+        "--rate-limit-rate",
+        str(args.simulator_rate_limit_rate),
+        "--error-rate",
+        str(args.simulator_error_rate),
+        "--timeout-rate",
+        str(args.simulator_timeout_rate),
+    ]
+    app_command = [
+        "-m",
+        "uvicorn",
+        "social_text.asgi:application",
+        "--workers",
+        str(args.workers),
+        "--no-access-log",
+        "--log-level",
+        "warning",
+    ]
+    with _serve(simulator_command, _free_port()) as simulator_url, _serve(
+        app_command, _free_port(), _app_env(simulator_url)
+    ) as app_url:
+        _wait_until_up(simulator_url)
+        _wait_until_up(app_url)
+        report = asyncio.run(_benchmark(app_url, args))
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "posts_per_user": args.posts_per_user,
+            "mix": args.mix,
+            "workers": args.workers,
+            "simulator_latency": args.simulator_latency,
+            "simulator_latency_sigma": args.simulator_latency_sigma,
+            "simulator_rate_limit_rate": args.simulator_rate_limit_rate,
+            "simulator_error_rate": args.simulator_error_rate,
+            "simulator_timeout_rate": args.simulator_timeout_rate,
+        },
+        **report,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compares two benchmark reports per endpoint:
+
+    python -m benchmarks.compare base.json head.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+METRICS = (
+    ("rps", lambda report: report["rps"]),
+    ("p50", lambda report: report["latency_ms"]["p50"]),
+    ("p95", lambda report: report["latency_ms"]["p95"]),
+    ("p99", lambda report: report["latency_ms"]["p99"]),
+    ("errors", lambda report: report["errors"]),
+)
+
+
+def _change(base, head) -> str:
+    if base is None or head is None:
+        return "n/a"
+    if base == 0:
+        return f"{head}"
+    return f"{head} ({(head - base) / base:+.1%})"
+
+
+def compare(base: dict, head: dict) -> list[str]:
+    lines = [f"{'endpoint':<12}" + "".join(f"{name:>22}" for name, _ in METRICS)]
+    endpoints = sorted(set(base["endpoints"]) | set(head["endpoints"]))
+    for endpoint in [*endpoints, "total"]:
+        base_report = base["endpoints"].get(endpoint) or base.get(endpoint)
+        head_report = head["endpoints"].get(endpoint) or head.get(endpoint)
+        if not base_report or not head_report:
+            lines.append(f"{endpoint:<12} only in one report")
+            continue
+
+        lines.append(
+            f"{endpoint:<12}"
+            + "".join(
+                f"{_change(metric(base_report), metric(head_report)):>22}"
+                for _, metric in METRICS
+            )
+        )
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    args = parser.parse_args(argv)
+
+    base = json.loads(args.base.read_text())
+    head = json.loads(args.head.read_text())
+    print("\n".join(compare(base, head)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency and throughput statistics of a benchmark run, reported as JSON so runs of two
+commits can be compared with `python -m benchmarks.compare`.
+"""
+import statistics
+from collections import Counter, defaultdict
+
+
+class Recorder:
+    """Collects the latency and the status of every request, per endpoint."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, seconds: float, status: int | str) -> None:
+        self.latencies[endpoint].append(seconds * 1000)
+        self.statuses[endpoint][str(status)] += 1
+
+    def report(self, duration: float) -> dict:
+        endpoints = {
+            endpoint: _endpoint_report(
+                self.latencies[endpoint], self.statuses[endpoint], duration
+            )
+            for endpoint in sorted(self.latencies)
+        }
+        total = _endpoint_report(
+            [latency for latencies in self.latencies.values() for latency in latencies],
+            sum(self.statuses.values(), Counter()),
+            duration,
+        )
+        return {"endpoints": endpoints, "total": total}
+
+
+def percentiles(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+
+    if len(latencies) == 1:
+        cut_points = latencies * 99
+    else:
+        cut_points = statistics.quantiles(latencies, n=100, method="inclusive")
+
+    return {
+        "p50": round(cut_points[49], 2),
+        "p95": round(cut_points[94], 2),
+        "p99": round(cut_points[98], 2),
+        "mean": round(statistics.fmean(latencies), 2),
+        "max": round(max(latencies), 2),
+    }
+
+
+def _endpoint_report(latencies: list[float], statuses: Counter, duration: float):
+    errors = sum(
+        count
+        for status, count in statuses.items()
+        if not status.isdigit() or int(status) >= 400
+    )
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": percentiles(latencies),
+        "status_codes": dict(sorted(statuses.items())),
+    }
@@ -0,0 +1,57 @@
+import pytest
+
+from ..compare import compare
+from ..report import Recorder, percentiles
+
+
+class TestPercentiles:
+    def test_percentiles(self):
+        result = percentiles([float(latency) for latency in range(1, 101)])
+
+        assert result == {
+            "p50": 50.5,
+            "p95": 95.05,
+            "p99": 99.01,
+            "mean": 50.5,
+            "max": 100.0,
+        }
+
+    def test_single_latency(self):
+        assert percentiles([12.0])["p99"] == 12.0
+
+    def test_no_latencies(self):
+        assert percentiles([])["p50"] is None
+
+
+class TestRecorder:
+    @pytest.fixture
+    def report(self):
+        recorder = Recorder()
+        recorder.record("login", 0.1, 200)
+        recorder.record("login", 0.3, 400)
+        recorder.record("signup", 0.2, "ConnectTimeout")
+        return recorder.report(duration=2)
+
+    def test_endpoints_are_reported(self, report):
+        assert report["endpoints"]["login"]["requests"] == 2
+        assert report["endpoints"]["login"]["errors"] == 1
+        assert report["endpoints"]["login"]["rps"] == 1.0
+        assert report["endpoints"]["login"]["latency_ms"]["p50"] == 200.0
+        assert report["endpoints"]["login"]["status_codes"] == {"200": 1, "400": 1}
+        assert report["endpoints"]["signup"]["errors"] == 1
+
+    def test_total_is_reported(self, report):
+        assert report["total"]["requests"] == 3
+        assert report["total"]["errors"] == 2
+        assert report["total"]["rps"] == 1.5
+
+    def test_reports_are_compared(self, report):
+        lines = compare(report, report)
+
+        assert [line.split()[0] for line in lines] == [
+            "endpoint",
+            "login",
+            "signup",
+            "total",
+        ]
+        assert "1.0 (+0.0%)" in lines[1]
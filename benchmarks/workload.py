@@ -0,0 +1,161 @@
+"""
+Mixed workload of signups, logins, post lists, post creations and likes, driven by
+concurrent virtual users against a running app.
+"""
+import asyncio
+import ipaddress
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import httpx
+
+from .report import Recorder
+
+# Relative weights of the endpoints in the mix.
+DEFAULT_MIX = {
+    "signup": 5,
+    "login": 15,
+    "post_list": 50,
+    "post_create": 15,
+    "like_create": 15,
+}
+
+PASSWORD = "benchmark-password"
+
+
+class SetupError(Exception):
+    pass
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    access: str = ""
+    liked_post_ids: set[int] = field(default_factory=set)
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.access}"}
+
+
+def _random_ip() -> str:
+    # Global unicast addresses, which the simulator geolocates like AbstractAPI does.
+    while True:
+        ip_address = ipaddress.IPv4Address(random.getrandbits(32))
+        if ip_address.is_global and not ip_address.is_multicast:
+            return str(ip_address)
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, mix: dict[str, int]):
+        self.client = client
+        self.mix = mix
+        self.run_id = uuid.uuid4().hex[:8]
+        self.users: list[VirtualUser] = []
+        self.post_ids: list[int] = []
+        self._signups = 0
+
+    def _new_email(self) -> str:
+        self._signups += 1
+        return f"bench-{self.run_id}-{self._signups}@example.com"
+
+    async def _signup(self, email: str) -> httpx.Response:
+        return await self.client.post(
+            "/api/v1/auth/signup",
+            json={"email": email, "password": PASSWORD},
+            headers={"X-Forwarded-For": _random_ip()},
+        )
+
+    async def _login(self, user: VirtualUser) -> httpx.Response:
+        response = await self.client.post(
+            "/api/v1/auth/login", json={"email": user.email, "password": PASSWORD}
+        )
+        if response.status_code == 200:
+            user.access = response.json()["tokens"]["access"]
+        return response
+
+    async def _create_post(self, user: VirtualUser) -> httpx.Response:
+        response = await self.client.post(
+            "/api/v1/post/",
+            json={"text": f"Benchmark post {uuid.uuid4().hex}"},
+            headers=user.headers,
+        )
+        if response.status_code == 201:
+            self.post_ids.append(response.json()["id"])
+        return response
+
+    async def setup(self, user_count: int, posts_per_user: int) -> None:
+        """Signs up and logs in the virtual users, who create the first posts."""
+        for _ in range(user_count):
+            user = VirtualUser(self._new_email())
+            response = await self._signup(user.email)
+            if response.status_code not in (200, 202):
+                raise SetupError(
+                    f"Signup failed with {response.status_code}: {response.text}"
+                )
+
+            response = await self._login(user)
+            if response.status_code != 200:
+                raise SetupError(
+                    f"Login failed with {response.status_code}: {response.text}, "
+                    f"email validation must not be pending."
+                )
+            self.users.append(user)
+
+            for _ in range(posts_per_user):
+                await self._create_post(user)
+
+    async def _call(self, endpoint: str) -> httpx.Response | None:
+        user = random.choice(self.users)
+
+        if endpoint == "signup":
+            return await self._signup(self._new_email())
+
+        if endpoint == "login":
+            return await self._login(user)
+
+        if endpoint == "post_list":
+            return await self.client.get("/api/v1/post/", headers=user.headers)
+
+        if endpoint == "post_create":
+            return await self._create_post(user)
+
+        if endpoint == "like_create":
+            post_id = random.choice(self.post_ids) if self.post_ids else None
+            if post_id is None or post_id in user.liked_post_ids:
+                # Liking twice is rejected, the call is skipped.
+                return None
+            user.liked_post_ids.add(post_id)
+            return await self.client.post(
+                "/api/v1/like/", json={"post": post_id}, headers=user.headers
+            )
+
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+    async def _virtual_user(self, recorder: Recorder, deadline: float) -> None:
+        endpoints, weights = zip(*self.mix.items())
+        while time.monotonic() < deadline:
+            endpoint = random.choices(endpoints, weights)[0]
+            start = time.monotonic()
+            try:
+                response = await self._call(endpoint)
+                if response is None:
+                    continue
+                status = response.status_code
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            recorder.record(endpoint, time.monotonic() - start, status)
+
+    async def run(self, concurrency: int, duration: float) -> tuple[Recorder, float]:
+        """Returns the recorded requests and the seconds they took."""
+        recorder = Recorder()
+        start = time.monotonic()
+        await asyncio.gather(
+            *(
+                self._virtual_user(recorder, start + duration)
+                for _ in range(concurrency)
+            )
+        )
+        return recorder, time.monotonic() - start
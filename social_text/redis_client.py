@@ -0,0 +1,13 @@
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> redis.Redis:
+    """
+    Process wide Redis client. The underlying connection pool is fork safe, so it can be
+    shared by gunicorn and Celery worker processes.
+    """
+    return redis.Redis.from_url(settings.REDIS_URL)
@@ -96,6 +96,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache"
+        ),
+        "LOCATION": REDIS_URL,
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -114,6 +129,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Passwords are hashed in a process pool, see `st_auth.password_pool`. `scrypt` hashes new
+# passwords with scrypt, existing PBKDF2 hashes are rehashed when their users log in.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [
+    "st_auth.hashers.PooledPBKDF2PasswordHasher",
+    "st_auth.hashers.PooledScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+if PASSWORD_HASHER == "scrypt":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+# 0 hashes in the request threads. Each web and Celery worker process has its own pool.
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 2))
+# Hashes waiting for a pool worker, further ones are rejected with a 503.
+PASSWORD_HASHING_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASHING_QUEUE_SIZE", 16))
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -147,16 +179,78 @@ CELERY_MAX_RETRIES = int(os.environ.get("CELERY_MAX_RETRIES", 5))
 CELERY_DELAY_BETWEEN_RETRIES = int(os.environ.get("CELERY_DELAY_BETWEEN_RETRIES", 5))
 CELERY_RETRY_BACKOFF = os.environ.get("CELERY_RETRY_BACKOFF", "true") == "true"
 
+# In batch mode signups queue their geolocation in Redis. The queue is drained every
+# `GEOLOCATION_BATCH_INTERVAL` seconds and whenever `GEOLOCATION_BATCH_SIZE` signups
+# are waiting.
+GEOLOCATION_BATCH_MODE = os.environ.get("GEOLOCATION_BATCH_MODE", "false") == "true"
+GEOLOCATION_BATCH_SIZE = int(os.environ.get("GEOLOCATION_BATCH_SIZE", 100))
+GEOLOCATION_BATCH_INTERVAL = int(os.environ.get("GEOLOCATION_BATCH_INTERVAL", 10))
+GEOLOCATION_BATCH_CONCURRENCY = int(os.environ.get("GEOLOCATION_BATCH_CONCURRENCY", 8))
+GEOLOCATION_BATCH_MAX_ATTEMPTS = int(
+    os.environ.get("GEOLOCATION_BATCH_MAX_ATTEMPTS", 5)
+)
+# A single run drains the queue at a time. Every chunk renews the lock and has to end,
+# rate limit waits included, within half of its timeout:
+GEOLOCATION_BATCH_LOCK_TIMEOUT = int(
+    os.environ.get("GEOLOCATION_BATCH_LOCK_TIMEOUT", 300)
+)
+
+CELERY_BEAT_SCHEDULE = {
+    "process-geolocation-batch": {
+        "task": "st_auth.tasks.process_geolocation_batch",
+        "schedule": GEOLOCATION_BATCH_INTERVAL,
+    },
+}
+
+# Authenticates requests from the JWT claims without a user query, see
+# `st_auth.authentication.StatelessJWTAuthentication`.
+JWT_STATELESS_AUTHENTICATION = (
+    os.environ.get("JWT_STATELESS_AUTHENTICATION", "false") == "true"
+)
+# Above 0, stateless authentication keeps full users in a process local LRU for this many
+# seconds instead of hydrating them from the claims.
+JWT_USER_CACHE_TIMEOUT = int(os.environ.get("JWT_USER_CACHE_TIMEOUT", 0))
+JWT_USER_CACHE_SIZE = int(os.environ.get("JWT_USER_CACHE_SIZE", 1024))
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "st_auth.authentication.StatelessJWTAuthentication"
+        if JWT_STATELESS_AUTHENTICATION
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
 }
 
+# Tokens are checked against `st_auth.token_revocation.revocation_list`.
+SIMPLE_JWT = {
+    "AUTH_TOKEN_CLASSES": ("st_auth.jwt_helper.RevocableAccessToken",),
+    "TOKEN_REFRESH_SERIALIZER": "st_auth.jwt_helper.RevocableTokenRefreshSerializer",
+}
+# Seconds between the syncs of the revoked tokens, tokens revoked by other processes are
+# accepted until then.
+TOKEN_REVOCATION_SYNC_INTERVAL = int(
+    os.environ.get("TOKEN_REVOCATION_SYNC_INTERVAL", 5)
+)
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(
+    os.environ.get("TOKEN_REVOCATION_BLOOM_CAPACITY", 10000)
+)
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = float(
+    os.environ.get("TOKEN_REVOCATION_BLOOM_ERROR_RATE", 0.001)
+)
+
+TIMELINE_MAX_LENGTH = int(os.environ.get("TIMELINE_MAX_LENGTH", 800))
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(
+    os.environ.get("TIMELINE_FANOUT_MAX_FOLLOWERS", 10000)
+)
+TIMELINE_FANOUT_BATCH_SIZE = int(os.environ.get("TIMELINE_FANOUT_BATCH_SIZE", 1000))
+
+POST_LIST_CACHE_TIMEOUT = int(os.environ.get("POST_LIST_CACHE_TIMEOUT", 60))
+POST_BULK_CREATE_MAX_SIZE = int(os.environ.get("POST_BULK_CREATE_MAX_SIZE", 1000))
+POST_LIKE_BULK_MAX_SIZE = int(os.environ.get("POST_LIKE_BULK_MAX_SIZE", 500))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "SocialText API Specification",
     "DESCRIPTION": "SocialText is a text based social media app.",
@@ -164,17 +258,86 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
 }
 
+# Routes the async versions of the signup and login views, which do not hold a thread
+# per request while waiting on AbstractAPI or password hashing under ASGI.
+AUTH_ASYNC_VIEWS = os.environ.get("AUTH_ASYNC_VIEWS", "false") == "true"
+
+# `sync` validates emails during signup, `async` creates the user inactive and validates
+# the email in the `validate_user_email` task.
+EMAIL_VALIDATION_MODE = os.getenv("EMAIL_VALIDATION_MODE", "sync")
+
+# Shared by the email, geolocation and holiday apis, each has its own circuit.
+ABSTRACT_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv("ABSTRACT_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5)
+)
+ABSTRACT_API_CIRCUIT_BREAKER_FAILURE_WINDOW = int(
+    os.getenv("ABSTRACT_API_CIRCUIT_BREAKER_FAILURE_WINDOW", 30)
+)
+ABSTRACT_API_CIRCUIT_BREAKER_OPEN_TIMEOUT = int(
+    os.getenv("ABSTRACT_API_CIRCUIT_BREAKER_OPEN_TIMEOUT", 30)
+)
+
+# Per second quotas of the AbstractAPI plan, each api has its own token bucket. Bursts
+# of up to `*_RATE_LIMIT_BURST` calls are allowed. The default rate of 0 disables the
+# limit, set the quotas of your plan to enable it.
+ABSTRACT_API_EMAIL_RATE_LIMIT = float(os.getenv("ABSTRACT_API_EMAIL_RATE_LIMIT", 0))
+ABSTRACT_API_EMAIL_RATE_LIMIT_BURST = int(
+    os.getenv("ABSTRACT_API_EMAIL_RATE_LIMIT_BURST", 1)
+)
+# Signup requests wait this many seconds at most for an email api token.
+ABSTRACT_API_EMAIL_RATE_LIMIT_MAX_WAIT = float(
+    os.getenv("ABSTRACT_API_EMAIL_RATE_LIMIT_MAX_WAIT", 2)
+)
+ABSTRACT_API_GEOLOCATION_RATE_LIMIT = float(
+    os.getenv("ABSTRACT_API_GEOLOCATION_RATE_LIMIT", 0)
+)
+ABSTRACT_API_GEOLOCATION_RATE_LIMIT_BURST = int(
+    os.getenv("ABSTRACT_API_GEOLOCATION_RATE_LIMIT_BURST", 1)
+)
+ABSTRACT_API_HOLIDAY_RATE_LIMIT = float(os.getenv("ABSTRACT_API_HOLIDAY_RATE_LIMIT", 0))
+ABSTRACT_API_HOLIDAY_RATE_LIMIT_BURST = int(
+    os.getenv("ABSTRACT_API_HOLIDAY_RATE_LIMIT_BURST", 1)
+)
+
 ABSTRACT_API_EMAIL_URL = os.getenv(
     "ABSTRACT_API_EMAIL_URL", "https://emailvalidation.abstractapi.com/v1/"
 )
 ABSTRACT_API_EMAIL_KEY = os.getenv("ABSTRACT_API_EMAIL_KEY", "")
+ABSTRACT_API_EMAIL_CACHE_TIMEOUT = int(
+    os.getenv("ABSTRACT_API_EMAIL_CACHE_TIMEOUT", 7 * 24 * 60 * 60)
+)
+ABSTRACT_API_EMAIL_NEGATIVE_CACHE_TIMEOUT = int(
+    os.getenv("ABSTRACT_API_EMAIL_NEGATIVE_CACHE_TIMEOUT", 60 * 60)
+)
+# The email api is called during signup requests: short timeouts and a single retry.
+ABSTRACT_API_EMAIL_CONNECT_TIMEOUT = float(
+    os.getenv("ABSTRACT_API_EMAIL_CONNECT_TIMEOUT", 3.05)
+)
+ABSTRACT_API_EMAIL_READ_TIMEOUT = float(os.getenv("ABSTRACT_API_EMAIL_READ_TIMEOUT", 5))
+ABSTRACT_API_EMAIL_RETRIES = int(os.getenv("ABSTRACT_API_EMAIL_RETRIES", 1))
 
 ABSTRACT_API_GEOLOCATION_URL = os.getenv(
     "ABSTRACT_API_GEOLOCATION_URL", "https://ipgeolocation.abstractapi.com/v1/"
 )
 ABSTRACT_API_GEOLOCATION_KEY = os.getenv("ABSTRACT_API_GEOLOCATION_KEY", "")
+ABSTRACT_API_GEOLOCATION_CONNECT_TIMEOUT = float(
+    os.getenv("ABSTRACT_API_GEOLOCATION_CONNECT_TIMEOUT", 3.05)
+)
+ABSTRACT_API_GEOLOCATION_READ_TIMEOUT = float(
+    os.getenv("ABSTRACT_API_GEOLOCATION_READ_TIMEOUT", 10)
+)
+ABSTRACT_API_GEOLOCATION_RETRIES = int(os.getenv("ABSTRACT_API_GEOLOCATION_RETRIES", 2))
+# Geolocations are cached per /24 IPv4 and /48 IPv6 network.
+GEOLOCATION_CACHE_TIMEOUT = int(os.getenv("GEOLOCATION_CACHE_TIMEOUT", 24 * 60 * 60))
 
 ABSTRACT_API_HOLIDAY_URL = os.getenv(
     "ABSTRACT_API_HOLIDAY_URL", "https://holidays.abstractapi.com/v1/"
 )
 ABSTRACT_API_HOLIDAY_KEY = os.getenv("ABSTRACT_API_HOLIDAY_KEY", "")
+ABSTRACT_API_HOLIDAY_CONNECT_TIMEOUT = float(
+    os.getenv("ABSTRACT_API_HOLIDAY_CONNECT_TIMEOUT", 3.05)
+)
+ABSTRACT_API_HOLIDAY_READ_TIMEOUT = float(
+    os.getenv("ABSTRACT_API_HOLIDAY_READ_TIMEOUT", 10)
+)
+ABSTRACT_API_HOLIDAY_RETRIES = int(os.getenv("ABSTRACT_API_HOLIDAY_RETRIES", 2))
@@ -1,9 +1,293 @@
-import datetime
+import asyncio
+import os
+import time
+from http import HTTPStatus
+from logging import getLogger
 
+import httpx
+import redis
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
 from requests import Response
+from requests.adapters import HTTPAdapter
 from rest_framework import serializers, status
+from urllib3.util.retry import Retry
+
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import RateLimitExceeded, TokenBucket
+
+logger = getLogger(__name__)
+
+EMAIL_VALIDATION_KEY = "st_auth:email_validation:{email}"
+
+
+class AbstractAPIClient:
+    """
+    Client of one AbstractAPI endpoint. Keeps a per process `requests.Session`, so
+    connections are pooled and kept alive between calls, and bounds every call with
+    connect / read timeouts and a urllib3 retry policy.
+
+    Calls pass the circuit breaker first, then take a token of `rate_limiter`. Without a
+    token the client waits for up to `rate_limit_max_wait` seconds, then raises
+    `RateLimitExceeded`.
+
+    `aget` is the async version of `get` for async views. It uses a per event loop
+    `httpx.AsyncClient` with the same timeouts and retries.
+    """
+
+    # 429 is not retried: every attempt would spend quota on a single token, the callers
+    # back off instead.
+    RETRY_STATUS_CODES = (
+        HTTPStatus.BAD_GATEWAY.value,
+        HTTPStatus.SERVICE_UNAVAILABLE.value,
+        HTTPStatus.GATEWAY_TIMEOUT.value,
+    )
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        connect_timeout: float,
+        read_timeout: float,
+        retries: int,
+        backoff_factor: float = 0.2,
+        pool_maxsize: int = 10,
+        circuit_breaker: CircuitBreaker | None = None,
+        rate_limiter: TokenBucket | None = None,
+        rate_limit_max_wait: float = 0,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.rate_limit_max_wait = rate_limit_max_wait
+        self._session = None
+        self._session_pid = None
+        self._async_client = None
+        self._async_client_loop = None
+
+    @property
+    def session(self) -> requests.Session:
+        # Pooled connections must not be shared with processes forked after their creation,
+        # e.g. Celery prefork workers.
+        if self._session is None or self._session_pid != os.getpid():
+            self._session = self._create_session()
+            self._session_pid = os.getpid()
+
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.RETRY_STATUS_CODES,
+            allowed_methods=["GET"],
+            # Callers handle the status code of the last response themselves.
+            raise_on_status=False,
+            # Long waits are left to the Celery retries of the callers.
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # Async clients are bound to the event loop they were first used in.
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = self._create_async_client()
+            self._async_client_loop = loop
+
+        return self._async_client
+
+    def _create_async_client(self) -> httpx.AsyncClient:
+        connect_timeout, read_timeout = self.timeout
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=self.pool_maxsize),
+        )
+
+    def get(self, **params) -> Response:
+        """
+        Raises `CircuitOpenError` without calling the api while its circuit is open and
+        `RateLimitExceeded` when it runs out of tokens.
+        """
+        if not self.circuit_breaker:
+            self._take_token()
+            return self._get(**params)
+
+        # An open circuit must not spend the tokens of the calls which can go through.
+        probe = self.circuit_breaker.before_call()
+        try:
+            self._take_token()
+        except RateLimitExceeded:
+            self.circuit_breaker.release_probe(probe)
+            raise
+
+        try:
+            response = self._get(**params)
+        except requests.RequestException:
+            self.circuit_breaker.record_failure(probe)
+            raise
+
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR.value:
+            self.circuit_breaker.record_failure(probe)
+        else:
+            self.circuit_breaker.record_success(probe)
+
+        return response
+
+    def _take_token(self) -> None:
+        if not self.rate_limiter:
+            return
+
+        deadline = time.monotonic() + self.rate_limit_max_wait
+        while True:
+            try:
+                self.rate_limiter.acquire()
+                return
+            except RateLimitExceeded as exc:
+                if time.monotonic() + exc.retry_after > deadline:
+                    raise
+
+                time.sleep(exc.retry_after)
+
+    def _get(self, **params) -> Response:
+        return self.session.get(
+            self.url, params={"api_key": self.api_key, **params}, timeout=self.timeout
+        )
+
+    async def aget(self, **params) -> httpx.Response:
+        """Async `get`, raises `httpx.HTTPError` instead of `requests` exceptions."""
+        if not self.circuit_breaker:
+            await self._atake_token()
+            return await self._aget(**params)
+
+        probe = await sync_to_async(self.circuit_breaker.before_call)()
+        try:
+            await self._atake_token()
+        except RateLimitExceeded:
+            await sync_to_async(self.circuit_breaker.release_probe)(probe)
+            raise
+
+        try:
+            response = await self._aget(**params)
+        except httpx.HTTPError:
+            await sync_to_async(self.circuit_breaker.record_failure)(probe)
+            raise
+
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR.value:
+            await sync_to_async(self.circuit_breaker.record_failure)(probe)
+        else:
+            await sync_to_async(self.circuit_breaker.record_success)(probe)
+
+        return response
+
+    async def _atake_token(self) -> None:
+        if not self.rate_limiter:
+            return
+
+        deadline = time.monotonic() + self.rate_limit_max_wait
+        while True:
+            try:
+                await sync_to_async(self.rate_limiter.acquire)()
+                return
+            except RateLimitExceeded as exc:
+                if time.monotonic() + exc.retry_after > deadline:
+                    raise
+
+                await asyncio.sleep(exc.retry_after)
+
+    async def _aget(self, **params) -> httpx.Response:
+        # Same policy as the urllib3 `Retry` of the session.
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+
+            try:
+                response = await self.async_client.get(
+                    self.url, params={"api_key": self.api_key, **params}
+                )
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+                continue
+
+            if response.status_code not in self.RETRY_STATUS_CODES:
+                break
+
+        return response
+
+
+def _circuit_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        f"abstractapi_{name}",
+        failure_threshold=settings.ABSTRACT_API_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        failure_window=settings.ABSTRACT_API_CIRCUIT_BREAKER_FAILURE_WINDOW,
+        open_timeout=settings.ABSTRACT_API_CIRCUIT_BREAKER_OPEN_TIMEOUT,
+    )
+
+
+def _rate_limiter(name: str, rate: float, capacity: int) -> TokenBucket | None:
+    # A rate of 0 disables the rate limit, e.g. for plans without a per second quota.
+    if rate <= 0:
+        return None
+
+    return TokenBucket(f"abstractapi_{name}", rate=rate, capacity=capacity)
+
+
+email_client = AbstractAPIClient(
+    settings.ABSTRACT_API_EMAIL_URL,
+    settings.ABSTRACT_API_EMAIL_KEY,
+    connect_timeout=settings.ABSTRACT_API_EMAIL_CONNECT_TIMEOUT,
+    read_timeout=settings.ABSTRACT_API_EMAIL_READ_TIMEOUT,
+    retries=settings.ABSTRACT_API_EMAIL_RETRIES,
+    circuit_breaker=_circuit_breaker("email"),
+    rate_limiter=_rate_limiter(
+        "email",
+        rate=settings.ABSTRACT_API_EMAIL_RATE_LIMIT,
+        capacity=settings.ABSTRACT_API_EMAIL_RATE_LIMIT_BURST,
+    ),
+    rate_limit_max_wait=settings.ABSTRACT_API_EMAIL_RATE_LIMIT_MAX_WAIT,
+)
+
+geolocation_client = AbstractAPIClient(
+    settings.ABSTRACT_API_GEOLOCATION_URL,
+    settings.ABSTRACT_API_GEOLOCATION_KEY,
+    connect_timeout=settings.ABSTRACT_API_GEOLOCATION_CONNECT_TIMEOUT,
+    read_timeout=settings.ABSTRACT_API_GEOLOCATION_READ_TIMEOUT,
+    retries=settings.ABSTRACT_API_GEOLOCATION_RETRIES,
+    circuit_breaker=_circuit_breaker("geolocation"),
+    rate_limiter=_rate_limiter(
+        "geolocation",
+        rate=settings.ABSTRACT_API_GEOLOCATION_RATE_LIMIT,
+        capacity=settings.ABSTRACT_API_GEOLOCATION_RATE_LIMIT_BURST,
+    ),
+)
+
+holiday_client = AbstractAPIClient(
+    settings.ABSTRACT_API_HOLIDAY_URL,
+    settings.ABSTRACT_API_HOLIDAY_KEY,
+    connect_timeout=settings.ABSTRACT_API_HOLIDAY_CONNECT_TIMEOUT,
+    read_timeout=settings.ABSTRACT_API_HOLIDAY_READ_TIMEOUT,
+    retries=settings.ABSTRACT_API_HOLIDAY_RETRIES,
+    circuit_breaker=_circuit_breaker("holiday"),
+    rate_limiter=_rate_limiter(
+        "holiday",
+        rate=settings.ABSTRACT_API_HOLIDAY_RATE_LIMIT,
+        capacity=settings.ABSTRACT_API_HOLIDAY_RATE_LIMIT_BURST,
+    ),
+)
 
 
 def _analyze_email_response(response_data: dict) -> dict:
@@ -22,19 +306,47 @@ def _analyze_email_response(response_data: dict) -> dict:
     return {"validation_error": "unusable_email"}
 
 
-def validate_email(email: str) -> dict:
+def _email_validation_key(email: str) -> str:
+    return EMAIL_VALIDATION_KEY.format(email=email.strip().lower())
+
+
+def _get_cached_email_validation(email: str) -> dict | None:
     try:
-        response = requests.get(
-            f"{settings.ABSTRACT_API_EMAIL_URL}?api_key={settings.ABSTRACT_API_EMAIL_KEY}&email={email}"
-        )
-    except Exception as e:
-        raise serializers.ValidationError(
-            {
-                "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` failed: {str(e)}"
-            },
-            status.HTTP_502_BAD_GATEWAY,
-        )
+        result = cache.get(_email_validation_key(email))
+    except redis.RedisError as e:
+        logger.warning(f"Reading the cached validation of {email} failed: {e}")
+        return None
+
+    # The gateway echoes the address it was given, keep the caller's spelling.
+    if result and "success" in result:
+        return {"success": email}
+
+    return result
+
+
+def _cache_email_validation(email: str, result: dict) -> None:
+    timeout = (
+        settings.ABSTRACT_API_EMAIL_CACHE_TIMEOUT
+        if "success" in result
+        else settings.ABSTRACT_API_EMAIL_NEGATIVE_CACHE_TIMEOUT
+    )
 
+    try:
+        cache.set(_email_validation_key(email), result, timeout=timeout)
+    except redis.RedisError as e:
+        logger.warning(f"Caching the validation of {email} failed: {e}")
+
+
+def _email_gateway_error(e: Exception) -> serializers.ValidationError:
+    return serializers.ValidationError(
+        {
+            "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` failed: {str(e)}"
+        },
+        status.HTTP_502_BAD_GATEWAY,
+    )
+
+
+def _get_email_validation_result(response: Response | httpx.Response) -> dict:
     try:
         return _analyze_email_response(response.json())
     except (KeyError, TypeError):
@@ -46,19 +358,46 @@ def validate_email(email: str) -> dict:
         )
 
 
+def validate_email(email: str) -> dict:
+    """
+    Validates the email with AbstractAPI. Results are cached by normalized email,
+    gateway errors are raised and never cached.
+    """
+    cached_result = _get_cached_email_validation(email)
+    if cached_result is not None:
+        return cached_result
+
+    try:
+        response = email_client.get(email=email)
+    except Exception as e:
+        # Also covers `CircuitOpenError` and `RateLimitExceeded`, signups fail fast
+        # while the circuit is open or the rate limit is exceeded for too long.
+        raise _email_gateway_error(e) from e
+
+    result = _get_email_validation_result(response)
+    _cache_email_validation(email, result)
+    return result
+
+
+async def avalidate_email(email: str) -> dict:
+    """Async `validate_email`, the api call does not block a thread."""
+    cached_result = await sync_to_async(_get_cached_email_validation)(email)
+    if cached_result is not None:
+        return cached_result
+
+    try:
+        response = await email_client.aget(email=email)
+    except Exception as e:
+        raise _email_gateway_error(e) from e
+
+    result = _get_email_validation_result(response)
+    await sync_to_async(_cache_email_validation)(email, result)
+    return result
+
+
 def get_geolocation(ip_address: str) -> Response:
-    return requests.get(
-        f"{settings.ABSTRACT_API_GEOLOCATION_URL}?api_key={settings.ABSTRACT_API_GEOLOCATION_KEY}&ip_address="
-        f"{ip_address}"
-    )
+    return geolocation_client.get(ip_address=ip_address)
 
 
-def check_signup_date_is_holiday(
-    country_code: str, date_: datetime.datetime
-) -> Response:
-    year, month, day = date_.year, date_.month, date_.day
-    url = (
-        f"{settings.ABSTRACT_API_HOLIDAY_URL}?api_key={settings.ABSTRACT_API_HOLIDAY_KEY}&country={country_code}"
-        f"&year={year}&month={month}&day={day}"
-    )
-    return requests.get(url)
+def get_holidays(country_code: str, year: int) -> Response:
+    return holiday_client.get(country=country_code, year=year)
@@ -0,0 +1,390 @@
+"""
+ASGI app simulating the AbstractAPI email validation, geolocation and holiday endpoints,
+so local runs, CI and load tests of `st_auth.tasks` need no api keys. Start it with the
+`run_abstractapi_simulator` command and point the `ABSTRACT_API_*_URL` settings at its
+`/email/`, `/geolocation/` and `/holiday/` paths.
+
+Responses are deterministic:
+
+* Emails are deliverable, except for malformed addresses, domains in `TYPO_DOMAINS`
+  (which are autocorrected), `.invalid` and `.test` domains and local parts starting with
+  `undeliverable`.
+* Geolocations are picked from `LOCATIONS` by a hash of the IP address. Private and
+  reserved addresses have no location, like with the real api.
+* Holidays are the fixed date holidays of `HOLIDAYS`.
+
+Latencies are drawn from a log-normal distribution around `latency`, and a share of the
+calls is answered with a 429 or a 503, or only after `timeout_delay` seconds. The counts
+of the answers are served at `/stats`.
+
+The module only depends on the standard library, it does not need Django settings.
+"""
+import asyncio
+import datetime
+import hashlib
+import ipaddress
+import json
+import math
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import parse_qs
+from zoneinfo import ZoneInfo
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+TYPO_DOMAINS = {
+    "gmial.com": "gmail.com",
+    "gmai.com": "gmail.com",
+    "hotmial.com": "hotmail.com",
+    "yaho.com": "yahoo.com",
+    "outlok.com": "outlook.com",
+}
+FREE_DOMAINS = {"gmail.com", "hotmail.com", "yahoo.com", "outlook.com"}
+DISPOSABLE_DOMAINS = {"mailinator.com", "guerrillamail.com", "10minutemail.com"}
+ROLE_LOCAL_PARTS = {"admin", "info", "sales", "support", "contact"}
+
+# (country, country_code, continent, continent_code, region, city, latitude, longitude,
+# timezone, currency_code, currency_name)
+# fmt: off
+LOCATIONS = (
+    ("Turkey", "TR", "Asia", "AS", "Istanbul", "Istanbul", 41.0082, 28.9784,
+     "Europe/Istanbul", "TRY", "Turkish Lira"),
+    ("United States", "US", "North America", "NA", "New York", "New York", 40.7128,
+     -74.006, "America/New_York", "USD", "USD"),
+    ("Germany", "DE", "Europe", "EU", "Berlin", "Berlin", 52.52, 13.405,
+     "Europe/Berlin", "EUR", "Euros"),
+    ("United Kingdom", "GB", "Europe", "EU", "England", "London", 51.5072, -0.1276,
+     "Europe/London", "GBP", "British Pound"),
+    ("France", "FR", "Europe", "EU", "Ile-de-France", "Paris", 48.8566, 2.3522,
+     "Europe/Paris", "EUR", "Euros"),
+    ("Japan", "JP", "Asia", "AS", "Tokyo", "Tokyo", 35.6762, 139.6503, "Asia/Tokyo",
+     "JPY", "Yen"),
+    ("Brazil", "BR", "South America", "SA", "Sao Paulo", "Sao Paulo", -23.5505,
+     -46.6333, "America/Sao_Paulo", "BRL", "Brazil Real"),
+    ("India", "IN", "Asia", "AS", "Maharashtra", "Mumbai", 19.076, 72.8777,
+     "Asia/Kolkata", "INR", "Indian Rupee"),
+    ("Australia", "AU", "Oceania", "OC", "New South Wales", "Sydney", -33.8688,
+     151.2093, "Australia/Sydney", "AUD", "Australian Dollar"),
+    ("Canada", "CA", "North America", "NA", "Ontario", "Toronto", 43.6532, -79.3832,
+     "America/Toronto", "CAD", "Canadian Dollar"),
+)
+# fmt: on
+
+# country_code -> (month, day, name) of the fixed date holidays.
+HOLIDAYS = {
+    "TR": (
+        (1, 1, "New Year's Day"),
+        (4, 23, "National Sovereignty and Children's Day"),
+        (5, 1, "Labour and Solidarity Day"),
+        (5, 19, "Commemoration of Atatürk, Youth and Sports Day"),
+        (7, 15, "Democracy and National Unity Day"),
+        (8, 30, "Victory Day"),
+        (10, 29, "Republic Day"),
+    ),
+    "US": (
+        (1, 1, "New Year's Day"),
+        (6, 19, "Juneteenth"),
+        (7, 4, "Independence Day"),
+        (11, 11, "Veterans Day"),
+        (12, 25, "Christmas Day"),
+    ),
+    "DE": (
+        (1, 1, "New Year's Day"),
+        (5, 1, "Labour Day"),
+        (10, 3, "Day of German Unity"),
+        (12, 25, "Christmas Day"),
+        (12, 26, "Second Day of Christmas"),
+    ),
+    "GB": (
+        (1, 1, "New Year's Day"),
+        (12, 25, "Christmas Day"),
+        (12, 26, "Boxing Day"),
+    ),
+    "FR": (
+        (1, 1, "New Year's Day"),
+        (5, 1, "Labour Day"),
+        (5, 8, "Victory in Europe Day"),
+        (7, 14, "Bastille Day"),
+        (8, 15, "Assumption Day"),
+        (11, 1, "All Saints' Day"),
+        (11, 11, "Armistice Day"),
+        (12, 25, "Christmas Day"),
+    ),
+    "JP": (
+        (1, 1, "New Year's Day"),
+        (2, 11, "National Foundation Day"),
+        (4, 29, "Showa Day"),
+        (5, 3, "Constitution Memorial Day"),
+        (5, 4, "Greenery Day"),
+        (5, 5, "Children's Day"),
+        (11, 3, "Culture Day"),
+        (11, 23, "Labor Thanksgiving Day"),
+    ),
+    "BR": (
+        (1, 1, "New Year's Day"),
+        (4, 21, "Tiradentes Day"),
+        (9, 7, "Independence Day"),
+        (11, 15, "Republic Proclamation Day"),
+        (12, 25, "Christmas Day"),
+    ),
+    "IN": (
+        (1, 26, "Republic Day"),
+        (8, 15, "Independence Day"),
+        (10, 2, "Gandhi Jayanti"),
+    ),
+    "AU": (
+        (1, 1, "New Year's Day"),
+        (1, 26, "Australia Day"),
+        (4, 25, "Anzac Day"),
+        (12, 25, "Christmas Day"),
+        (12, 26, "Boxing Day"),
+    ),
+    "CA": (
+        (1, 1, "New Year's Day"),
+        (7, 1, "Canada Day"),
+        (11, 11, "Remembrance Day"),
+        (12, 25, "Christmas Day"),
+    ),
+}
+
+
+@dataclass
+class SimulatorConfig:
+    # Median seconds of the latencies, and the sigma of their log-normal distribution.
+    latency: float = 0.05
+    latency_sigma: float = 0.5
+    # Shares of the calls answered with a 429, a 503, or after `timeout_delay` seconds.
+    rate_limit_rate: float = 0
+    error_rate: float = 0
+    timeout_rate: float = 0
+    timeout_delay: float = 30
+    # Seeds the latencies and the injected faults, for reproducible runs.
+    seed: int | None = None
+
+
+def _email_response(params: dict) -> tuple[int, dict]:
+    email = params.get("email", "")
+    local_part, _, domain = email.lower().rpartition("@")
+
+    is_valid_format = bool(EMAIL_PATTERN.match(email))
+    autocorrect = ""
+    if domain in TYPO_DOMAINS:
+        autocorrect = f"{email.rpartition('@')[0]}@{TYPO_DOMAINS[domain]}"
+
+    if not is_valid_format or autocorrect:
+        deliverability = "UNDELIVERABLE"
+    elif domain.endswith((".invalid", ".test")) or local_part.startswith(
+        "undeliverable"
+    ):
+        deliverability = "UNDELIVERABLE"
+    elif local_part.startswith("unknown"):
+        deliverability = "UNKNOWN"
+    else:
+        deliverability = "DELIVERABLE"
+
+    deliverable = deliverability == "DELIVERABLE"
+    return 200, {
+        "email": email,
+        "autocorrect": autocorrect,
+        "deliverability": deliverability,
+        "quality_score": "0.99" if deliverable else "0.00",
+        "is_valid_format": _flag(is_valid_format),
+        "is_free_email": _flag(domain in FREE_DOMAINS),
+        "is_disposable_email": _flag(domain in DISPOSABLE_DOMAINS),
+        "is_role_email": _flag(local_part in ROLE_LOCAL_PARTS),
+        "is_catchall_email": _flag(False),
+        "is_mx_found": _flag(deliverable),
+        "is_smtp_valid": _flag(deliverable),
+    }
+
+
+def _flag(value: bool) -> dict:
+    return {"value": value, "text": "TRUE" if value else "FALSE"}
+
+
+def _geolocation_response(params: dict) -> tuple[int, dict]:
+    ip_address = params.get("ip_address", "")
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return 400, _error("validation_error", "The ip address is invalid.")
+
+    if not address.is_global:
+        return 200, {"ip_address": ip_address, "country": None, "country_code": None}
+
+    digest = hashlib.sha256(ip_address.encode()).digest()
+    (
+        country,
+        country_code,
+        continent,
+        continent_code,
+        region,
+        city,
+        latitude,
+        longitude,
+        timezone_name,
+        currency_code,
+        currency_name,
+    ) = LOCATIONS[digest[0] % len(LOCATIONS)]
+    now = datetime.datetime.now(ZoneInfo(timezone_name))
+
+    return 200, {
+        "ip_address": ip_address,
+        "city": city,
+        "region": region,
+        "postal_code": None,
+        "country": country,
+        "country_code": country_code,
+        "country_is_eu": continent_code == "EU" and country_code != "GB",
+        "continent": continent,
+        "continent_code": continent_code,
+        # Spreads the addresses of a city over a few kilometers.
+        "longitude": round(longitude + (digest[1] - 128) / 5000, 4),
+        "latitude": round(latitude + (digest[2] - 128) / 5000, 4),
+        "security": {"is_vpn": False},
+        "timezone": {
+            "name": timezone_name,
+            "abbreviation": now.tzname(),
+            "gmt_offset": int(now.utcoffset().total_seconds() // 3600),
+            "current_time": now.strftime("%H:%M:%S"),
+            "is_dst": bool(now.dst()),
+        },
+        "flag": {"emoji": "", "unicode": "", "png": "", "svg": ""},
+        "currency": {"currency_name": currency_name, "currency_code": currency_code},
+        "connection": {
+            "autonomous_system_number": 64512 + digest[3],
+            "autonomous_system_organization": "Simulated Networks",
+            "connection_type": "Cellular" if digest[4] % 4 == 0 else "Corporate",
+            "isp_name": "Simulated Networks",
+            "organization_name": "Simulated Networks",
+        },
+    }
+
+
+def _holidays_response(params: dict) -> tuple[int, dict | list]:
+    country_code = params.get("country", "").upper()
+    try:
+        year = int(params.get("year", datetime.date.today().year))
+        month = int(params["month"]) if "month" in params else None
+        day = int(params["day"]) if "day" in params else None
+    except ValueError:
+        return 400, _error("validation_error", "The date is invalid.")
+
+    holidays = []
+    for holiday_month, holiday_day, name in HOLIDAYS.get(country_code, ()):
+        if month is not None and month != holiday_month:
+            continue
+        if day is not None and day != holiday_day:
+            continue
+
+        date_ = datetime.date(year, holiday_month, holiday_day)
+        holidays.append(
+            {
+                "name": name,
+                "name_local": "",
+                "language": "",
+                "description": "",
+                "country": country_code,
+                "location": country_code,
+                "type": "National",
+                "date": date_.strftime("%m/%d/%Y"),
+                "date_year": str(year),
+                "date_month": str(holiday_month),
+                "date_day": str(holiday_day),
+                "week_day": date_.strftime("%A"),
+            }
+        )
+
+    return 200, holidays
+
+
+ENDPOINTS = {
+    "/email/": _email_response,
+    "/geolocation/": _geolocation_response,
+    "/holiday/": _holidays_response,
+}
+
+
+def _error(code: str, message: str) -> dict:
+    return {"error": {"message": message, "code": code, "details": None}}
+
+
+def create_app(config: SimulatorConfig):
+    """Returns the ASGI app of the simulator."""
+    rng = random.Random(config.seed)
+    stats: Counter = Counter()
+
+    def sample_latency() -> float:
+        if config.latency <= 0:
+            return 0
+        if config.latency_sigma <= 0:
+            return config.latency
+        return rng.lognormvariate(math.log(config.latency), config.latency_sigma)
+
+    async def respond(scope) -> tuple[int, dict | list, dict]:
+        params = {
+            name: values[0]
+            for name, values in parse_qs(scope["query_string"].decode()).items()
+        }
+        path = scope["path"]
+
+        if path == "/stats":
+            return 200, dict(sorted(stats.items())), {}
+
+        endpoint = ENDPOINTS.get(path)
+        if endpoint is None:
+            return 404, _error("not_found", "Not found."), {}
+
+        await asyncio.sleep(sample_latency())
+
+        if not params.get("api_key"):
+            return 401, _error("unauthorized", "Invalid api key provided."), {}
+
+        fault = rng.random()
+        if fault < config.timeout_rate:
+            await asyncio.sleep(config.timeout_delay)
+            return 504, _error("gateway_timeout", "Gateway timeout."), {}
+
+        fault -= config.timeout_rate
+        if fault < config.rate_limit_rate:
+            return (
+                429,
+                _error("too_many_requests", "Too many requests."),
+                {"retry-after": "1"},
+            )
+
+        fault -= config.rate_limit_rate
+        if fault < config.error_rate:
+            return 503, _error("service_unavailable", "Service unavailable."), {}
+
+        status, body = endpoint(params)
+        return status, body, {}
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        status, body, headers = await respond(scope)
+        if scope["path"] != "/stats":
+            stats[f"{scope['path'].strip('/')}:{status}"] += 1
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    *(
+                        (name.encode(), value.encode())
+                        for name, value in headers.items()
+                    ),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+    return app
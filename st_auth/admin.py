@@ -1,5 +1,7 @@
 from django.contrib import admin
 
-from .models import Geolocation
+from .models import EmailVerification, Geolocation, HolidayCalendar
 
 admin.site.register(Geolocation)
+admin.site.register(EmailVerification)
+admin.site.register(HolidayCalendar)
@@ -1,23 +1,30 @@
 import datetime
 from logging import getLogger
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.http import HttpRequest
 from drf_spectacular.utils import OpenApiResponse, extend_schema
-from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from .jwt_helper import get_tokens_for_user
+from .models import EmailVerification
 from .serializers import (
     GeolocationSerializer,
     LoginResponseSerializer,
     LoginSerializer,
+    LogoutSerializer,
+    SignUpPendingResponseSerializer,
     SignUpSerializer,
     TokenResponseSerializer,
     UserSerializer,
 )
-from .tasks import create_user_geolocation
+from .tasks import enqueue_user_geolocation, validate_user_email
+from .token_revocation import revocation_list
 
 logger = getLogger(__name__)
 
@@ -26,38 +33,86 @@ logger = getLogger(__name__)
     request=SignUpSerializer,
     responses={
         status.HTTP_200_OK: TokenResponseSerializer,
+        status.HTTP_202_ACCEPTED: SignUpPendingResponseSerializer,
         status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Bad request"),
         status.HTTP_502_BAD_GATEWAY: OpenApiResponse(description="Bad gateway"),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(
+            description="Password hashing is unavailable"
+        ),
     },
 )
 @api_view(["POST"])
 def signup(request: Request):
+    # Rejects taken emails before they cost an email validation call and a password hash.
     if User.objects.filter(username=request.data.get("email")).exists():
         return Response(
             {"error": "user_already_exists"}, status=status.HTTP_400_BAD_REQUEST
         )
 
-    serializer = SignUpSerializer(data=request.data)
+    validate_email_async = settings.EMAIL_VALIDATION_MODE == "async"
+
+    serializer = SignUpSerializer(
+        data=request.data,
+        context={"validate_email_with_api": not validate_email_async},
+    )
     serializer.is_valid(raise_exception=True)
 
-    user = serializer.save()
+    user = _create_user(serializer, validate_email_async)
+    if not user:
+        return Response(
+            {"error": "user_already_exists"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    _enqueue_user_geolocation(request, user)
 
+    if validate_email_async:
+        return Response(
+            {"status": "pending_verification"}, status=status.HTTP_202_ACCEPTED
+        )
+
+    tokens = get_tokens_for_user(user)
+
+    return Response(tokens)
+
+
+def _create_user(
+    serializer: SignUpSerializer, validate_email_async: bool
+) -> User | None:
+    """
+    Returns `None` if a concurrent signup took the email since the callers checked it.
+    With async email validation the user is created inactive, the `validate_user_email`
+    task activates it.
+    """
+    try:
+        with transaction.atomic():
+            if not validate_email_async:
+                return serializer.save()
+
+            user = serializer.save(is_active=False)
+            EmailVerification.objects.create(user=user)
+            transaction.on_commit(lambda: validate_user_email.delay(user.id))
+            return user
+
+    except IntegrityError:
+        # Only the unique username constraint means the email is taken.
+        if User.objects.filter(username=serializer.validated_data["email"]).exists():
+            return None
+        raise
+
+
+def _enqueue_user_geolocation(request: HttpRequest, user: User) -> None:
     user_ip = _get_ip_address_from_request(request)
     if user_ip:
         now = datetime.datetime.utcnow()
         signup_date_utc = now.strftime("%Y-%m-%d %H:%M:%S")
-        create_user_geolocation.delay(user.id, user_ip, signup_date_utc)
+        enqueue_user_geolocation(user.id, user_ip, signup_date_utc)
     else:
         logger.warning(
             f"Empty IP address for user {user.id}! Cannot create geolocation data."
         )
 
-    tokens = get_tokens_for_user(user)
 
-    return Response(tokens)
-
-
-def _get_ip_address_from_request(request: Request) -> str:
+def _get_ip_address_from_request(request: HttpRequest) -> str:
     x_forwarded_for = request.headers.get("X-Forwarded-For")
     if x_forwarded_for:
         return x_forwarded_for.split(",")[0]
@@ -71,16 +126,25 @@ def _get_ip_address_from_request(request: Request) -> str:
         status.HTTP_200_OK: LoginResponseSerializer,
         status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Bad request"),
         status.HTTP_502_BAD_GATEWAY: OpenApiResponse(description="Bad gateway"),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(
+            description="Password hashing is unavailable"
+        ),
     },
 )
 @api_view(["POST"])
 def login(request: Request):
-    if not User.objects.filter(username=request.data.get("email")).exists():
+    # The only query of a login, the response is serialized from this instance.
+    user = (
+        User.objects.select_related("geolocation", "email_verification")
+        .filter(username=request.data.get("email"))
+        .first()
+    )
+    if not user:
         return Response(
             {"error": "user_does_not_exists"}, status=status.HTTP_400_BAD_REQUEST
         )
 
-    serializer = LoginSerializer(data=request.data)
+    serializer = LoginSerializer(data=request.data, context={"user": user})
     serializer.is_valid(raise_exception=True)
 
     user = serializer.validated_data
@@ -97,3 +161,44 @@ def login(request: Request):
             "tokens": tokens,
         }
     )
+
+
+@extend_schema(
+    request=LogoutSerializer,
+    responses={
+        status.HTTP_204_NO_CONTENT: None,
+        status.HTTP_400_BAD_REQUEST: OpenApiResponse(description="Bad request"),
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(
+            description="Token revocation is unavailable"
+        ),
+    },
+)
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def logout(request: Request):
+    """Revokes the given refresh token and the access token of the request."""
+    serializer = LogoutSerializer(data=request.data, context={"user": request.user})
+    serializer.is_valid(raise_exception=True)
+
+    revocation_list.revoke(serializer.validated_data["refresh"])
+    revocation_list.revoke(request.auth)
+
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@extend_schema(
+    request=None,
+    responses={
+        status.HTTP_204_NO_CONTENT: None,
+        status.HTTP_503_SERVICE_UNAVAILABLE: OpenApiResponse(
+            description="Token revocation is unavailable"
+        ),
+    },
+)
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def logout_all(request: Request):
+    """Revokes every token issued to the user until now, for all of their sessions."""
+    revocation_list.revoke_user(request.user.pk)
+
+    return Response(status=status.HTTP_204_NO_CONTENT)
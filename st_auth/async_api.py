@@ -0,0 +1,176 @@
+"""
+Async versions of the `signup` and `login` views of `api`, routed instead of them when
+`AUTH_ASYNC_VIEWS` is enabled. Under ASGI, requests blocked on AbstractAPI or password
+hashing then wait on the event loop instead of holding a thread each.
+
+DRF views are sync only, so these are plain Django views that reuse the serializers of
+`api` and answer with the same bodies and status codes.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.http import HttpRequest, JsonResponse
+from rest_framework import exceptions, serializers, status
+from rest_framework.settings import api_settings
+
+from .abstractapi_helper import avalidate_email
+from .api import _create_user, _enqueue_user_geolocation
+from .jwt_helper import get_tokens_for_user
+from .models import EmailVerification
+from .serializers import (
+    GeolocationSerializer,
+    LoginCredentialsSerializer,
+    SignUpSerializer,
+    UserSerializer,
+)
+
+
+def _async_api_view(view):
+    """
+    Accepts POST requests with JSON or form data and renders DRF `APIException`s like
+    the DRF exception handler does.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request: HttpRequest) -> JsonResponse:
+        try:
+            if request.method != "POST":
+                raise exceptions.MethodNotAllowed(request.method)
+
+            return await view(request, _get_request_data(request))
+
+        except exceptions.APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {"detail": detail}
+
+            return JsonResponse(detail, status=exc.status_code, safe=False)
+
+    # The views authenticate with credentials, like the DRF views they replace.
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def _get_request_data(request: HttpRequest):
+    if request.content_type != "application/json":
+        return request.POST
+
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError as exc:
+        raise exceptions.ParseError(f"JSON parse error - {exc}")
+
+
+@_async_api_view
+async def signup(request: HttpRequest, data) -> JsonResponse:
+    if await User.objects.filter(username=data.get("email")).aexists():
+        return JsonResponse(
+            {"error": "user_already_exists"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # The email is validated below, without blocking a thread on the api call.
+    serializer = SignUpSerializer(data=data, context={"validate_email_with_api": False})
+    serializer.is_valid(raise_exception=True)
+
+    validate_email_async = settings.EMAIL_VALIDATION_MODE == "async"
+
+    if not validate_email_async:
+        email = serializer.validated_data["email"]
+        try:
+            validation_response = await avalidate_email(email)
+        except serializers.ValidationError as exc:
+            # Nested under the field, like the errors of `SignUpSerializer.validate_email`.
+            raise serializers.ValidationError({"email": exc.detail})
+
+        if validation_response != {"success": email}:
+            raise serializers.ValidationError({"email": validation_response})
+
+    user = await sync_to_async(_create_user)(serializer, validate_email_async)
+    if not user:
+        return JsonResponse(
+            {"error": "user_already_exists"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    await sync_to_async(_enqueue_user_geolocation)(request, user)
+
+    if validate_email_async:
+        return JsonResponse(
+            {"status": "pending_verification"}, status=status.HTTP_202_ACCEPTED
+        )
+
+    return JsonResponse(get_tokens_for_user(user))
+
+
+@_async_api_view
+async def login(request: HttpRequest, data) -> JsonResponse:
+    user = (
+        await User.objects.select_related("geolocation", "email_verification")
+        .filter(username=data.get("email"))
+        .afirst()
+    )
+    if not user:
+        return JsonResponse(
+            {"error": "user_does_not_exists"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    serializer = LoginCredentialsSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+
+    await _acheck_password(user, serializer.validated_data["password"])
+
+    geolocation = None
+    if hasattr(user, "geolocation") and user.geolocation:
+        geolocation = GeolocationSerializer(user.geolocation).data
+
+    return JsonResponse(
+        {
+            "user": UserSerializer(user).data,
+            "geolocation": geolocation,
+            "tokens": get_tokens_for_user(user),
+        }
+    )
+
+
+async def _acheck_password(user: User, password: str) -> None:
+    """Raises the errors of `LoginSerializer` if the user cannot log in."""
+    must_update = False
+
+    def setter(_):
+        nonlocal must_update
+        must_update = True
+
+    # Hashing is CPU bound and needs no database connection, so it does not have to
+    # run in the thread of the request.
+    password_matches = await sync_to_async(check_password, thread_sensitive=False)(
+        password, user.password, setter
+    )
+    if not password_matches:
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: ["Incorrect Credentials"]}
+        )
+
+    if must_update:
+        # The hasher or its parameters changed, like `User.check_password` does.
+        await sync_to_async(user.set_password, thread_sensitive=False)(password)
+        await user.asave(update_fields=["password"])
+
+    if user.is_active:
+        return
+
+    # Users pending email verification are inactive.
+    email_verification = getattr(user, "email_verification", None)
+    if (
+        not email_verification
+        or email_verification.status == EmailVerification.Status.VERIFIED
+    ):
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: ["Incorrect Credentials"]}
+        )
+
+    if email_verification.status == EmailVerification.Status.PENDING:
+        raise serializers.ValidationError({"error": ["email_verification_pending"]})
+    raise serializers.ValidationError({"error": ["email_verification_failed"]})
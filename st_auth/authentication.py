@@ -0,0 +1,106 @@
+"""
+JWT authentication without a user query per request, enabled with
+`JWT_STATELESS_AUTHENTICATION`. Access tokens carry the user claims added by
+`jwt_helper.get_tokens_for_user`, whose signature is verified before they are trusted.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+from .jwt_helper import USER_CLAIMS
+
+
+class _UserCache:
+    """
+    Process local LRU of up to `JWT_USER_CACHE_SIZE` users, whose entries expire after
+    `JWT_USER_CACHE_TIMEOUT` seconds.
+    """
+
+    def __init__(self):
+        self._users: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> User | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._users[user_id]
+                return None
+
+            self._users.move_to_end(user_id)
+
+        # Views must not change the cached instance.
+        return copy.copy(user)
+
+    def set(self, user: User) -> None:
+        with self._lock:
+            expires_at = time.monotonic() + settings.JWT_USER_CACHE_TIMEOUT
+            self._users[user.pk] = (expires_at, copy.copy(user))
+            self._users.move_to_end(user.pk)
+            while len(self._users) > settings.JWT_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = _UserCache()
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Hydrates the user from the token claims into a `User` whose other fields are
+    deferred, so it can be used like a user loaded from the database. Accessing a
+    deferred field loads it with a query.
+
+    With `JWT_USER_CACHE_TIMEOUT` the full users are loaded instead and kept in a process
+    local LRU for that many seconds. Tokens issued without the claims also load the user
+    from the database.
+
+    Deactivated or deleted users stay authenticated until their access tokens expire,
+    or until their cache entries expire.
+    """
+
+    def get_user(self, validated_token: Token) -> User:
+        if settings.JWT_USER_CACHE_TIMEOUT > 0:
+            return self._get_cached_user(validated_token)
+
+        claims = (api_settings.USER_ID_CLAIM, *USER_CLAIMS)
+        if not all(claim in validated_token for claim in claims):
+            return super().get_user(validated_token)
+
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return User.from_db(
+            None,
+            ["id", "username", "is_active"],
+            [
+                validated_token[api_settings.USER_ID_CLAIM],
+                validated_token["username"],
+                validated_token["is_active"],
+            ],
+        )
+
+    def _get_cached_user(self, validated_token: Token) -> User:
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+
+        return user
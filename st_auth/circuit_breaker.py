@@ -0,0 +1,125 @@
+from logging import getLogger
+
+import redis
+
+from social_text.redis_client import get_redis
+
+logger = getLogger(__name__)
+
+CIRCUIT_BREAKER_KEY = "st_auth:circuit_breaker:{name}:{field}"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit breaker `{name}` is open")
+        self.name = name
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.retry_after)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state lives in Redis, so it is shared by every gunicorn and
+    Celery worker process.
+
+    * closed: calls go through. `failure_threshold` failures within `failure_window`
+      seconds open the circuit.
+    * open: calls fail fast with `CircuitOpenError` for `open_timeout` seconds.
+    * half open: a single probe call goes through. Its success closes the circuit, its
+      failure opens it again.
+
+    Redis errors are logged and let calls through, an unavailable Redis must not take the
+    gateways down with it.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int, failure_window: int, open_timeout: int
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.open_timeout = open_timeout
+
+    def _key(self, field: str) -> str:
+        return CIRCUIT_BREAKER_KEY.format(name=self.name, field=field)
+
+    def before_call(self) -> bool:
+        """
+        Raises `CircuitOpenError` if the circuit does not allow the call. Returns whether
+        the call is the half open probe, which has to be passed to `record_success` and
+        `record_failure`.
+        """
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            pipeline.pttl(self._key("open"))
+            pipeline.exists(self._key("tripped"))
+            open_ttl, tripped = pipeline.execute()
+
+            # -2 means the key does not exist.
+            if open_ttl != -2:
+                raise CircuitOpenError(self.name, max(open_ttl, 0) / 1000)
+
+            if not tripped:
+                return False
+
+            if get_redis().set(self._key("probe"), 1, nx=True, ex=self.open_timeout):
+                return True
+
+        except redis.RedisError as exc:
+            logger.warning(f"Circuit breaker {self.name} cannot read its state: {exc}")
+            return False
+
+        raise CircuitOpenError(self.name, self.open_timeout)
+
+    def record_success(self, probe: bool) -> None:
+        if not probe:
+            return
+
+        try:
+            get_redis().delete(
+                self._key("tripped"), self._key("probe"), self._key("failures")
+            )
+        except redis.RedisError as exc:
+            logger.warning(f"Circuit breaker {self.name} cannot close: {exc}")
+            return
+
+        logger.warning(f"Circuit breaker {self.name} closed.")
+
+    def record_failure(self, probe: bool) -> None:
+        try:
+            if probe:
+                self._open()
+                return
+
+            failures = get_redis().incr(self._key("failures"))
+            if failures == 1:
+                get_redis().expire(self._key("failures"), self.failure_window)
+
+            if failures >= self.failure_threshold:
+                self._open()
+
+        except redis.RedisError as exc:
+            logger.warning(f"Circuit breaker {self.name} cannot record failure: {exc}")
+
+    def release_probe(self, probe: bool) -> None:
+        """Lets another call probe the half open circuit, when the probe was not sent."""
+        if not probe:
+            return
+
+        try:
+            get_redis().delete(self._key("probe"))
+        except redis.RedisError as exc:
+            logger.warning(f"Circuit breaker {self.name} cannot release probe: {exc}")
+
+    def _open(self) -> None:
+        pipeline = get_redis().pipeline(transaction=True)
+        pipeline.set(self._key("open"), 1, ex=self.open_timeout)
+        pipeline.set(self._key("tripped"), 1)
+        pipeline.delete(self._key("probe"), self._key("failures"))
+        pipeline.execute()
+
+        logger.warning(
+            f"Circuit breaker {self.name} opened for {self.open_timeout} seconds."
+        )
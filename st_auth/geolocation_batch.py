@@ -0,0 +1,68 @@
+"""
+Queue of signups waiting for their geolocation, drained in chunks by the
+`process_geolocation_batch` task when `GEOLOCATION_BATCH_MODE` is on.
+
+Popped entries are moved to a processing list and only removed from it by `ack`, once
+their geolocations are written. The entries of a run which failed or crashed in between
+are queued again by the next run, with `requeue_unacked`.
+"""
+import json
+
+from redis.lock import Lock
+
+from social_text.redis_client import get_redis
+
+QUEUE_KEY = "st_auth:geolocation:queue"
+PROCESSING_KEY = "st_auth:geolocation:processing"
+LOCK_KEY = "st_auth:geolocation:lock"
+
+
+def push(entries: list[dict]) -> int:
+    """Appends the entries to the queue and returns the new queue length."""
+    return get_redis().rpush(QUEUE_KEY, *[json.dumps(entry) for entry in entries])
+
+
+def pop(count: int) -> list[dict]:
+    """Moves up to `count` entries from the queue to the processing list."""
+    pipeline = get_redis().pipeline(transaction=True)
+    for _ in range(count):
+        pipeline.lmove(QUEUE_KEY, PROCESSING_KEY, "LEFT", "RIGHT")
+
+    return [json.loads(entry) for entry in pipeline.execute() if entry is not None]
+
+
+def ack(entries: list[dict]) -> None:
+    """Removes processed entries, as returned by `pop`, from the processing list."""
+    pipeline = get_redis().pipeline(transaction=False)
+    for entry in entries:
+        pipeline.lrem(PROCESSING_KEY, 1, json.dumps(entry))
+    pipeline.execute()
+
+
+def requeue_unacked(max_attempts: int) -> int:
+    """
+    Queues again the entries left in the processing list, counting their run as an
+    attempt. Entries out of attempts are dropped. Returns the number of queued entries.
+
+    Must only be called by the holder of `lock`, while no other run processes entries.
+    """
+    unacked = get_redis().lrange(PROCESSING_KEY, 0, -1)
+    entries = [
+        {**entry, "attempts": entry["attempts"] + 1}
+        for entry in map(json.loads, unacked)
+        if entry["attempts"] + 1 < max_attempts
+    ]
+    # Queued first: a crash in between processes the entries twice instead of losing them.
+    if entries:
+        push(entries)
+    get_redis().ltrim(PROCESSING_KEY, len(unacked), -1)
+    return len(entries)
+
+
+def lock(timeout: int) -> Lock:
+    """Lock of the run processing the queue, expiring after `timeout` seconds."""
+    return get_redis().lock(LOCK_KEY, timeout=timeout)
+
+
+def length() -> int:
+    return get_redis().llen(QUEUE_KEY)
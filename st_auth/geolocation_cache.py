@@ -0,0 +1,85 @@
+"""
+Cache of geolocation api responses keyed by network prefix: signups cluster by carrier NAT
+and office networks, whose addresses share their geolocation.
+"""
+import ipaddress
+from logging import getLogger
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+logger = getLogger(__name__)
+
+GEOLOCATION_KEY = "st_auth:geolocation:{network}"
+STATS_KEY = "st_auth:geolocation:{result}"
+
+IPV4_PREFIX_LENGTH = 24
+IPV6_PREFIX_LENGTH = 48
+
+
+def _network_key(ip_address: str) -> str | None:
+    try:
+        address = ipaddress.ip_address(ip_address.strip())
+    except ValueError:
+        return None
+
+    prefix_length = IPV4_PREFIX_LENGTH if address.version == 4 else IPV6_PREFIX_LENGTH
+    network = ipaddress.ip_network(f"{address}/{prefix_length}", strict=False)
+    return GEOLOCATION_KEY.format(network=network)
+
+
+def _incr(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_geolocation(ip_address: str) -> dict | None:
+    """Returns the cached geolocation of the address' network, if any."""
+    key = _network_key(ip_address)
+    if not key:
+        return None
+
+    try:
+        geolocation = cache.get(key)
+        _incr(STATS_KEY.format(result="hits" if geolocation else "misses"))
+    except redis.RedisError as e:
+        logger.warning(f"Reading the cached geolocation of {ip_address} failed: {e}")
+        return None
+
+    if geolocation is None:
+        return None
+
+    # The rest of the response describes the network, the address is the caller's.
+    return {**geolocation, "ip_address": ip_address}
+
+
+def set_geolocation(ip_address: str, geolocation: dict) -> None:
+    key = _network_key(ip_address)
+    if not key:
+        return
+
+    try:
+        cache.set(key, geolocation, timeout=settings.GEOLOCATION_CACHE_TIMEOUT)
+    except redis.RedisError as e:
+        logger.warning(f"Caching the geolocation of {ip_address} failed: {e}")
+
+
+def get_stats() -> dict:
+    try:
+        stats = cache.get_many(
+            [STATS_KEY.format(result="hits"), STATS_KEY.format(result="misses")]
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Reading the geolocation cache stats failed: {e}")
+        stats = {}
+
+    hits = stats.get(STATS_KEY.format(result="hits"), 0)
+    misses = stats.get(STATS_KEY.format(result="misses"), 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+    }
@@ -0,0 +1,32 @@
+"""
+Password hashers that hash in the pool of `password_pool`. They keep the algorithm names
+of the Django hashers they wrap, so existing password hashes stay valid.
+"""
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+
+from . import password_pool
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    def encode(self, password, salt, iterations=None):
+        return password_pool.run(
+            PBKDF2PasswordHasher, "encode", password, salt, iterations
+        )
+
+    def verify(self, password, encoded):
+        return password_pool.run(PBKDF2PasswordHasher, "verify", password, encoded)
+
+
+class PooledScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    Memory hard, so it can be tuned for much less CPU per hash than PBKDF2 at the same
+    resistance to brute forcing.
+    """
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        return password_pool.run(
+            ScryptPasswordHasher, "encode", password, salt, n, r, p
+        )
+
+    def verify(self, password, encoded):
+        return password_pool.run(ScryptPasswordHasher, "verify", password, encoded)
@@ -0,0 +1,70 @@
+"""
+Whether a date is a holiday only depends on the country and the date, so the holidays of
+a country are fetched once per year into `HolidayCalendar` and kept in process memory.
+"""
+import datetime
+from http import HTTPStatus
+
+from .abstractapi_helper import get_holidays
+from .models import HolidayCalendar
+
+# (country_code, year) -> holiday dates. Calendars do not change once fetched, a process
+# restart picks up calendars refreshed with the `fetch_holiday_calendars` command.
+_holiday_dates: dict[tuple[str, int], frozenset[datetime.date]] = {}
+
+
+class HolidayAPIStatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"Holiday api returned status code {status_code}")
+        self.status_code = status_code
+
+    def __reduce__(self):
+        return self.__class__, (self.status_code,)
+
+
+def fetch_holiday_calendar(country_code: str, year: int) -> HolidayCalendar:
+    """
+    Fetches the holidays of the country in the year from the holiday api and stores them.
+    Raises `HolidayAPIStatusError` if the api does not answer with 200.
+    """
+    response = get_holidays(country_code, year)
+    if response.status_code != HTTPStatus.OK.value:
+        raise HolidayAPIStatusError(response.status_code)
+
+    dates = sorted(
+        {
+            datetime.date(
+                int(holiday["date_year"]),
+                int(holiday["date_month"]),
+                int(holiday["date_day"]),
+            ).isoformat()
+            for holiday in response.json()
+        }
+    )
+
+    calendar, _ = HolidayCalendar.objects.update_or_create(
+        country_code=country_code, year=year, defaults={"dates": dates}
+    )
+    _holiday_dates.pop((country_code, year), None)
+    return calendar
+
+
+def get_holiday_dates(country_code: str, year: int) -> frozenset[datetime.date]:
+    """Fetches the calendar on first use, see `fetch_holiday_calendar` for errors."""
+    key = (country_code, year)
+    if key not in _holiday_dates:
+        calendar = HolidayCalendar.objects.filter(
+            country_code=country_code, year=year
+        ).first()
+        if not calendar:
+            calendar = fetch_holiday_calendar(country_code, year)
+
+        _holiday_dates[key] = frozenset(
+            datetime.date.fromisoformat(date_) for date_ in calendar.dates
+        )
+
+    return _holiday_dates[key]
+
+
+def is_holiday(country_code: str, date_: datetime.date) -> bool:
+    return date_ in get_holiday_dates(country_code, date_.year)
@@ -1,11 +1,42 @@
 from typing import Dict
 
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .token_revocation import revocation_list
+
+# Claims `authentication.StatelessJWTAuthentication` hydrates users from, besides the
+# user id. Access tokens inherit them from their refresh token.
+USER_CLAIMS = ("username", "is_active")
+
+
+class RevocableAccessToken(AccessToken):
+    def verify(self) -> None:
+        super().verify()
+        if revocation_list.is_revoked(self):
+            raise TokenError(_("Token is revoked"))
+
+
+class RevocableRefreshToken(RefreshToken):
+    access_token_class = RevocableAccessToken
+
+    def verify(self) -> None:
+        super().verify()
+        if revocation_list.is_revoked(self):
+            raise TokenError(_("Token is revoked"))
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):  # noqa
+    token_class = RevocableRefreshToken
 
 
 def get_tokens_for_user(user: User) -> Dict[str, str]:
-    refresh = RefreshToken.for_user(user)
+    refresh = RevocableRefreshToken.for_user(user)
+    for claim in USER_CLAIMS:
+        refresh[claim] = getattr(user, claim)
 
     return {
         "refresh": str(refresh),
@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from st_auth import geolocation_cache, password_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the deployment wide counters of st_auth as JSON, e.g. for a cron job."
+    )
+
+    def handle(self, *args, **options):
+        stats = {
+            "geolocation_cache": geolocation_cache.get_stats(),
+            "password_hashing": password_pool.get_stats(),
+        }
+        self.stdout.write(json.dumps(stats, indent=2))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from st_auth.holidays import HolidayAPIStatusError, fetch_holiday_calendar
+from st_auth.models import Geolocation
+
+
+class Command(BaseCommand):
+    help = "Fetches holiday calendars from the holiday api into HolidayCalendar."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--country",
+            action="append",
+            dest="countries",
+            help="Country code to fetch, can be repeated. Defaults to the countries of "
+            "all user geolocations.",
+        )
+        parser.add_argument(
+            "--year",
+            action="append",
+            dest="years",
+            type=int,
+            help="Year to fetch, can be repeated. Defaults to the current year.",
+        )
+
+    def handle(self, *args, countries, years, **options):
+        if not countries:
+            countries = sorted(
+                Geolocation.objects.filter(geolocation__country_code__isnull=False)
+                .values_list("geolocation__country_code", flat=True)
+                .distinct()
+            )
+        if not years:
+            years = [timezone.now().year]
+
+        failed = 0
+        for country_code in countries:
+            for year in years:
+                try:
+                    calendar = fetch_holiday_calendar(country_code, year)
+                except HolidayAPIStatusError as exc:
+                    failed += 1
+                    self.stderr.write(f"{country_code} {year}: {exc}")
+                    continue
+
+                self.stdout.write(
+                    f"{country_code} {year}: {len(calendar.dates)} holidays."
+                )
+
+        if failed:
+            raise CommandError(f"Fetching {failed} holiday calendars failed.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fetched {len(countries) * len(years)} holiday calendars."
+            )
+        )
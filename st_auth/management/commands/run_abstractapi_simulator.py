@@ -0,0 +1,75 @@
+import uvicorn
+from django.core.management.base import BaseCommand
+
+from st_auth.abstractapi_simulator import SimulatorConfig, create_app
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a simulator of the AbstractAPI email validation, geolocation and holiday "
+        "endpoints, see st_auth.abstractapi_simulator."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8100)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=SimulatorConfig.latency,
+            help="Median latency in seconds.",
+        )
+        parser.add_argument(
+            "--latency-sigma",
+            type=float,
+            default=SimulatorConfig.latency_sigma,
+            help="Sigma of the log-normal latency distribution, 0 for a constant "
+            "latency.",
+        )
+        parser.add_argument(
+            "--rate-limit-rate",
+            type=float,
+            default=SimulatorConfig.rate_limit_rate,
+            help="Share of the calls answered with a 429.",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=SimulatorConfig.error_rate,
+            help="Share of the calls answered with a 503.",
+        )
+        parser.add_argument(
+            "--timeout-rate",
+            type=float,
+            default=SimulatorConfig.timeout_rate,
+            help="Share of the calls answered after --timeout-delay seconds.",
+        )
+        parser.add_argument(
+            "--timeout-delay", type=float, default=SimulatorConfig.timeout_delay
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Seeds the latencies and the injected faults.",
+        )
+
+    def handle(self, *args, host, port, **options):
+        config = SimulatorConfig(
+            latency=options["latency"],
+            latency_sigma=options["latency_sigma"],
+            rate_limit_rate=options["rate_limit_rate"],
+            error_rate=options["error_rate"],
+            timeout_rate=options["timeout_rate"],
+            timeout_delay=options["timeout_delay"],
+            seed=options["seed"],
+        )
+
+        url = f"http://{host}:{port}"
+        self.stdout.write(
+            "Point the settings at the simulator with:\n"
+            f"ABSTRACT_API_EMAIL_URL={url}/email/\n"
+            f"ABSTRACT_API_GEOLOCATION_URL={url}/geolocation/\n"
+            f"ABSTRACT_API_HOLIDAY_URL={url}/holiday/"
+        )
+        uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
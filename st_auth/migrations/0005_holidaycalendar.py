@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("st_auth", "0004_emailverification"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HolidayCalendar",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("country_code", models.CharField(max_length=2)),
+                ("year", models.PositiveSmallIntegerField()),
+                ("dates", models.JSONField(default=list)),
+                ("fetched_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="holidaycalendar",
+            constraint=models.UniqueConstraint(
+                fields=("country_code", "year"),
+                name="holidaycalendar_unique_country_year",
+            ),
+        ),
+    ]
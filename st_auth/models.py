@@ -12,3 +12,42 @@ class Geolocation(models.Model):
     ip_address = models.CharField(max_length=24)
     geolocation = models.JSONField()
     signed_up_on_holiday = models.BooleanField(default=None, null=True)
+
+
+class EmailVerification(models.Model):
+    """Tracks the asynchronous email validation of users who signed up pending it."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        VERIFIED = "verified"
+        REJECTED = "rejected"
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="email_verification",
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    result = models.JSONField(default=None, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class HolidayCalendar(models.Model):
+    """Holidays of a country in a year, fetched once from the holiday api."""
+
+    country_code = models.CharField(max_length=2)
+    year = models.PositiveSmallIntegerField()
+    dates = models.JSONField(default=list)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["country_code", "year"],
+                name="holidaycalendar_unique_country_year",
+            ),
+        ]
@@ -0,0 +1,142 @@
+"""
+Runs password hashing in a process pool, so login and signup storms cannot starve the
+request workers of CPU. Callers wait for their hash, at most `PASSWORD_HASHING_WORKERS`
+hashes run and `PASSWORD_HASHING_QUEUE_SIZE` wait at once per process, further calls are
+rejected with a 503.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from logging import getLogger
+
+import django
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions, status
+
+logger = getLogger(__name__)
+
+STATS_KEY = "st_auth:password_hashing:{metric}"
+
+_lock = threading.Lock()
+_executor: ProcessPoolExecutor | None = None
+_executor_pid: int | None = None
+_slots: threading.BoundedSemaphore | None = None
+
+
+class PasswordHashingUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = {"error": "password_hashing_unavailable"}
+    default_code = "password_hashing_unavailable"
+    # Sent as the `Retry-After` header by the DRF exception handler.
+    wait = 1
+
+
+def _get_executor() -> tuple[ProcessPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _executor_pid, _slots
+
+    with _lock:
+        # Pools must not be shared with processes forked after their creation.
+        if _executor is None or _executor_pid != os.getpid():
+            workers = settings.PASSWORD_HASHING_WORKERS
+            # Spawned workers do not inherit the threads of the web server.
+            _executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(
+                workers + settings.PASSWORD_HASHING_QUEUE_SIZE
+            )
+
+        return _executor, _slots
+
+
+def _reset_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+
+    with _lock:
+        if _executor is executor:
+            _executor = None
+
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _call(hasher_class: type, method: str, *args):
+    return getattr(hasher_class(), method)(*args)
+
+
+def run(hasher_class: type, method: str, *args):
+    """
+    Calls `method` of a new `hasher_class` instance with `args` in the pool, or in the
+    calling thread if `PASSWORD_HASHING_WORKERS` is 0. Raises
+    `PasswordHashingUnavailable` if the pool is full or broken.
+    """
+    start = time.monotonic()
+
+    if settings.PASSWORD_HASHING_WORKERS == 0:
+        result = _call(hasher_class, method, *args)
+        _record(method, start)
+        return result
+
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        logger.warning("Password hashing pool is full, rejecting the call.")
+        _incr("rejected")
+        raise PasswordHashingUnavailable()
+
+    try:
+        result = executor.submit(_call, hasher_class, method, *args).result()
+    except BrokenProcessPool as exc:
+        logger.error(f"Password hashing pool is broken, recreating it: {exc}")
+        _reset_executor(executor)
+        _incr("rejected")
+        raise PasswordHashingUnavailable() from exc
+    finally:
+        slots.release()
+
+    _record(method, start)
+    return result
+
+
+def _incr(metric: str, delta: int = 1) -> None:
+    key = STATS_KEY.format(metric=metric)
+    try:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.add(key, delta, timeout=None)
+    except redis.RedisError as e:
+        logger.warning(f"Recording the password hashing metric {metric} failed: {e}")
+
+
+def _record(method: str, start: float) -> None:
+    _incr(method)
+    _incr("milliseconds", round((time.monotonic() - start) * 1000))
+
+
+def get_stats() -> dict:
+    """Counts of the whole deployment, the milliseconds include the queueing time."""
+    metrics = ("encode", "verify", "rejected", "milliseconds")
+    try:
+        stats = cache.get_many([STATS_KEY.format(metric=metric) for metric in metrics])
+    except redis.RedisError as e:
+        logger.warning(f"Reading the password hashing stats failed: {e}")
+        stats = {}
+
+    encode, verify, rejected, milliseconds = (
+        stats.get(STATS_KEY.format(metric=metric), 0) for metric in metrics
+    )
+    return {
+        "encode": encode,
+        "verify": verify,
+        "rejected": rejected,
+        "average_milliseconds": (
+            milliseconds / (encode + verify) if encode + verify else 0.0
+        ),
+    }
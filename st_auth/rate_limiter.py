@@ -0,0 +1,78 @@
+from logging import getLogger
+
+import redis
+
+from social_text.redis_client import get_redis
+
+logger = getLogger(__name__)
+
+TOKEN_BUCKET_KEY = "st_auth:token_bucket:{name}"
+
+# Refills the bucket for the time passed since the last call and takes a token. Returns
+# 0 when a token was taken, otherwise the seconds until the next token. Redis truncates
+# numbers returned by scripts to integers, so the wait is returned as a string. The
+# Redis server clock is used, clocks of the callers may differ.
+ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated_at", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Rate limit `{name}` is exceeded")
+        self.name = name
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.retry_after)
+
+
+class TokenBucket:
+    """
+    Token bucket whose state lives in Redis, so `rate` calls per second are allowed
+    across every gunicorn and Celery worker process, with bursts of up to `capacity`
+    calls.
+
+    Redis errors are logged and let calls through, like in `CircuitBreaker`.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    def acquire(self) -> None:
+        """Takes a token, or raises `RateLimitExceeded` with the wait for the next one."""
+        try:
+            acquire = get_redis().register_script(ACQUIRE_SCRIPT)
+            retry_after = float(
+                acquire(
+                    keys=[TOKEN_BUCKET_KEY.format(name=self.name)],
+                    args=[self.rate, self.capacity],
+                )
+            )
+        except redis.RedisError as exc:
+            logger.warning(f"Token bucket {self.name} cannot take a token: {exc}")
+            return
+
+        if retry_after > 0:
+            raise RateLimitExceeded(self.name, retry_after)
@@ -1,9 +1,11 @@
-from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 
 from .abstractapi_helper import validate_email as validate_email_with_api
-from .models import Geolocation
+from .jwt_helper import RevocableRefreshToken
+from .models import EmailVerification, Geolocation
 
 
 class SignUpSerializer(serializers.ModelSerializer):
@@ -21,10 +23,14 @@ class SignUpSerializer(serializers.ModelSerializer):
         return User.objects.create_user(
             username=validated_data["email"],
             password=validated_data["password"],
+            is_active=validated_data.get("is_active", True),
         )
 
-    @staticmethod
-    def validate_email(email):
+    def validate_email(self, email):
+        # In async mode the email is validated later by the `validate_user_email` task.
+        if not self.context.get("validate_email_with_api", True):
+            return email
+
         validation_response = validate_email_with_api(email)
 
         if validation_response != {"success": email}:
@@ -33,6 +39,10 @@ class SignUpSerializer(serializers.ModelSerializer):
         return email
 
 
+class SignUpPendingResponseSerializer(serializers.Serializer):  # noqa
+    status = serializers.CharField()
+
+
 class TokenResponseSerializer(serializers.Serializer):  # noqa
     access = serializers.CharField()
     refresh = serializers.CharField()
@@ -56,15 +66,38 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ("id", "username")
 
 
-class LoginSerializer(serializers.Serializer):  # noqa
+class LoginCredentialsSerializer(serializers.Serializer):  # noqa
     email = serializers.CharField()
     password = serializers.CharField()
 
+
+class LoginSerializer(LoginCredentialsSerializer):  # noqa
+    """
+    Checks the credentials against the user in the `user` context, which the view loads
+    with `select_related("geolocation", "email_verification")`.
+    """
+
     def validate(self, data):
-        data["username"] = data["email"]
-        user = authenticate(**data)
-        if user:
+        user = self.context["user"]
+        # Like `ModelBackend`, also rehashes the password if the hasher changed.
+        if not user.check_password(data["password"]):
+            raise serializers.ValidationError("Incorrect Credentials")
+
+        if user.is_active:
             return user
+
+        # Users pending email verification are inactive.
+        email_verification = getattr(user, "email_verification", None)
+        if (
+            email_verification
+            and email_verification.status != EmailVerification.Status.VERIFIED
+        ):
+            if email_verification.status == EmailVerification.Status.PENDING:
+                raise serializers.ValidationError(
+                    {"error": "email_verification_pending"}
+                )
+            raise serializers.ValidationError({"error": "email_verification_failed"})
+
         raise serializers.ValidationError("Incorrect Credentials")
 
 
@@ -72,3 +105,20 @@ class LoginResponseSerializer(serializers.Serializer):  # noqa
     user = UserSerializer(read_only=True)
     geolocation = GeolocationSerializer(read_only=True, required=False)
     tokens = TokenResponseSerializer()
+
+
+class LogoutSerializer(serializers.Serializer):  # noqa
+    """Validates the `refresh` token of the user in the `user` context."""
+
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, refresh):
+        try:
+            token = RevocableRefreshToken(refresh)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+
+        if token.get(api_settings.USER_ID_CLAIM) != self.context["user"].pk:
+            raise serializers.ValidationError("Token belongs to another user")
+
+        return token
@@ -1,15 +1,27 @@
 import datetime
+import enum
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 
 import pytz
+import redis
 import requests.exceptions
 from celery import shared_task
+from celery.exceptions import Retry
 from celery.utils.log import get_task_logger
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework import serializers
 
-from .abstractapi_helper import check_signup_date_is_holiday, get_geolocation
-from .models import Geolocation
+from . import geolocation_batch, geolocation_cache
+from .abstractapi_helper import get_geolocation, validate_email
+from .circuit_breaker import CircuitOpenError
+from .holidays import HolidayAPIStatusError, is_holiday
+from .models import EmailVerification, Geolocation
+from .rate_limiter import RateLimitExceeded
 
 logger = get_task_logger(__name__)
 
@@ -27,6 +39,34 @@ class RetryableHTTPStatusException(Exception):
     pass
 
 
+class _FetchFailure(enum.Enum):
+    PERMANENT = "permanent"
+    # The entry is queued again and spends one of its attempts.
+    RETRYABLE = "retryable"
+    # The api cannot be called yet, the entry is queued again without spending one.
+    DEFERRED = "deferred"
+
+
+def _defer(task, exc: CircuitOpenError | RateLimitExceeded, log_prefix: str) -> Retry:
+    """
+    Re-enqueues the task for when the circuit may close again or the rate limit has a
+    token again. Unlike `Task.retry` this does not count as a retry, the api was not
+    called.
+    """
+    message = log_prefix + f"{exc}! Deferring the task by {exc.retry_after} seconds."
+    logger.warning(message)
+
+    request = task.request
+    # Eager runs would apply the deferred task again immediately.
+    if request.called_directly or request.is_eager:
+        raise exc
+
+    task.signature_from_request(
+        request, countdown=exc.retry_after, retries=request.retries
+    ).apply_async()
+    return Retry(message, exc=exc, when=exc.retry_after)
+
+
 @shared_task(
     name="st_auth.tasks.create_user_geolocation",
     bind=True,
@@ -48,9 +88,17 @@ def create_user_geolocation(
         logger.warning(message)
         return message
 
+    geolocation = geolocation_cache.get_geolocation(ip_address)
+    if geolocation is not None:
+        _create_geolocation(user, ip_address, geolocation, signup_date_utc)
+        return log_prefix + "Successfully created geolocation information from cache."
+
     try:
         geolocation_response = get_geolocation(ip_address)
 
+    except (CircuitOpenError, RateLimitExceeded) as exc:
+        raise _defer(self, exc, log_prefix)
+
     except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as exc:
         logger.warning(
             log_prefix
@@ -62,12 +110,8 @@ def create_user_geolocation(
 
     if status_code == HTTPStatus.OK.value:
         geolocation = geolocation_response.json()
-        user_geolocation = Geolocation.objects.create(
-            user=user, ip_address=ip_address, geolocation=geolocation
-        )
-        user_geolocation.save()
-
-        update_is_signup_date_holiday.delay(user_geolocation.user_id, signup_date_utc)
+        geolocation_cache.set_geolocation(ip_address, geolocation)
+        _create_geolocation(user, ip_address, geolocation, signup_date_utc)
 
         return log_prefix + "Successfully created geolocation information."
 
@@ -88,6 +132,71 @@ def create_user_geolocation(
         return message
 
 
+def _create_geolocation(
+    user: User, ip_address: str, geolocation: dict, signup_date_utc: str
+) -> None:
+    """Writes the geolocation once, with `signed_up_on_holiday` already looked up."""
+    signed_up_on_holiday, holiday_error = _lookup_signed_up_on_holiday(
+        user.id, geolocation, signup_date_utc
+    )
+
+    Geolocation.objects.create(
+        user=user,
+        ip_address=ip_address,
+        geolocation=geolocation,
+        signed_up_on_holiday=signed_up_on_holiday,
+    )
+
+    if holiday_error:
+        _update_is_signup_date_holiday_later(
+            user.id, geolocation, signup_date_utc, holiday_error
+        )
+
+
+def _lookup_signed_up_on_holiday(
+    user_id: int, geolocation: dict, signup_date_utc: str
+) -> tuple[bool | None, Exception | None]:
+    """
+    Returns whether the user signed up on a holiday, `None` if unknown, and the error of
+    the holiday api, in which case `update_is_signup_date_holiday` should retry.
+    """
+    try:
+        return _get_signed_up_on_holiday(geolocation, signup_date_utc), None
+
+    except (
+        HolidayAPIStatusError,
+        CircuitOpenError,
+        RateLimitExceeded,
+        requests.exceptions.RequestException,
+    ) as exc:
+        logger.warning(
+            f"User_{user_id}: Holiday lookup failed, deferring it to a task: {exc}!"
+        )
+        return None, exc
+
+    # A malformed payload of the holiday api, retrying would get the same one.
+    except (KeyError, TypeError, ValueError) as exc:
+        logger.error(
+            f"User_{user_id}: Holiday api answered a malformed payload, "
+            f"leaving the holiday unknown: {exc!r}!"
+        )
+        return None, None
+
+
+def _update_is_signup_date_holiday_later(
+    user_id: int, geolocation: dict, signup_date_utc: str, holiday_error: Exception
+) -> None:
+    update_is_signup_date_holiday.apply_async(
+        args=(user_id, signup_date_utc),
+        kwargs={
+            "country_code": geolocation["country_code"],
+            "timezone_name": geolocation["timezone"]["name"],
+        },
+        # Open circuits and exceeded rate limits tell when the api can be called again.
+        countdown=getattr(holiday_error, "retry_after", None),
+    )
+
+
 @shared_task(
     name="st_auth.tasks.update_is_signup_date_holiday",
     bind=True,
@@ -97,28 +206,40 @@ def create_user_geolocation(
     retry_backoff=settings.CELERY_RETRY_BACKOFF,
 )
 def update_is_signup_date_holiday(
-    self, geolocation_user_id: int, signup_date_utc
+    self,
+    geolocation_user_id: int,
+    signup_date_utc: str,
+    country_code: str | None = None,
+    timezone_name: str | None = None,
 ) -> str:
-    # TODO: Refactor this and above task to use common code (DRY)
+    """
+    Retries the holiday lookup of geolocations created while the holiday api failed.
+    `create_user_geolocation` sets `signed_up_on_holiday` itself otherwise.
+    """
     log_prefix = f"Geolocation_{geolocation_user_id}: "
 
-    user_geolocation = Geolocation.objects.filter(id=geolocation_user_id).first()
-    if not user_geolocation:
-        message = (
-            log_prefix
-            + "Geolocation cannot be found in DB! Skipping holiday column update."
-        )
-        logger.warning(message)
-        return message
+    # Messages queued before the country and timezone were part of the payload.
+    if country_code is None or timezone_name is None:
+        user_geolocation = Geolocation.objects.filter(pk=geolocation_user_id).first()
+        if not user_geolocation:
+            message = (
+                log_prefix
+                + "Geolocation cannot be found in DB! Skipping holiday column update."
+            )
+            logger.warning(message)
+            return message
 
-    try:
         country_code = user_geolocation.geolocation["country_code"]
+        timezone_name = user_geolocation.geolocation["timezone"]["name"]
+
+    try:
         signup_date_user_country = convert_utc_to_user_time(
-            signup_date_utc, user_geolocation.geolocation["timezone"]["name"]
-        )
-        holiday_response = check_signup_date_is_holiday(
-            country_code, signup_date_user_country
+            signup_date_utc, timezone_name
         )
+        signed_up_on_holiday = is_holiday(country_code, signup_date_user_country.date())
+
+    except (CircuitOpenError, RateLimitExceeded) as exc:
+        raise _defer(self, exc, log_prefix)
 
     except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as exc:
         logger.warning(
@@ -126,30 +247,319 @@ def update_is_signup_date_holiday(
         )
         raise self.retry(exc=exc)
 
-    status_code = holiday_response.status_code
-
-    if status_code == HTTPStatus.OK.value:
-        user_geolocation.signed_up_on_holiday = holiday_response.json() != []
-        user_geolocation.save()
+    except HolidayAPIStatusError as exc:
+        if exc.status_code in RETRYABLE_STATUS_CODES:
+            message = (
+                log_prefix
+                + f"Holiday api returned a retryable status code - {exc.status_code}."
+            )
+            logger.warning(message)
+            raise self.retry(exc=RetryableHTTPStatusException(message))
 
-        return log_prefix + "Successfully updated holiday information."
+        message = (
+            log_prefix
+            + f"Holiday api response status code {exc.status_code} is not good to retry."
+        )
+        logger.warning(message)
+        return message
 
-    elif status_code in RETRYABLE_STATUS_CODES:
+    updated = Geolocation.objects.filter(pk=geolocation_user_id).update(
+        signed_up_on_holiday=signed_up_on_holiday
+    )
+    if not updated:
         message = (
             log_prefix
-            + f"Holiday api returned a retryable status code - {status_code}."
+            + "Geolocation cannot be found in DB! Skipping holiday column update."
         )
         logger.warning(message)
-        raise self.retry(exc=RetryableHTTPStatusException(message))
+        return message
 
-    else:
+    return log_prefix + "Successfully updated holiday information."
+
+
+@shared_task(
+    name="st_auth.tasks.validate_user_email",
+    bind=True,
+    acks_late=True,
+    max_retries=settings.CELERY_MAX_RETRIES,
+    default_retry_delay=settings.CELERY_DELAY_BETWEEN_RETRIES,
+    retry_backoff=settings.CELERY_RETRY_BACKOFF,
+)
+def validate_user_email(self, user_id: int) -> str:
+    log_prefix = f"User_{user_id}: "
+
+    email_verification = (
+        EmailVerification.objects.select_related("user")
+        .filter(user_id=user_id, status=EmailVerification.Status.PENDING)
+        .first()
+    )
+    if not email_verification:
         message = (
             log_prefix
-            + f"Holiday api response status code {status_code} is not good to retry."
+            + "Pending email verification cannot be found in DB! Skipping email validation."
         )
         logger.warning(message)
         return message
 
+    email = email_verification.user.username
+
+    try:
+        validation_response = validate_email(email)
+
+    except serializers.ValidationError as exc:
+        if isinstance(exc.__cause__, (CircuitOpenError, RateLimitExceeded)):
+            raise _defer(self, exc.__cause__, log_prefix)
+
+        # `validate_email` only raises when the gateway call itself failed.
+        message = log_prefix + f"Email validation api call failed: {exc.detail}!"
+        logger.warning(message)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=RetryableHTTPStatusException(message))
+
+        # Out of retries, the verification would otherwise stay pending forever.
+        email_verification.status = EmailVerification.Status.REJECTED
+        email_verification.result = exc.detail
+        email_verification.save(update_fields=["status", "result", "updated_at"])
+
+        message = (
+            log_prefix + "Email validation ran out of retries, rejected the email."
+        )
+        logger.error(message)
+        return message
+
+    email_verification.result = validation_response
+
+    if validation_response == {"success": email}:
+        with transaction.atomic():
+            email_verification.status = EmailVerification.Status.VERIFIED
+            email_verification.save(update_fields=["status", "result", "updated_at"])
+            User.objects.filter(id=user_id).update(is_active=True)
+
+        return log_prefix + "Successfully verified email and activated user."
+
+    email_verification.status = EmailVerification.Status.REJECTED
+    email_verification.save(update_fields=["status", "result", "updated_at"])
+
+    message = log_prefix + f"Email was rejected: {validation_response}."
+    logger.warning(message)
+    return message
+
+
+def enqueue_user_geolocation(
+    user_id: int, ip_address: str, signup_date_utc: str
+) -> None:
+    """
+    Creates the geolocation of a new user with `create_user_geolocation`, or queues it
+    for `process_geolocation_batch` in batch mode.
+    """
+    if not settings.GEOLOCATION_BATCH_MODE:
+        create_user_geolocation.delay(user_id, ip_address, signup_date_utc)
+        return
+
+    entry = {
+        "user_id": user_id,
+        "ip_address": ip_address,
+        "signup_date_utc": signup_date_utc,
+        "attempts": 0,
+    }
+    try:
+        queue_length = geolocation_batch.push([entry])
+    except redis.RedisError as exc:
+        logger.warning(f"User_{user_id}: Queueing geolocation failed: {exc}!")
+        create_user_geolocation.delay(user_id, ip_address, signup_date_utc)
+        return
+
+    if queue_length % settings.GEOLOCATION_BATCH_SIZE == 0:
+        process_geolocation_batch.delay()
+
+
+@shared_task(name="st_auth.tasks.process_geolocation_batch", acks_late=True)
+def process_geolocation_batch() -> str:
+    lock = geolocation_batch.lock(settings.GEOLOCATION_BATCH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return "Geolocation batch queue is processed by another run."
+
+    try:
+        # Entries of a failed or crashed run, left unacknowledged.
+        requeued = geolocation_batch.requeue_unacked(
+            settings.GEOLOCATION_BATCH_MAX_ATTEMPTS
+        )
+        if requeued:
+            logger.warning(f"Queued {requeued} unprocessed geolocations again.")
+
+        # Entries queued again by this run are left to the next one.
+        remaining = geolocation_batch.length()
+        created = 0
+
+        while remaining > 0:
+            # Each chunk gets a full lock timeout, and has to end within half of it.
+            try:
+                lock.reacquire()
+            except redis.exceptions.LockError:
+                logger.warning("Geolocation batch lock expired, ending the run.")
+                break
+            deadline = time.monotonic() + settings.GEOLOCATION_BATCH_LOCK_TIMEOUT / 2
+
+            entries = geolocation_batch.pop(
+                min(remaining, settings.GEOLOCATION_BATCH_SIZE)
+            )
+            if not entries:
+                break
+
+            remaining -= len(entries)
+            chunk_created, deferred = _create_geolocations(entries, deadline)
+            created += chunk_created
+            geolocation_batch.ack(entries)
+
+            if deferred:
+                # The rest of the queue would be deferred too, it waits for the next run.
+                break
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            logger.warning("Geolocation batch lock expired before the run ended.")
+
+    return f"Successfully created {created} geolocations from the batch queue."
+
+
+def _create_geolocations(entries: list[dict], deadline: float) -> tuple[int, bool]:
+    """Returns the number of created geolocations and whether entries were deferred."""
+    entries_by_user_id = {entry["user_id"]: entry for entry in entries}
+    user_ids = (
+        User.objects.filter(id__in=entries_by_user_id, geolocation__isnull=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+    geolocations = {}
+    entries_to_fetch = []
+    for user_id in user_ids:
+        entry = entries_by_user_id[user_id]
+        geolocation = geolocation_cache.get_geolocation(entry["ip_address"])
+        if geolocation is None:
+            entries_to_fetch.append(entry)
+        else:
+            geolocations[user_id] = geolocation
+
+    entries_to_retry = []
+    deferred = False
+    with ThreadPoolExecutor(settings.GEOLOCATION_BATCH_CONCURRENCY) as executor:
+        results = executor.map(
+            functools.partial(_fetch_geolocation, deadline=deadline),
+            [entry["ip_address"] for entry in entries_to_fetch],
+        )
+        for entry, (geolocation, failure) in zip(entries_to_fetch, results):
+            if geolocation is not None:
+                geolocations[entry["user_id"]] = geolocation
+            elif failure == _FetchFailure.DEFERRED:
+                deferred = True
+                entries_to_retry.append(entry)
+            elif (
+                failure == _FetchFailure.RETRYABLE
+                and entry["attempts"] + 1 < settings.GEOLOCATION_BATCH_MAX_ATTEMPTS
+            ):
+                entries_to_retry.append({**entry, "attempts": entry["attempts"] + 1})
+
+    user_geolocations = []
+    holidays_to_update = []
+    for user_id, geolocation in geolocations.items():
+        entry = entries_by_user_id[user_id]
+        signed_up_on_holiday, holiday_error = _lookup_signed_up_on_holiday(
+            user_id, geolocation, entry["signup_date_utc"]
+        )
+        if holiday_error:
+            holidays_to_update.append((entry, holiday_error))
+
+        user_geolocations.append(
+            Geolocation(
+                user_id=user_id,
+                ip_address=entry["ip_address"],
+                geolocation=geolocation,
+                signed_up_on_holiday=signed_up_on_holiday,
+            )
+        )
+
+    Geolocation.objects.bulk_create(user_geolocations, ignore_conflicts=True)
+
+    for entry, holiday_error in holidays_to_update:
+        _update_is_signup_date_holiday_later(
+            entry["user_id"],
+            geolocations[entry["user_id"]],
+            entry["signup_date_utc"],
+            holiday_error,
+        )
+
+    if entries_to_retry:
+        geolocation_batch.push(entries_to_retry)
+
+    return len(user_geolocations), deferred
+
+
+def _fetch_geolocation(
+    ip_address: str, deadline: float
+) -> tuple[dict | None, _FetchFailure | None]:
+    """Returns the geolocation, or `None` and the kind of failure."""
+    log_prefix = f"{ip_address}: "
+
+    try:
+        geolocation_response = _wait_and_get_geolocation(ip_address, deadline)
+
+    except (CircuitOpenError, RateLimitExceeded) as exc:
+        # Like `create_user_geolocation`, an open circuit does not spend a retry.
+        logger.warning(log_prefix + f"Deferring geolocation: {exc}!")
+        return None, _FetchFailure.DEFERRED
+
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as exc:
+        logger.warning(
+            log_prefix
+            + f"Request to geolocation api raised retryable exception: {exc}!"
+        )
+        return None, _FetchFailure.RETRYABLE
+
+    status_code = geolocation_response.status_code
+
+    if status_code == HTTPStatus.OK.value:
+        geolocation = geolocation_response.json()
+        geolocation_cache.set_geolocation(ip_address, geolocation)
+        return geolocation, None
+
+    logger.warning(
+        log_prefix + f"Geolocation api response status code is {status_code}."
+    )
+    if status_code in RETRYABLE_STATUS_CODES:
+        return None, _FetchFailure.RETRYABLE
+    return None, _FetchFailure.PERMANENT
+
+
+def _wait_and_get_geolocation(ip_address: str, deadline: float) -> requests.Response:
+    """
+    The batch runs in the background, so it waits for the rate limit instead of queueing
+    the entry again, unless the wait would outlast the `deadline` of its chunk.
+    """
+    while True:
+        try:
+            return get_geolocation(ip_address)
+        except RateLimitExceeded as exc:
+            if time.monotonic() + exc.retry_after > deadline:
+                raise
+
+            time.sleep(exc.retry_after)
+
+
+def _get_signed_up_on_holiday(geolocation: dict, signup_date_utc: str) -> bool | None:
+    """Returns `None` if the geolocation lacks the country or timezone."""
+    try:
+        country_code = geolocation["country_code"]
+        signup_date_user_country = convert_utc_to_user_time(
+            signup_date_utc, geolocation["timezone"]["name"]
+        )
+    except (KeyError, TypeError, pytz.UnknownTimeZoneError) as exc:
+        logger.warning(f"Geolocation has no usable country or timezone: {exc}!")
+        return None
+
+    return is_holiday(country_code, signup_date_user_country.date())
+
 
 def convert_utc_to_user_time(signup_date_utc: str, timezone_name: str):
     signup_date_utc = datetime.datetime.strptime(signup_date_utc, "%Y-%m-%d %H:%M:%S")
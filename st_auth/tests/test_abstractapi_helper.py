@@ -1,39 +1,72 @@
-import datetime
 from http.client import HTTPException
-from unittest.mock import patch
+from unittest.mock import PropertyMock, patch
 
+import httpx
 import pytest
+import redis
+from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import cache
 from rest_framework import serializers
 
 from ..abstractapi_helper import (
-    check_signup_date_is_holiday,
+    AbstractAPIClient,
+    avalidate_email,
+    email_client,
     get_geolocation,
+    get_holidays,
     validate_email,
 )
+from ..rate_limiter import TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def redis_mock():
+    with patch("st_auth.circuit_breaker.get_redis") as get_redis_mock, patch(
+        "st_auth.rate_limiter.get_redis", get_redis_mock
+    ):
+        # Closed circuit: no `open` key and no `tripped` key.
+        get_redis_mock.return_value.pipeline.return_value.execute.return_value = [-2, 0]
+        # A token is available.
+        get_redis_mock.return_value.register_script.return_value.return_value = b"0"
+        yield get_redis_mock.return_value
+
+
+@pytest.fixture
+def session_mock():
+    with patch.object(
+        AbstractAPIClient, "session", new_callable=PropertyMock
+    ) as session_property_mock:
+        session_property_mock.return_value.get.return_value.status_code = 200
+        yield session_property_mock.return_value
 
 
-@patch("st_auth.abstractapi_helper.requests")
 class TestValidateEmail:
-    def test_validation_succeeds(self, requests_mock):
+    def test_validation_succeeds(self, session_mock):
         email = "fredymercury@gmail.com"
-        requests_mock.get.return_value.json.return_value = {
+        session_mock.get.return_value.json.return_value = {
             "email": "fredymercury@gmail.com",
             "autocorrect": "",
             "deliverability": "DELIVERABLE",
             "quality_score": "0.95",
             "is_valid_format": {"value": True, "text": "TRUE"},
         }
-        url = f"{settings.ABSTRACT_API_EMAIL_URL}?api_key={settings.ABSTRACT_API_EMAIL_KEY}&email={email}"
 
         result = validate_email(email)
-        requests_mock.get.assert_called_once_with(url)
+        session_mock.get.assert_called_once_with(
+            settings.ABSTRACT_API_EMAIL_URL,
+            params={"api_key": settings.ABSTRACT_API_EMAIL_KEY, "email": email},
+            timeout=(
+                settings.ABSTRACT_API_EMAIL_CONNECT_TIMEOUT,
+                settings.ABSTRACT_API_EMAIL_READ_TIMEOUT,
+            ),
+        )
         assert result == {"success": email}
 
-    def test_request_raises_exception(self, requests_mock):
+    def test_request_raises_exception(self, session_mock):
         email = "fredymercury@gmail.com"
         error_message = "500: API call failed"
-        requests_mock.get.side_effect = HTTPException(error_message)
+        session_mock.get.side_effect = HTTPException(error_message)
         with pytest.raises(serializers.ValidationError) as error:
             _ = validate_email(email)
 
@@ -41,7 +74,7 @@ class TestValidateEmail:
             "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` failed: {error_message}"
         }
 
-    def test_response_data_invalid(self, requests_mock):
+    def test_response_data_invalid(self, session_mock):
         email = "fredymercury@gmail.com"
         return_dict = {
             "email": "fredymercury@gmail.com",
@@ -50,7 +83,7 @@ class TestValidateEmail:
             "quality_score": "0.95",
             "is_valid_format": {},
         }
-        requests_mock.get.return_value.json.return_value = return_dict
+        session_mock.get.return_value.json.return_value = return_dict
 
         with pytest.raises(serializers.ValidationError) as error:
             _ = validate_email(email)
@@ -59,9 +92,9 @@ class TestValidateEmail:
             "validation_error": f"Bad response from gateway {settings.ABSTRACT_API_EMAIL_URL}:\n{return_dict}"
         }
 
-    def test_invalid_email_format(self, requests_mock):
+    def test_invalid_email_format(self, session_mock):
         email = "fredymercury"
-        requests_mock.get.return_value.json.return_value = {
+        session_mock.get.return_value.json.return_value = {
             "email": "fredymercury",
             "autocorrect": "",
             "deliverability": "UNDELIVERABLE",
@@ -72,9 +105,9 @@ class TestValidateEmail:
         result = validate_email(email)
         assert result == {"validation_error": "invalid_email_format"}
 
-    def test_auto_correct_suggested(self, requests_mock):
+    def test_auto_correct_suggested(self, session_mock):
         email = "fredymercury@gmal.com"
-        requests_mock.get.return_value.json.return_value = {
+        session_mock.get.return_value.json.return_value = {
             "email": "fredymercury@gmal.com",
             "autocorrect": "fredymercury@gmail.com",
             "deliverability": "UNDELIVERABLE",
@@ -85,9 +118,9 @@ class TestValidateEmail:
         result = validate_email(email)
         assert result == {"did_you_mean": "fredymercury@gmail.com"}
 
-    def test_unusable_email(self, requests_mock):
+    def test_unusable_email(self, session_mock):
         email = "fredymercury@gmail.com"
-        requests_mock.get.return_value.json.return_value = {
+        session_mock.get.return_value.json.return_value = {
             "email": "fredymercury@gmail.com",
             "autocorrect": "",
             "deliverability": "UNDELIVERABLE",
@@ -99,19 +132,294 @@ class TestValidateEmail:
         assert result == {"validation_error": "unusable_email"}
 
 
-@patch("st_auth.abstractapi_helper.requests")
-def test_get_geolocation(requests_mock):
+def test_validate_email_fails_fast_when_circuit_is_open(session_mock, redis_mock):
+    redis_mock.pipeline.return_value.execute.return_value = [10_000, 1]
+
+    with pytest.raises(serializers.ValidationError) as error:
+        validate_email("fredymercury@gmail.com")
+
+    session_mock.get.assert_not_called()
+    assert error.value.detail == {
+        "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` failed: "
+        "Circuit breaker `abstractapi_email` is open"
+    }
+
+
+@patch.object(
+    email_client, "rate_limiter", TokenBucket("abstractapi_email", rate=1, capacity=1)
+)
+@patch("st_auth.abstractapi_helper.time")
+def test_validate_email_fails_when_rate_limit_wait_is_too_long(
+    time_mock, session_mock, redis_mock
+):
+    time_mock.monotonic.return_value = 100
+    redis_mock.register_script.return_value.side_effect = [b"0.5", b"0.5", b"5"]
+
+    with pytest.raises(serializers.ValidationError) as error:
+        validate_email("fredymercury@gmail.com")
+
+    assert time_mock.sleep.call_count == 2
+    session_mock.get.assert_not_called()
+    assert error.value.detail == {
+        "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` failed: "
+        "Rate limit `abstractapi_email` is exceeded"
+    }
+
+
+class TestValidateEmailCache:
+    def test_success_is_cached_by_normalized_email(self, session_mock):
+        session_mock.get.return_value.json.return_value = {
+            "email": "fredymercury@gmail.com",
+            "autocorrect": "",
+            "deliverability": "DELIVERABLE",
+            "quality_score": "0.95",
+            "is_valid_format": {"value": True, "text": "TRUE"},
+        }
+
+        assert validate_email("fredymercury@gmail.com") == {
+            "success": "fredymercury@gmail.com"
+        }
+        assert cache.get("st_auth:email_validation:fredymercury@gmail.com") == {
+            "success": "fredymercury@gmail.com"
+        }
+
+        session_mock.reset_mock()
+        assert validate_email("fredymercury@gmail.com") == {
+            "success": "fredymercury@gmail.com"
+        }
+        assert validate_email(" FredyMercury@gmail.com") == {
+            "success": " FredyMercury@gmail.com"
+        }
+        session_mock.get.assert_not_called()
+
+    def test_failure_is_cached_with_negative_timeout(self, session_mock, settings):
+        session_mock.get.return_value.json.return_value = {
+            "email": "fredymercury@gmail.com",
+            "autocorrect": "",
+            "deliverability": "UNDELIVERABLE",
+            "quality_score": "0.00",
+            "is_valid_format": {"value": True, "text": "TRUE"},
+        }
+
+        with patch("st_auth.abstractapi_helper.cache") as cache_mock:
+            cache_mock.get.return_value = None
+            validate_email("fredymercury@gmail.com")
+
+        cache_mock.set.assert_called_once_with(
+            "st_auth:email_validation:fredymercury@gmail.com",
+            {"validation_error": "unusable_email"},
+            timeout=settings.ABSTRACT_API_EMAIL_NEGATIVE_CACHE_TIMEOUT,
+        )
+
+    def test_gateway_error_is_not_cached(self, session_mock):
+        session_mock.get.side_effect = HTTPException("500: API call failed")
+
+        with pytest.raises(serializers.ValidationError):
+            validate_email("fredymercury@gmail.com")
+
+        session_mock.get.side_effect = None
+        session_mock.get.return_value.json.return_value = {
+            "email": "fredymercury@gmail.com",
+            "autocorrect": "",
+            "deliverability": "DELIVERABLE",
+            "quality_score": "0.95",
+            "is_valid_format": {"value": True, "text": "TRUE"},
+        }
+
+        assert validate_email("fredymercury@gmail.com") == {
+            "success": "fredymercury@gmail.com"
+        }
+        assert session_mock.get.call_count == 2
+
+    @patch("st_auth.abstractapi_helper.cache")
+    def test_cache_errors_are_ignored(self, cache_mock, session_mock):
+        cache_mock.get.side_effect = redis.ConnectionError
+        cache_mock.set.side_effect = redis.ConnectionError
+        session_mock.get.return_value.json.return_value = {
+            "email": "fredymercury@gmail.com",
+            "autocorrect": "",
+            "deliverability": "DELIVERABLE",
+            "quality_score": "0.95",
+            "is_valid_format": {"value": True, "text": "TRUE"},
+        }
+
+        assert validate_email("fredymercury@gmail.com") == {
+            "success": "fredymercury@gmail.com"
+        }
+
+
+def test_get_geolocation(session_mock):
     get_geolocation("1.1.1.1")
-    assert "1.1.1.1" in requests_mock.get.call_args_list[0].args[0]
+    assert session_mock.get.call_args.kwargs["params"] == {
+        "api_key": settings.ABSTRACT_API_GEOLOCATION_KEY,
+        "ip_address": "1.1.1.1",
+    }
+
+
+def test_get_holidays(session_mock):
+    get_holidays("US", 2023)
+
+    assert session_mock.get.call_args.kwargs["params"] == {
+        "api_key": settings.ABSTRACT_API_HOLIDAY_KEY,
+        "country": "US",
+        "year": 2023,
+    }
+
+
+class TestAbstractAPIClient:
+    def test_session_is_reused(self):
+        client = AbstractAPIClient(
+            "https://api.test/", "key", connect_timeout=1, read_timeout=2, retries=3
+        )
+
+        session = client.session
+        assert client.session is session
+
+        adapter = session.get_adapter("https://api.test/")
+        assert adapter.max_retries.total == 3
+        assert adapter.max_retries.raise_on_status is False
+        assert 429 not in adapter.max_retries.status_forcelist
+
+    def test_session_is_recreated_after_fork(self):
+        client = AbstractAPIClient(
+            "https://api.test/", "key", connect_timeout=1, read_timeout=2, retries=3
+        )
+        session = client.session
+
+        with patch("st_auth.abstractapi_helper.os.getpid", return_value=-1):
+            assert client.session is not session
+
+    def test_get_is_bounded_by_timeouts(self):
+        client = AbstractAPIClient(
+            "https://api.test/", "key", connect_timeout=1, read_timeout=2, retries=3
+        )
+
+        with patch.object(client, "_create_session") as create_session_mock:
+            client.get(email="user1@domain.com")
+
+        create_session_mock.return_value.get.assert_called_once_with(
+            "https://api.test/",
+            params={"api_key": "key", "email": "user1@domain.com"},
+            timeout=(1, 2),
+        )
+
+
+def _async_client_mock(monkeypatch, client: AbstractAPIClient, responses: list) -> list:
+    """Serves `responses` in order to the async client, returns the sent requests."""
+    requests_sent = []
+
+    def handler(request):
+        requests_sent.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(
+        client,
+        "_create_async_client",
+        lambda: httpx.AsyncClient(transport=transport),
+    )
+    return requests_sent
+
+
+class TestAbstractAPIClientAsync:
+    @pytest.fixture
+    def client(self):
+        return AbstractAPIClient(
+            "https://api.test/",
+            "key",
+            connect_timeout=1,
+            read_timeout=2,
+            retries=2,
+            backoff_factor=0,
+        )
+
+    def test_async_client_is_reused_per_event_loop(self, client):
+        async def get_async_client():
+            return client.async_client, client.async_client
+
+        first, second = async_to_sync(get_async_client)()
+        assert first is second
+        assert first.timeout == httpx.Timeout(2, connect=1)
+
+        other_loop_client, _ = async_to_sync(get_async_client)()
+        assert other_loop_client is not first
+
+    def test_retryable_status_codes_are_retried(self, client, monkeypatch):
+        requests_sent = _async_client_mock(
+            monkeypatch,
+            client,
+            [httpx.Response(503), httpx.ConnectError("down"), httpx.Response(200)],
+        )
+
+        response = async_to_sync(client.aget)(email="user1@domain.com")
+
+        assert response.status_code == 200
+        assert len(requests_sent) == 3
+        assert requests_sent[0].url.params == httpx.QueryParams(
+            api_key="key", email="user1@domain.com"
+        )
+
+    def test_last_response_is_returned(self, client, monkeypatch):
+        _async_client_mock(monkeypatch, client, [httpx.Response(503) for _ in range(3)])
+
+        response = async_to_sync(client.aget)(email="user1@domain.com")
+
+        assert response.status_code == 503
+
+    def test_too_many_requests_is_not_retried(self, client, monkeypatch):
+        requests_sent = _async_client_mock(monkeypatch, client, [httpx.Response(429)])
+
+        response = async_to_sync(client.aget)(email="user1@domain.com")
+
+        assert response.status_code == 429
+        assert len(requests_sent) == 1
+
+    def test_transport_errors_are_raised_after_retries(self, client, monkeypatch):
+        _async_client_mock(
+            monkeypatch, client, [httpx.ReadTimeout("slow") for _ in range(3)]
+        )
+
+        with pytest.raises(httpx.ReadTimeout):
+            async_to_sync(client.aget)(email="user1@domain.com")
+
+
+def test_avalidate_email_calls_the_api_without_blocking(monkeypatch):
+    email = "fredymercury@gmail.com"
+    requests_sent = _async_client_mock(
+        monkeypatch,
+        email_client,
+        [
+            httpx.Response(
+                200,
+                json={
+                    "email": email,
+                    "autocorrect": "",
+                    "deliverability": "DELIVERABLE",
+                    "quality_score": "0.95",
+                    "is_valid_format": {"value": True, "text": "TRUE"},
+                },
+            )
+        ],
+    )
+
+    assert async_to_sync(avalidate_email)(email) == {"success": email}
+    # Served from the cache.
+    assert async_to_sync(avalidate_email)(email) == {"success": email}
+    assert len(requests_sent) == 1
+
 
+def test_avalidate_email_fails_fast_when_circuit_is_open(monkeypatch, redis_mock):
+    redis_mock.pipeline.return_value.execute.return_value = [10_000, 1]
+    requests_sent = _async_client_mock(monkeypatch, email_client, [])
 
-@patch("st_auth.abstractapi_helper.requests")
-def test_check_signup_date_is_holiday(requests_mock):
-    date_ = datetime.datetime(2023, 9, 23)
-    check_signup_date_is_holiday("US", date_)
-    request_call_arg = requests_mock.get.call_args_list[0].args[0]
+    with pytest.raises(serializers.ValidationError) as error:
+        async_to_sync(avalidate_email)("fredymercury@gmail.com")
 
-    assert "country=US" in request_call_arg
-    assert "year=2023" in request_call_arg
-    assert "month=9" in request_call_arg
-    assert "day=23" in request_call_arg
+    assert not requests_sent
+    assert error.value.detail == {
+        "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` failed: "
+        "Circuit breaker `abstractapi_email` is open"
+    }
@@ -0,0 +1,124 @@
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+
+from ..abstractapi_helper import _analyze_email_response
+from ..abstractapi_simulator import SimulatorConfig, create_app
+
+
+def _get(app, path: str, **params) -> httpx.Response:
+    async def get():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://simulator"
+        ) as client:
+            return await client.get(path, params={"api_key": "key", **params})
+
+    return async_to_sync(get)()
+
+
+@pytest.fixture
+def app():
+    return create_app(SimulatorConfig(latency=0, seed=1))
+
+
+class TestEmailValidation:
+    def test_email_is_deliverable(self, app):
+        response = _get(app, "/email/", email="user1@domain.com")
+
+        assert response.status_code == 200
+        assert _analyze_email_response(response.json()) == {
+            "success": "user1@domain.com"
+        }
+
+    @pytest.mark.parametrize(
+        "email, result",
+        [
+            ("user1", {"validation_error": "invalid_email_format"}),
+            ("user1@gmial.com", {"did_you_mean": "user1@gmail.com"}),
+            ("user1@domain.invalid", {"validation_error": "unusable_email"}),
+            ("undeliverable@domain.com", {"validation_error": "unusable_email"}),
+            ("unknown@domain.com", {"validation_error": "unusable_email"}),
+        ],
+    )
+    def test_email_is_rejected(self, app, email, result):
+        response = _get(app, "/email/", email=email)
+
+        assert _analyze_email_response(response.json()) == result
+
+
+class TestGeolocation:
+    def test_geolocation_is_deterministic(self, app):
+        first = _get(app, "/geolocation/", ip_address="8.8.8.8").json()
+        second = _get(app, "/geolocation/", ip_address="8.8.8.8").json()
+
+        assert first["country_code"] == second["country_code"]
+        assert first["latitude"] == second["latitude"]
+        assert first["timezone"]["name"]
+
+    def test_private_address_has_no_location(self, app):
+        response = _get(app, "/geolocation/", ip_address="192.168.1.1")
+
+        assert response.json()["country_code"] is None
+
+    def test_invalid_address(self, app):
+        response = _get(app, "/geolocation/", ip_address="invalid")
+
+        assert response.status_code == 400
+
+
+class TestHolidays:
+    def test_holidays_of_the_year(self, app):
+        response = _get(app, "/holiday/", country="TR", year="2023")
+
+        holidays = response.json()
+        assert len(holidays) == 7
+        assert holidays[-1]["name"] == "Republic Day"
+        assert holidays[-1]["date"] == "10/29/2023"
+        assert (holidays[-1]["date_month"], holidays[-1]["date_day"]) == ("10", "29")
+
+    def test_holidays_of_the_day(self, app):
+        response = _get(app, "/holiday/", country="US", year="2023", month=7, day=4)
+
+        assert [holiday["name"] for holiday in response.json()] == ["Independence Day"]
+
+    def test_unknown_country_has_no_holidays(self, app):
+        assert _get(app, "/holiday/", country="XX", year="2023").json() == []
+
+
+class TestFaultInjection:
+    def test_missing_api_key_is_unauthorized(self, app):
+        async def get():
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://simulator"
+            ) as client:
+                return await client.get("/email/", params={"email": "a@b.com"})
+
+        assert async_to_sync(get)().status_code == 401
+
+    def test_rate_limit(self):
+        app = create_app(SimulatorConfig(latency=0, rate_limit_rate=1))
+
+        response = _get(app, "/email/", email="user1@domain.com")
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+
+    def test_errors(self):
+        app = create_app(SimulatorConfig(latency=0, error_rate=1))
+
+        assert _get(app, "/geolocation/", ip_address="8.8.8.8").status_code == 503
+
+    def test_timeouts(self):
+        app = create_app(SimulatorConfig(latency=0, timeout_rate=1, timeout_delay=0))
+
+        assert _get(app, "/holiday/", country="TR").status_code == 504
+
+    def test_stats(self):
+        app = create_app(SimulatorConfig(latency=0, error_rate=0.5, seed=1))
+        for _ in range(10):
+            _get(app, "/email/", email="user1@domain.com")
+
+        stats = _get(app, "/stats").json()
+
+        assert stats["email:200"] + stats["email:503"] == 10
+        assert stats["email:503"] > 0
@@ -3,12 +3,26 @@ from unittest.mock import Mock, patch
 
 import pytest
 from django.contrib.auth.models import AnonymousUser, User
+from django.db import IntegrityError
 from django.test import RequestFactory
 from django.urls import reverse
 from rest_framework.exceptions import ErrorDetail
-
-from ..api import _get_ip_address_from_request, login, signup
-from ..models import Geolocation
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..api import (
+    _create_user,
+    _get_ip_address_from_request,
+    login,
+    logout,
+    logout_all,
+    signup,
+)
+from ..jwt_helper import get_tokens_for_user
+from ..models import EmailVerification, Geolocation
+from ..password_pool import PasswordHashingUnavailable
+from ..serializers import SignUpSerializer
+from ..token_revocation import TokenRevocationUnavailable
 
 
 @pytest.fixture
@@ -39,8 +53,8 @@ def db_user_1_with_geolocation(db_user_1, db_geolocation_1):
 class TestSignupView:
     factory = RequestFactory()
 
-    @patch("st_auth.api.create_user_geolocation")
-    def test_signup_new_user(self, create_user_geolocation_mock, validate_email_mock):
+    @patch("st_auth.api.enqueue_user_geolocation")
+    def test_signup_new_user(self, enqueue_user_geolocation_mock, validate_email_mock):
         validate_email_mock.return_value = {"success": "user1@domain.com"}
         url = reverse("auth_signup")
         request = self.factory.post(
@@ -56,10 +70,13 @@ class TestSignupView:
         assert "access" in response.data
 
         validate_email_mock.assert_called_once_with("user1@domain.com")
-        create_user_geolocation_mock.delay.assert_called_once()
+        enqueue_user_geolocation_mock.assert_called_once()
 
     @pytest.mark.usefixtures("db_user_1")
-    def test_signup_existing_user(self, validate_email_mock):
+    @patch("st_auth.api.enqueue_user_geolocation")
+    def test_signup_existing_user(
+        self, enqueue_user_geolocation_mock, validate_email_mock
+    ):
         validate_email_mock.return_value = {"success": "user1@domain.com"}
         url = reverse("auth_signup")
         request = self.factory.post(
@@ -72,6 +89,8 @@ class TestSignupView:
 
         assert response.status_code == HTTPStatus.BAD_REQUEST.value
         assert response.data == {"error": "user_already_exists"}
+        validate_email_mock.assert_not_called()
+        enqueue_user_geolocation_mock.assert_not_called()
 
     def test_email_validation_fails_with_did_you_mean(self, validate_email_mock):
         validate_email_mock.return_value = {"did_you_mean": "user123@domain.com"}
@@ -108,6 +127,84 @@ class TestSignupView:
         logger_mock.warning.assert_called_once()
 
 
+@pytest.mark.django_db
+class TestCreateUser:
+    @pytest.fixture
+    def serializer(self):
+        serializer = SignUpSerializer(
+            data={"email": "user1@domain.com", "password": "password"},
+            context={"validate_email_with_api": False},
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    @pytest.mark.usefixtures("db_user_1")
+    def test_email_taken_by_a_concurrent_signup(self, serializer):
+        assert _create_user(serializer, validate_email_async=False) is None
+
+    def test_other_integrity_errors_are_raised(self, serializer):
+        with patch.object(serializer, "save", side_effect=IntegrityError):
+            with pytest.raises(IntegrityError):
+                _create_user(serializer, validate_email_async=False)
+
+
+@pytest.mark.django_db
+@patch("st_auth.api.enqueue_user_geolocation")
+@patch("st_auth.api.validate_user_email")
+@patch("st_auth.serializers.validate_email_with_api")
+class TestAsyncEmailValidationSignupView:
+    factory = RequestFactory()
+
+    @pytest.fixture(autouse=True)
+    def async_email_validation(self, settings):
+        settings.EMAIL_VALIDATION_MODE = "async"
+
+    def test_signup_new_user(
+        self,
+        validate_email_mock,
+        validate_user_email_mock,
+        enqueue_user_geolocation_mock,
+        django_capture_on_commit_callbacks,
+    ):
+        url = reverse("auth_signup")
+        request = self.factory.post(
+            url, data={"email": "user1@domain.com", "password": "password"}
+        )
+        request.user = AnonymousUser()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = signup(request)
+
+        assert response.status_code == HTTPStatus.ACCEPTED.value
+        assert response.data == {"status": "pending_verification"}
+
+        user = User.objects.get(username="user1@domain.com")
+        assert not user.is_active
+        assert user.email_verification.status == EmailVerification.Status.PENDING
+
+        validate_email_mock.assert_not_called()
+        validate_user_email_mock.delay.assert_called_once_with(user.id)
+        enqueue_user_geolocation_mock.assert_called_once()
+
+    def test_signup_invalid_email_format(
+        self,
+        validate_email_mock,
+        validate_user_email_mock,
+        enqueue_user_geolocation_mock,
+    ):
+        url = reverse("auth_signup")
+        request = self.factory.post(
+            url, data={"email": "user1", "password": "password"}
+        )
+        request.user = AnonymousUser()
+
+        response = signup(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "email" in response.data
+        validate_user_email_mock.delay.assert_not_called()
+
+
 class TestGetIpAddressFromRequest:
     def test_ip_from_x_forwarded_for(self):
         request = Mock()
@@ -130,14 +227,15 @@ class TestLoginView:
     factory = RequestFactory()
 
     @pytest.mark.usefixtures("db_user_1_with_geolocation")
-    def test_login_existing_user(self):
+    def test_login_existing_user(self, django_assert_num_queries):
         url = reverse("auth_login")
         request = self.factory.post(
             url, data={"email": "user1@domain.com", "password": "password"}
         )
         request.user = AnonymousUser()
 
-        response = login(request)
+        with django_assert_num_queries(1):
+            response = login(request)
 
         assert response.status_code == HTTPStatus.OK.value
 
@@ -174,3 +272,162 @@ class TestLoginView:
 
         assert response.status_code == HTTPStatus.BAD_REQUEST.value
         assert "Incorrect Credentials" in str(response.data["non_field_errors"])
+
+    @pytest.mark.parametrize(
+        "verification_status,error",
+        [
+            (EmailVerification.Status.PENDING, "email_verification_pending"),
+            (EmailVerification.Status.REJECTED, "email_verification_failed"),
+        ],
+    )
+    def test_login_user_with_unverified_email(self, verification_status, error):
+        user = User.objects.create_user(
+            username="user1@domain.com", password="password", is_active=False
+        )
+        EmailVerification.objects.create(user=user, status=verification_status)
+
+        url = reverse("auth_login")
+        request = self.factory.post(
+            url, data={"email": "user1@domain.com", "password": "password"}
+        )
+        request.user = AnonymousUser()
+
+        response = login(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert response.data == {"error": [ErrorDetail(string=error, code="invalid")]}
+
+    def test_login_user_with_unverified_email_and_incorrect_credentials(self):
+        user = User.objects.create_user(
+            username="user1@domain.com", password="password", is_active=False
+        )
+        EmailVerification.objects.create(user=user)
+
+        url = reverse("auth_login")
+        request = self.factory.post(
+            url, data={"email": "user1@domain.com", "password": "wrong_password"}
+        )
+        request.user = AnonymousUser()
+
+        response = login(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "Incorrect Credentials" in str(response.data["non_field_errors"])
+
+    @pytest.mark.usefixtures("db_user_1")
+    @patch("st_auth.password_pool.run")
+    def test_login_when_password_hashing_is_unavailable(self, run_mock):
+        run_mock.side_effect = PasswordHashingUnavailable()
+        url = reverse("auth_login")
+        request = self.factory.post(
+            url, data={"email": "user1@domain.com", "password": "password"}
+        )
+        request.user = AnonymousUser()
+
+        response = login(request)
+
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE.value
+        assert response.data == {"error": "password_hashing_unavailable"}
+        assert response["Retry-After"] == "1"
+
+    @pytest.mark.usefixtures("db_user_1")
+    def test_login_rehashes_password_with_preferred_hasher(self, settings):
+        settings.PASSWORD_HASHERS = [
+            "st_auth.hashers.PooledScryptPasswordHasher",
+            "st_auth.hashers.PooledPBKDF2PasswordHasher",
+        ]
+        url = reverse("auth_login")
+        request = self.factory.post(
+            url, data={"email": "user1@domain.com", "password": "password"}
+        )
+        request.user = AnonymousUser()
+
+        response = login(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        password = User.objects.get(username="user1@domain.com").password
+        assert password.startswith("scrypt$")
+
+
+@pytest.mark.django_db
+@patch("st_auth.api.revocation_list")
+class TestLogoutView:
+    factory = APIRequestFactory()
+
+    @pytest.fixture(autouse=True)
+    def is_revoked_mock(self):
+        with patch("st_auth.jwt_helper.revocation_list.is_revoked", return_value=False):
+            yield
+
+    def test_logout_revokes_tokens(self, revocation_list_mock, db_user_1):
+        tokens = get_tokens_for_user(db_user_1)
+        access_token = AccessToken(tokens["access"])
+        request = self.factory.post(
+            reverse("auth_logout"), data={"refresh": tokens["refresh"]}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        response = logout(request)
+
+        assert response.status_code == HTTPStatus.NO_CONTENT.value
+        revoked_tokens = [
+            call.args[0] for call in revocation_list_mock.revoke.call_args_list
+        ]
+        assert [str(token) for token in revoked_tokens] == [
+            tokens["refresh"],
+            tokens["access"],
+        ]
+
+    def test_logout_rejects_token_of_another_user(
+        self, revocation_list_mock, db_user_1
+    ):
+        db_user_2 = User.objects.create_user(username="user2@domain.com", id=2)
+        request = self.factory.post(
+            reverse("auth_logout"),
+            data={"refresh": get_tokens_for_user(db_user_2)["refresh"]},
+            format="json",
+        )
+        force_authenticate(request, db_user_1)
+
+        response = logout(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "refresh" in response.data
+        revocation_list_mock.revoke.assert_not_called()
+
+    def test_logout_rejects_invalid_token(self, revocation_list_mock, db_user_1):
+        request = self.factory.post(
+            reverse("auth_logout"), data={"refresh": "invalid"}, format="json"
+        )
+        force_authenticate(request, db_user_1)
+
+        response = logout(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        revocation_list_mock.revoke.assert_not_called()
+
+    def test_logout_requires_authentication(self, revocation_list_mock):
+        request = self.factory.post(reverse("auth_logout"), format="json")
+
+        response = logout(request)
+
+        assert response.status_code == HTTPStatus.UNAUTHORIZED.value
+
+    def test_logout_all_revokes_user_tokens(self, revocation_list_mock, db_user_1):
+        request = self.factory.post(reverse("auth_logout_all"))
+        force_authenticate(request, db_user_1)
+
+        response = logout_all(request)
+
+        assert response.status_code == HTTPStatus.NO_CONTENT.value
+        revocation_list_mock.revoke_user.assert_called_once_with(db_user_1.pk)
+
+    def test_logout_all_without_redis(self, revocation_list_mock, db_user_1):
+        revocation_list_mock.revoke_user.side_effect = TokenRevocationUnavailable()
+        request = self.factory.post(reverse("auth_logout_all"))
+        force_authenticate(request, db_user_1)
+
+        response = logout_all(request)
+
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE.value
+        assert response.data == {"error": "token_revocation_unavailable"}
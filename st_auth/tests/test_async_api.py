@@ -0,0 +1,233 @@
+import json
+from http import HTTPStatus
+from unittest.mock import ANY, AsyncMock, patch
+
+import httpx
+import pytest
+import requests
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory
+from rest_framework.test import APIRequestFactory
+
+from .. import api as sync_api
+from ..abstractapi_helper import email_client
+from ..async_api import login, signup
+from ..models import EmailVerification, Geolocation
+
+
+def _post(url, data):
+    return AsyncRequestFactory().post(url, data=data, content_type="application/json")
+
+
+def _call(view, request) -> tuple[int, dict]:
+    response = async_to_sync(view)(request)
+    return response.status_code, json.loads(response.content)
+
+
+@pytest.fixture
+def db_user_1():
+    return User.objects.create_user(
+        username="user1@domain.com", password="password", id=1
+    )
+
+
+@pytest.mark.django_db
+@patch("st_auth.api.enqueue_user_geolocation")
+@patch("st_auth.async_api.avalidate_email", new_callable=AsyncMock)
+class TestSignupView:
+    def test_signup_new_user(self, avalidate_email_mock, enqueue_user_geolocation_mock):
+        avalidate_email_mock.return_value = {"success": "user1@domain.com"}
+
+        status_code, data = _call(
+            signup,
+            _post("/signup", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.OK.value
+        assert set(data) == {"access", "refresh"}
+        user = User.objects.get(username="user1@domain.com")
+        assert user.is_active
+        assert user.check_password("password")
+        avalidate_email_mock.assert_awaited_once_with("user1@domain.com")
+        enqueue_user_geolocation_mock.assert_called_once_with(user.id, "127.0.0.1", ANY)
+
+    @pytest.mark.usefixtures("db_user_1")
+    def test_signup_existing_user(
+        self, avalidate_email_mock, enqueue_user_geolocation_mock
+    ):
+        avalidate_email_mock.return_value = {"success": "user1@domain.com"}
+
+        status_code, data = _call(
+            signup,
+            _post("/signup", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.BAD_REQUEST.value
+        assert data == {"error": "user_already_exists"}
+        avalidate_email_mock.assert_not_awaited()
+        enqueue_user_geolocation_mock.assert_not_called()
+
+    def test_email_validation_fails_with_did_you_mean(
+        self, avalidate_email_mock, enqueue_user_geolocation_mock
+    ):
+        avalidate_email_mock.return_value = {"did_you_mean": "user123@domain.com"}
+
+        status_code, data = _call(
+            signup,
+            _post("/signup", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.BAD_REQUEST.value
+        assert data == {"email": {"did_you_mean": "user123@domain.com"}}
+        assert not User.objects.exists()
+
+    @patch("st_auth.api.validate_user_email")
+    def test_signup_with_async_email_validation(
+        self,
+        validate_user_email_mock,
+        avalidate_email_mock,
+        enqueue_user_geolocation_mock,
+        settings,
+    ):
+        settings.EMAIL_VALIDATION_MODE = "async"
+
+        status_code, data = _call(
+            signup,
+            _post("/signup", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.ACCEPTED.value
+        assert data == {"status": "pending_verification"}
+        user = User.objects.get(username="user1@domain.com")
+        assert not user.is_active
+        assert user.email_verification.status == EmailVerification.Status.PENDING
+        avalidate_email_mock.assert_not_awaited()
+
+    def test_invalid_json(self, avalidate_email_mock, enqueue_user_geolocation_mock):
+        request = AsyncRequestFactory().post(
+            "/signup", data="{", content_type="application/json"
+        )
+
+        status_code, data = _call(signup, request)
+
+        assert status_code == HTTPStatus.BAD_REQUEST.value
+        assert "JSON parse error" in data["detail"]
+
+    def test_method_not_allowed(
+        self, avalidate_email_mock, enqueue_user_geolocation_mock
+    ):
+        status_code, data = _call(signup, AsyncRequestFactory().get("/signup"))
+
+        assert status_code == HTTPStatus.METHOD_NOT_ALLOWED.value
+        assert data == {"detail": 'Method "GET" not allowed.'}
+
+
+@pytest.mark.django_db
+@patch("st_auth.api.enqueue_user_geolocation")
+def test_signup_gateway_error_matches_sync_view(enqueue_user_geolocation_mock):
+    data = {"email": "user1@domain.com", "password": "password"}
+
+    with patch.object(
+        email_client, "get", side_effect=requests.ConnectionError("down")
+    ):
+        sync_response = sync_api.signup(
+            APIRequestFactory().post("/signup", data, format="json")
+        )
+    with patch.object(email_client, "aget", side_effect=httpx.ConnectError("down")):
+        status_code, async_data = _call(signup, _post("/signup", data))
+
+    assert status_code == sync_response.status_code == HTTPStatus.BAD_REQUEST.value
+    assert async_data == json.loads(json.dumps(sync_response.data))
+    assert async_data == {
+        "email": {
+            "validation_error": f"Gateway call `GET {settings.ABSTRACT_API_EMAIL_URL}` "
+            "failed: down"
+        }
+    }
+    assert not User.objects.exists()
+
+
+@pytest.mark.django_db
+class TestLoginView:
+    def test_login_existing_user(self, db_user_1, django_assert_num_queries):
+        Geolocation.objects.create(
+            user=db_user_1,
+            ip_address="1.1.1.1",
+            geolocation={"dummy": "data"},
+            signed_up_on_holiday=False,
+        )
+
+        with django_assert_num_queries(1):
+            status_code, data = _call(
+                login,
+                _post("/login", {"email": "user1@domain.com", "password": "password"}),
+            )
+
+        assert status_code == HTTPStatus.OK.value
+        assert data["user"] == {"id": 1, "username": "user1@domain.com"}
+        assert data["geolocation"] == {
+            "user_id": 1,
+            "ip_address": "1.1.1.1",
+            "geolocation": {"dummy": "data"},
+            "signed_up_on_holiday": False,
+        }
+        assert set(data["tokens"]) == {"access", "refresh"}
+
+    def test_login_user_does_not_exist(self):
+        status_code, data = _call(
+            login,
+            _post("/login", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.BAD_REQUEST.value
+        assert data == {"error": "user_does_not_exists"}
+
+    @pytest.mark.usefixtures("db_user_1")
+    def test_login_with_incorrect_credentials(self):
+        status_code, data = _call(
+            login,
+            _post("/login", {"email": "user1@domain.com", "password": "wrong"}),
+        )
+
+        assert status_code == HTTPStatus.BAD_REQUEST.value
+        assert data == {"non_field_errors": ["Incorrect Credentials"]}
+
+    @pytest.mark.parametrize(
+        "verification_status,error",
+        [
+            (EmailVerification.Status.PENDING, "email_verification_pending"),
+            (EmailVerification.Status.REJECTED, "email_verification_failed"),
+        ],
+    )
+    def test_login_user_with_unverified_email(self, verification_status, error):
+        user = User.objects.create_user(
+            username="user1@domain.com", password="password", is_active=False
+        )
+        EmailVerification.objects.create(user=user, status=verification_status)
+
+        status_code, data = _call(
+            login,
+            _post("/login", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.BAD_REQUEST.value
+        assert data == {"error": [error]}
+
+    def test_outdated_password_hash_is_updated(self):
+        User.objects.create(
+            username="user1@domain.com",
+            password=PBKDF2PasswordHasher().encode("password", "salt", iterations=1),
+        )
+
+        status_code, _ = _call(
+            login,
+            _post("/login", {"email": "user1@domain.com", "password": "password"}),
+        )
+
+        assert status_code == HTTPStatus.OK.value
+        user = User.objects.get(username="user1@domain.com")
+        assert not user.password.startswith("pbkdf2_sha256$1$")
+        assert user.check_password("password")
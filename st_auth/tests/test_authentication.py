@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from st_post.models import Post
+
+from ..authentication import StatelessJWTAuthentication, user_cache
+from ..jwt_helper import get_tokens_for_user
+
+
+@pytest.fixture
+def db_user_1():
+    return User.objects.create_user(
+        username="user1@domain.com", password="password", id=1
+    )
+
+
+@pytest.fixture(autouse=True)
+def is_revoked_mock():
+    with patch("st_auth.jwt_helper.revocation_list.is_revoked", return_value=False):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+def _authenticate(access_token: str):
+    request = RequestFactory().get(
+        "/api/v1/post", HTTP_AUTHORIZATION=f"Bearer {access_token}"
+    )
+    return StatelessJWTAuthentication().authenticate(request)
+
+
+@pytest.mark.django_db
+class TestStatelessJWTAuthentication:
+    def test_user_is_hydrated_from_claims_without_queries(
+        self, db_user_1, django_assert_num_queries
+    ):
+        access_token = get_tokens_for_user(db_user_1)["access"]
+
+        with django_assert_num_queries(0):
+            user, _ = _authenticate(access_token)
+
+        assert user.pk == db_user_1.pk
+        assert user.username == db_user_1.username
+        assert user.is_active is True
+        assert user.is_authenticated
+
+    def test_hydrated_user_can_be_used_as_foreign_key(self, db_user_1):
+        user, _ = _authenticate(get_tokens_for_user(db_user_1)["access"])
+
+        post = Post.objects.create(user=user, text="hello world")
+
+        assert Post.objects.get(pk=post.pk).user_id == db_user_1.pk
+
+    def test_hydrated_user_loads_deferred_fields(
+        self, db_user_1, django_assert_num_queries
+    ):
+        user, _ = _authenticate(get_tokens_for_user(db_user_1)["access"])
+
+        with django_assert_num_queries(1):
+            assert user.email == db_user_1.email
+
+    def test_inactive_user_claim_is_rejected(self, db_user_1):
+        db_user_1.is_active = False
+
+        with pytest.raises(AuthenticationFailed):
+            _authenticate(get_tokens_for_user(db_user_1)["access"])
+
+    def test_token_without_claims_loads_user(
+        self, db_user_1, django_assert_num_queries
+    ):
+        access_token = str(RefreshToken.for_user(db_user_1).access_token)
+
+        with django_assert_num_queries(1):
+            user, _ = _authenticate(access_token)
+
+        assert user == db_user_1
+
+    def test_cached_user_is_loaded_once(
+        self, db_user_1, settings, django_assert_num_queries
+    ):
+        settings.JWT_USER_CACHE_TIMEOUT = 60
+        access_token = get_tokens_for_user(db_user_1)["access"]
+
+        with django_assert_num_queries(1):
+            first_user, _ = _authenticate(access_token)
+            second_user, _ = _authenticate(access_token)
+
+        assert first_user == second_user == db_user_1
+        assert first_user is not second_user
+        assert second_user.email == db_user_1.email
+
+    @patch("st_auth.authentication.time.monotonic", return_value=0)
+    def test_cached_user_expires(
+        self, monotonic_mock, db_user_1, settings, django_assert_num_queries
+    ):
+        settings.JWT_USER_CACHE_TIMEOUT = 60
+        access_token = get_tokens_for_user(db_user_1)["access"]
+        _authenticate(access_token)
+
+        monotonic_mock.return_value = 61
+        with django_assert_num_queries(1):
+            _authenticate(access_token)
+
+    def test_cache_evicts_least_recently_used_user(self, db_user_1, settings):
+        settings.JWT_USER_CACHE_TIMEOUT = 60
+        settings.JWT_USER_CACHE_SIZE = 1
+        db_user_2 = User.objects.create_user(username="user2@domain.com", id=2)
+
+        _authenticate(get_tokens_for_user(db_user_1)["access"])
+        _authenticate(get_tokens_for_user(db_user_2)["access"])
+
+        assert user_cache.get(db_user_1.pk) is None
+        assert user_cache.get(db_user_2.pk) == db_user_2
@@ -0,0 +1,164 @@
+import pickle
+from unittest.mock import Mock, call, patch
+
+import pytest
+import redis
+import requests
+
+from ..abstractapi_helper import AbstractAPIClient
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..rate_limiter import RateLimitExceeded, TokenBucket
+
+
+@pytest.fixture
+def redis_mock():
+    with patch("st_auth.circuit_breaker.get_redis") as get_redis_mock:
+        yield get_redis_mock.return_value
+
+
+@pytest.fixture
+def circuit_breaker():
+    return CircuitBreaker(
+        "test", failure_threshold=3, failure_window=30, open_timeout=60
+    )
+
+
+class TestCircuitBreaker:
+    def test_closed_circuit_allows_calls(self, redis_mock, circuit_breaker):
+        redis_mock.pipeline.return_value.execute.return_value = [-2, 0]
+
+        assert circuit_breaker.before_call() is False
+        redis_mock.set.assert_not_called()
+
+    def test_open_circuit_fails_fast(self, redis_mock, circuit_breaker):
+        redis_mock.pipeline.return_value.execute.return_value = [12_500, 1]
+
+        with pytest.raises(CircuitOpenError) as error:
+            circuit_breaker.before_call()
+
+        assert error.value.retry_after == 12.5
+
+    def test_half_open_circuit_allows_a_single_probe(self, redis_mock, circuit_breaker):
+        redis_mock.pipeline.return_value.execute.return_value = [-2, 1]
+        redis_mock.set.side_effect = [True, None]
+
+        assert circuit_breaker.before_call() is True
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_call()
+
+        redis_mock.set.assert_called_with(
+            "st_auth:circuit_breaker:test:probe", 1, nx=True, ex=60
+        )
+
+    def test_failures_open_the_circuit(self, redis_mock, circuit_breaker):
+        redis_mock.incr.side_effect = [1, 2, 3]
+
+        for _ in range(3):
+            circuit_breaker.record_failure(probe=False)
+
+        redis_mock.expire.assert_called_once_with(
+            "st_auth:circuit_breaker:test:failures", 30
+        )
+        pipeline_mock = redis_mock.pipeline.return_value
+        pipeline_mock.set.assert_has_calls(
+            [
+                call("st_auth:circuit_breaker:test:open", 1, ex=60),
+                call("st_auth:circuit_breaker:test:tripped", 1),
+            ]
+        )
+        pipeline_mock.execute.assert_called_once_with()
+
+    def test_failed_probe_opens_the_circuit(self, redis_mock, circuit_breaker):
+        circuit_breaker.record_failure(probe=True)
+
+        redis_mock.incr.assert_not_called()
+        redis_mock.pipeline.return_value.execute.assert_called_once_with()
+
+    def test_successful_probe_closes_the_circuit(self, redis_mock, circuit_breaker):
+        circuit_breaker.record_success(probe=False)
+        redis_mock.delete.assert_not_called()
+
+        circuit_breaker.record_success(probe=True)
+        redis_mock.delete.assert_called_once_with(
+            "st_auth:circuit_breaker:test:tripped",
+            "st_auth:circuit_breaker:test:probe",
+            "st_auth:circuit_breaker:test:failures",
+        )
+
+    def test_released_probe_lets_another_call_probe(self, redis_mock, circuit_breaker):
+        circuit_breaker.release_probe(probe=False)
+        redis_mock.delete.assert_not_called()
+
+        circuit_breaker.release_probe(probe=True)
+        redis_mock.delete.assert_called_once_with("st_auth:circuit_breaker:test:probe")
+
+    def test_redis_errors_allow_calls(self, redis_mock, circuit_breaker):
+        redis_mock.pipeline.return_value.execute.side_effect = redis.ConnectionError
+        redis_mock.incr.side_effect = redis.ConnectionError
+
+        assert circuit_breaker.before_call() is False
+        circuit_breaker.record_failure(probe=False)
+
+
+def test_circuit_open_error_is_picklable():
+    error = pickle.loads(pickle.dumps(CircuitOpenError("test", 1.5)))
+
+    assert str(error) == "Circuit breaker `test` is open"
+    assert error.retry_after == 1.5
+
+
+class TestAbstractAPIClientCircuitBreaker:
+    @pytest.fixture
+    def client(self):
+        client = AbstractAPIClient(
+            "https://api.test/",
+            "key",
+            connect_timeout=1,
+            read_timeout=2,
+            retries=0,
+            circuit_breaker=Mock(spec=CircuitBreaker),
+            rate_limiter=Mock(spec=TokenBucket),
+        )
+        client._get = Mock()
+        return client
+
+    @pytest.mark.parametrize("status_code,failed", [(200, False), (503, True)])
+    def test_response_is_recorded(self, client, status_code, failed):
+        client.circuit_breaker.before_call.return_value = False
+        client._get.return_value.status_code = status_code
+
+        client.get(email="user1@domain.com")
+
+        if failed:
+            client.circuit_breaker.record_failure.assert_called_once_with(False)
+        else:
+            client.circuit_breaker.record_success.assert_called_once_with(False)
+
+    def test_request_exception_is_recorded(self, client):
+        client.circuit_breaker.before_call.return_value = True
+        client._get.side_effect = requests.exceptions.Timeout
+
+        with pytest.raises(requests.exceptions.Timeout):
+            client.get(email="user1@domain.com")
+
+        client.circuit_breaker.record_failure.assert_called_once_with(True)
+
+    def test_open_circuit_skips_the_call(self, client):
+        client.circuit_breaker.before_call.side_effect = CircuitOpenError("test", 10)
+
+        with pytest.raises(CircuitOpenError):
+            client.get(email="user1@domain.com")
+
+        client._get.assert_not_called()
+        client.rate_limiter.acquire.assert_not_called()
+
+    def test_rate_limited_call_releases_the_probe(self, client):
+        client.circuit_breaker.before_call.return_value = True
+        client.rate_limiter.acquire.side_effect = RateLimitExceeded("test", 10)
+
+        with pytest.raises(RateLimitExceeded):
+            client.get(email="user1@domain.com")
+
+        client._get.assert_not_called()
+        client.circuit_breaker.release_probe.assert_called_once_with(True)
+        client.circuit_breaker.record_failure.assert_not_called()
@@ -0,0 +1,105 @@
+import datetime
+import json
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+
+from .. import geolocation_cache
+from ..abstractapi_simulator import SimulatorConfig
+from ..holidays import HolidayAPIStatusError
+from ..models import Geolocation, HolidayCalendar
+
+
+@pytest.mark.django_db
+@patch("st_auth.management.commands.fetch_holiday_calendars.fetch_holiday_calendar")
+class TestFetchHolidayCalendars:
+    def test_defaults_to_geolocation_countries_and_current_year(
+        self, fetch_holiday_calendar_mock
+    ):
+        for user_id, country_code in [(1, "TR"), (2, "US"), (3, "TR")]:
+            user = User.objects.create_user(username=f"user{user_id}", id=user_id)
+            Geolocation.objects.create(
+                user=user,
+                ip_address="1.1.1.1",
+                geolocation={"country_code": country_code},
+            )
+        fetch_holiday_calendar_mock.return_value = HolidayCalendar(dates=[])
+
+        call_command("fetch_holiday_calendars")
+
+        year = datetime.date.today().year
+        assert [call.args for call in fetch_holiday_calendar_mock.call_args_list] == [
+            ("TR", year),
+            ("US", year),
+        ]
+
+    def test_countries_and_years(self, fetch_holiday_calendar_mock):
+        fetch_holiday_calendar_mock.return_value = HolidayCalendar(dates=[])
+
+        call_command(
+            "fetch_holiday_calendars",
+            "--country",
+            "TR",
+            "--year",
+            "2023",
+            "--year",
+            "2024",
+        )
+
+        assert [call.args for call in fetch_holiday_calendar_mock.call_args_list] == [
+            ("TR", 2023),
+            ("TR", 2024),
+        ]
+
+    def test_failures_are_reported(self, fetch_holiday_calendar_mock):
+        fetch_holiday_calendar_mock.side_effect = HolidayAPIStatusError(503)
+
+        with pytest.raises(CommandError):
+            call_command("fetch_holiday_calendars", "--country", "TR", "--year", "2023")
+
+
+@patch("st_auth.management.commands.run_abstractapi_simulator.uvicorn")
+@patch("st_auth.management.commands.run_abstractapi_simulator.create_app")
+class TestRunAbstractAPISimulator:
+    def test_simulator_is_configured(self, create_app_mock, uvicorn_mock):
+        call_command(
+            "run_abstractapi_simulator",
+            "--port",
+            "9000",
+            "--latency",
+            "0.2",
+            "--error-rate",
+            "0.1",
+            "--seed",
+            "1",
+        )
+
+        create_app_mock.assert_called_once_with(
+            SimulatorConfig(latency=0.2, error_rate=0.1, seed=1)
+        )
+        uvicorn_mock.run.assert_called_once_with(
+            create_app_mock.return_value,
+            host="127.0.0.1",
+            port=9000,
+            log_level="warning",
+        )
+
+
+def test_auth_stats():
+    geolocation_cache.get_geolocation("1.2.3.4")
+
+    out = StringIO()
+    call_command("auth_stats", stdout=out)
+
+    assert json.loads(out.getvalue()) == {
+        "geolocation_cache": {"hits": 0, "misses": 1, "hit_ratio": 0.0},
+        "password_hashing": {
+            "encode": 0,
+            "verify": 0,
+            "rejected": 0,
+            "average_milliseconds": 0.0,
+        },
+    }
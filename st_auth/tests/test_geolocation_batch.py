@@ -0,0 +1,66 @@
+import json
+from unittest.mock import call, patch
+
+import pytest
+
+from .. import geolocation_batch
+
+
+@pytest.fixture
+def redis_mock():
+    with patch("st_auth.geolocation_batch.get_redis") as get_redis_mock:
+        yield get_redis_mock.return_value
+
+
+def _entry(user_id: int, attempts: int = 0) -> dict:
+    return {
+        "user_id": user_id,
+        "ip_address": "1.1.1.1",
+        "signup_date_utc": "2023-10-29 12:30:00",
+        "attempts": attempts,
+    }
+
+
+def test_pop_moves_entries_to_the_processing_list(redis_mock):
+    pipeline_mock = redis_mock.pipeline.return_value
+    pipeline_mock.execute.return_value = [json.dumps(_entry(1)).encode(), None]
+
+    assert geolocation_batch.pop(2) == [_entry(1)]
+
+    redis_mock.pipeline.assert_called_once_with(transaction=True)
+    pipeline_mock.lmove.assert_has_calls(
+        [
+            call(
+                "st_auth:geolocation:queue",
+                "st_auth:geolocation:processing",
+                "LEFT",
+                "RIGHT",
+            )
+        ]
+        * 2
+    )
+
+
+def test_ack_removes_entries_from_the_processing_list(redis_mock):
+    geolocation_batch.ack([_entry(1), _entry(2)])
+
+    redis_mock.pipeline.return_value.lrem.assert_has_calls(
+        [
+            call("st_auth:geolocation:processing", 1, json.dumps(_entry(1))),
+            call("st_auth:geolocation:processing", 1, json.dumps(_entry(2))),
+        ]
+    )
+
+
+def test_unacked_entries_are_queued_again(redis_mock):
+    redis_mock.lrange.return_value = [
+        json.dumps(_entry(1)).encode(),
+        json.dumps(_entry(2, attempts=2)).encode(),
+    ]
+
+    assert geolocation_batch.requeue_unacked(max_attempts=3) == 1
+
+    redis_mock.rpush.assert_called_once_with(
+        "st_auth:geolocation:queue", json.dumps(_entry(1, attempts=1))
+    )
+    redis_mock.ltrim.assert_called_once_with("st_auth:geolocation:processing", 2, -1)
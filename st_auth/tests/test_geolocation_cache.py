@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import pytest
+import redis
+
+from ..geolocation_cache import get_geolocation, get_stats, set_geolocation
+
+
+class TestGeolocationCache:
+    def test_ipv4_addresses_share_their_24_network(self):
+        set_geolocation("1.2.3.4", {"ip_address": "1.2.3.4", "country_code": "US"})
+
+        assert get_geolocation("1.2.3.200") == {
+            "ip_address": "1.2.3.200",
+            "country_code": "US",
+        }
+        assert get_geolocation("1.2.4.4") is None
+
+    def test_ipv6_addresses_share_their_48_network(self):
+        set_geolocation("2001:db8:1::1", {"ip_address": "2001:db8:1::1"})
+
+        assert get_geolocation("2001:db8:1:ffff::2") == {
+            "ip_address": "2001:db8:1:ffff::2"
+        }
+        assert get_geolocation("2001:db8:2::1") is None
+
+    def test_invalid_address_is_not_cached(self):
+        set_geolocation("unknown", {"country_code": "US"})
+
+        assert get_geolocation("unknown") is None
+        assert get_stats()["misses"] == 0
+
+    def test_hit_ratio(self):
+        assert get_stats() == {"hits": 0, "misses": 0, "hit_ratio": 0.0}
+
+        get_geolocation("1.2.3.4")
+        set_geolocation("1.2.3.4", {"country_code": "US"})
+        get_geolocation("1.2.3.5")
+        get_geolocation("1.2.3.6")
+        get_geolocation("1.2.3.7")
+
+        assert get_stats() == {"hits": 3, "misses": 1, "hit_ratio": 0.75}
+
+    @patch("st_auth.geolocation_cache.cache")
+    def test_cache_errors_are_ignored(self, cache_mock):
+        cache_mock.get.side_effect = redis.ConnectionError
+        cache_mock.set.side_effect = redis.ConnectionError
+        cache_mock.get_many.side_effect = redis.ConnectionError
+
+        set_geolocation("1.2.3.4", {"country_code": "US"})
+        assert get_geolocation("1.2.3.4") is None
+        assert get_stats() == {"hits": 0, "misses": 0, "hit_ratio": 0.0}
+
+
+@pytest.mark.parametrize("ip_address", ["1.2.3.4", "2001:db8:1::1"])
+def test_cached_geolocation_is_a_copy(ip_address):
+    geolocation = {"ip_address": ip_address}
+    set_geolocation(ip_address, geolocation)
+
+    get_geolocation(ip_address)["country_code"] = "US"
+
+    assert get_geolocation(ip_address) == {"ip_address": ip_address}
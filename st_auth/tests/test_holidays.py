@@ -0,0 +1,84 @@
+import datetime
+from http import HTTPStatus
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from .. import holidays
+from ..holidays import HolidayAPIStatusError, fetch_holiday_calendar, is_holiday
+from ..models import HolidayCalendar
+
+
+@pytest.fixture(autouse=True)
+def clear_holiday_dates():
+    holidays._holiday_dates.clear()
+    yield
+    holidays._holiday_dates.clear()
+
+
+def _holidays_response(*dates: datetime.date):
+    response_mock = Mock(spec=requests.Response, status_code=HTTPStatus.OK.value)
+    response_mock.json.return_value = [
+        {
+            "name": "Holiday",
+            "date": date_.strftime("%m/%d/%Y"),
+            "date_year": str(date_.year),
+            "date_month": str(date_.month),
+            "date_day": str(date_.day),
+        }
+        for date_ in dates
+    ]
+    return response_mock
+
+
+@pytest.mark.django_db
+@patch("st_auth.holidays.get_holidays")
+class TestHolidays:
+    def test_calendar_is_fetched_once_per_country_year(
+        self, get_holidays_mock, django_assert_num_queries
+    ):
+        get_holidays_mock.return_value = _holidays_response(
+            datetime.date(2023, 10, 29), datetime.date(2023, 4, 23)
+        )
+
+        assert is_holiday("TR", datetime.date(2023, 10, 29)) is True
+
+        with django_assert_num_queries(0):
+            assert is_holiday("TR", datetime.date(2023, 10, 28)) is False
+            assert is_holiday("TR", datetime.date(2023, 4, 23)) is True
+
+        get_holidays_mock.assert_called_once_with("TR", 2023)
+        assert HolidayCalendar.objects.get(country_code="TR", year=2023).dates == [
+            "2023-04-23",
+            "2023-10-29",
+        ]
+
+    def test_stored_calendar_is_used(self, get_holidays_mock):
+        HolidayCalendar.objects.create(
+            country_code="TR", year=2023, dates=["2023-04-23"]
+        )
+
+        assert is_holiday("TR", datetime.date(2023, 4, 23)) is True
+        get_holidays_mock.assert_not_called()
+
+    def test_api_error_is_raised(self, get_holidays_mock):
+        get_holidays_mock.return_value = Mock(
+            spec=requests.Response, status_code=HTTPStatus.SERVICE_UNAVAILABLE.value
+        )
+
+        with pytest.raises(HolidayAPIStatusError) as error:
+            is_holiday("TR", datetime.date(2023, 4, 23))
+
+        assert error.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE.value
+        assert not HolidayCalendar.objects.exists()
+
+    def test_refetch_replaces_calendar(self, get_holidays_mock):
+        get_holidays_mock.return_value = _holidays_response(datetime.date(2023, 4, 23))
+        assert is_holiday("TR", datetime.date(2023, 4, 23)) is True
+
+        get_holidays_mock.return_value = _holidays_response()
+        fetch_holiday_calendar("TR", 2023)
+
+        assert is_holiday("TR", datetime.date(2023, 4, 23)) is False
+        assert HolidayCalendar.objects.count() == 1
@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import AccessToken
 
 from ..jwt_helper import get_tokens_for_user
 
@@ -16,6 +17,15 @@ class TestGetTokensForUser:
         assert "access" in tokens
         assert "refresh" in tokens
 
+    def test_tokens_carry_user_claims(self, user):
+        user.id = 1
+        tokens = get_tokens_for_user(user)
+
+        access_token = AccessToken(tokens["access"])
+        assert access_token["user_id"] == 1
+        assert access_token["username"] == "test_user"
+        assert access_token["is_active"] is True
+
     def test_non_user_has_no_id_field(self):
         non_user = "non_user"
 
@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+
+import pytest
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    check_password,
+    make_password,
+)
+
+from .. import password_pool
+from ..hashers import PooledPBKDF2PasswordHasher
+from ..password_pool import PasswordHashingUnavailable
+
+
+@pytest.fixture
+def executor_mock(settings):
+    settings.PASSWORD_HASHING_WORKERS = 1
+    settings.PASSWORD_HASHING_QUEUE_SIZE = 0
+    executor_mock = Mock()
+    slots = threading.BoundedSemaphore(1)
+    with patch.object(
+        password_pool, "_get_executor", return_value=(executor_mock, slots)
+    ):
+        yield executor_mock
+
+
+def test_hashes_inline_without_workers():
+    encoded = make_password("password")
+
+    assert encoded.startswith("pbkdf2_sha256$")
+    assert check_password("password", encoded)
+    stats = password_pool.get_stats()
+    assert stats["encode"] == 1
+    assert stats["verify"] == 1
+    assert stats["rejected"] == 0
+
+
+def test_hashes_in_the_pool(executor_mock):
+    executor_mock.submit.return_value.result.return_value = "encoded"
+
+    assert PooledPBKDF2PasswordHasher().encode("password", "salt") == "encoded"
+
+    executor_mock.submit.assert_called_once_with(
+        password_pool._call, PBKDF2PasswordHasher, "encode", "password", "salt", None
+    )
+
+
+def test_full_pool_rejects_calls(executor_mock):
+    hashing = threading.Event()
+    release = threading.Event()
+
+    def result():
+        hashing.set()
+        release.wait(5)
+        return True
+
+    executor_mock.submit.return_value.result.side_effect = result
+    thread = threading.Thread(
+        target=PooledPBKDF2PasswordHasher().verify, args=("password", "encoded")
+    )
+    thread.start()
+    hashing.wait(5)
+
+    try:
+        with pytest.raises(PasswordHashingUnavailable) as error:
+            PooledPBKDF2PasswordHasher().verify("password", "encoded")
+    finally:
+        release.set()
+        thread.join()
+
+    assert error.value.status_code == 503
+    assert error.value.detail == {"error": "password_hashing_unavailable"}
+    assert password_pool.get_stats()["rejected"] == 1
+    assert executor_mock.submit.call_count == 1
+
+
+def test_broken_pool_is_recreated(executor_mock):
+    executor_mock.submit.return_value.result.side_effect = BrokenProcessPool
+
+    with patch.object(password_pool, "_reset_executor") as reset_executor_mock:
+        with pytest.raises(PasswordHashingUnavailable):
+            PooledPBKDF2PasswordHasher().verify("password", "encoded")
+
+    reset_executor_mock.assert_called_once_with(executor_mock)
+
+
+def test_process_pool_hashes_passwords(settings):
+    settings.PASSWORD_HASHING_WORKERS = 1
+
+    try:
+        encoded = make_password("password")
+        assert check_password("password", encoded)
+        assert not check_password("wrong_password", encoded)
+    finally:
+        executor, _ = password_pool._get_executor()
+        password_pool._reset_executor(executor)
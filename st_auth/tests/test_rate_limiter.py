@@ -0,0 +1,91 @@
+import pickle
+from unittest.mock import Mock, patch
+
+import pytest
+import redis
+
+from ..abstractapi_helper import AbstractAPIClient
+from ..rate_limiter import ACQUIRE_SCRIPT, RateLimitExceeded, TokenBucket
+
+
+@pytest.fixture
+def redis_mock():
+    with patch("st_auth.rate_limiter.get_redis") as get_redis_mock:
+        yield get_redis_mock.return_value
+
+
+@pytest.fixture
+def token_bucket():
+    return TokenBucket("test", rate=2, capacity=5)
+
+
+class TestTokenBucket:
+    def test_token_is_taken(self, redis_mock, token_bucket):
+        script_mock = redis_mock.register_script.return_value
+        script_mock.return_value = b"0"
+
+        token_bucket.acquire()
+
+        redis_mock.register_script.assert_called_once_with(ACQUIRE_SCRIPT)
+        script_mock.assert_called_once_with(
+            keys=["st_auth:token_bucket:test"], args=[2, 5]
+        )
+
+    def test_empty_bucket_raises_the_wait(self, redis_mock, token_bucket):
+        redis_mock.register_script.return_value.return_value = b"0.375"
+
+        with pytest.raises(RateLimitExceeded) as error:
+            token_bucket.acquire()
+
+        assert error.value.retry_after == 0.375
+
+    def test_redis_errors_allow_calls(self, redis_mock, token_bucket):
+        redis_mock.register_script.return_value.side_effect = redis.ConnectionError
+
+        token_bucket.acquire()
+
+
+def test_rate_limit_exceeded_is_picklable():
+    error = pickle.loads(pickle.dumps(RateLimitExceeded("test", 0.5)))
+
+    assert str(error) == "Rate limit `test` is exceeded"
+    assert error.retry_after == 0.5
+
+
+@patch("st_auth.abstractapi_helper.time")
+class TestAbstractAPIClientRateLimiter:
+    @pytest.fixture
+    def client(self):
+        client = AbstractAPIClient(
+            "https://api.test/",
+            "key",
+            connect_timeout=1,
+            read_timeout=2,
+            retries=0,
+            rate_limiter=Mock(spec=TokenBucket),
+            rate_limit_max_wait=1,
+        )
+        client._get = Mock()
+        return client
+
+    def test_short_wait_is_slept(self, time_mock, client):
+        time_mock.monotonic.return_value = 100
+        client.rate_limiter.acquire.side_effect = [
+            RateLimitExceeded("test", 0.5),
+            None,
+        ]
+
+        client.get(email="user1@domain.com")
+
+        time_mock.sleep.assert_called_once_with(0.5)
+        client._get.assert_called_once_with(email="user1@domain.com")
+
+    def test_long_wait_raises(self, time_mock, client):
+        time_mock.monotonic.return_value = 100
+        client.rate_limiter.acquire.side_effect = RateLimitExceeded("test", 1.5)
+
+        with pytest.raises(RateLimitExceeded):
+            client.get(email="user1@domain.com")
+
+        time_mock.sleep.assert_not_called()
+        client._get.assert_not_called()
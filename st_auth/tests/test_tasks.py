@@ -1,25 +1,37 @@
+import datetime
 from http import HTTPStatus
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, call, patch
 
 import pytest
 import pytz
+import redis
 import requests
+from celery.exceptions import Retry
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import DatabaseError
+from rest_framework import serializers
 
-from ..models import Geolocation
+from ..circuit_breaker import CircuitOpenError
+from ..holidays import HolidayAPIStatusError
+from ..models import EmailVerification, Geolocation
+from ..rate_limiter import RateLimitExceeded
 from ..tasks import (
     RETRYABLE_STATUS_CODES,
     RetryableHTTPStatusException,
     convert_utc_to_user_time,
     create_user_geolocation,
+    enqueue_user_geolocation,
+    process_geolocation_batch,
     update_is_signup_date_holiday,
+    validate_user_email,
 )
 
 
 @pytest.mark.celery(result_backend="redis://")
 @patch("st_auth.tasks.update_is_signup_date_holiday")
 class TestCreateUserGeolocation:
+    @patch("st_auth.tasks.is_holiday")
     @patch("st_auth.tasks.Geolocation")
     @patch("st_auth.tasks.get_geolocation")
     @patch("st_auth.tasks.User")
@@ -28,6 +40,7 @@ class TestCreateUserGeolocation:
         user_class_mock,
         get_geolocation_mock,
         geolocation_class_mock,
+        is_holiday_mock,
         update_is_signup_date_holiday_mock,
     ):
         user_id = 1
@@ -39,12 +52,13 @@ class TestCreateUserGeolocation:
         user_class_mock.objects.filter.return_value.first.return_value = user_mock
 
         response_mock = Mock(spec=requests.Response, status_code=HTTPStatus.OK.value)
-        geolocation_response_data = {"dummy": "data"}
+        geolocation_response_data = {
+            "country_code": "TR",
+            "timezone": {"name": "Europe/Istanbul"},
+        }
         response_mock.json.return_value = geolocation_response_data
         get_geolocation_mock.return_value = response_mock
-
-        user_geolocation_mock = Mock(spec_set=Geolocation)
-        geolocation_class_mock.objects.create.return_value = user_geolocation_mock
+        is_holiday_mock.return_value = True
 
         result = create_user_geolocation.apply(
             args=(user_id, ip_address, signup_date_utc)
@@ -52,15 +66,98 @@ class TestCreateUserGeolocation:
 
         user_class_mock.objects.filter.assert_called_once_with(id=user_id)
         get_geolocation_mock.assert_called_once_with(ip_address)
+        is_holiday_mock.assert_called_once_with("TR", datetime.date(2023, 9, 1))
         geolocation_class_mock.objects.create.assert_called_once_with(
-            user=user_mock, ip_address=ip_address, geolocation=geolocation_response_data
-        )
-        user_geolocation_mock.save.assert_called_once_with()
-        update_is_signup_date_holiday_mock.delay.assert_called_once_with(
-            user_geolocation_mock.user_id, signup_date_utc
+            user=user_mock,
+            ip_address=ip_address,
+            geolocation=geolocation_response_data,
+            signed_up_on_holiday=True,
         )
+        update_is_signup_date_holiday_mock.delay.assert_not_called()
         assert result == log_prefix + "Successfully created geolocation information."
 
+    @pytest.mark.django_db
+    @patch("st_auth.tasks.logger")
+    @patch("st_auth.holidays.get_holidays")
+    @patch("st_auth.tasks.Geolocation")
+    @patch("st_auth.tasks.get_geolocation")
+    @patch("st_auth.tasks.User")
+    def test_malformed_holiday_payload_leaves_the_holiday_unknown(
+        self,
+        user_class_mock,
+        get_geolocation_mock,
+        geolocation_class_mock,
+        get_holidays_mock,
+        logger_mock,
+        update_is_signup_date_holiday_mock,
+    ):
+        user_mock = Mock(spec=User, id=1)
+        user_class_mock.objects.filter.return_value.first.return_value = user_mock
+
+        response_mock = Mock(spec=requests.Response, status_code=HTTPStatus.OK.value)
+        geolocation_response_data = {
+            "country_code": "TR",
+            "timezone": {"name": "Europe/Istanbul"},
+        }
+        response_mock.json.return_value = geolocation_response_data
+        get_geolocation_mock.return_value = response_mock
+        get_holidays_mock.return_value.status_code = HTTPStatus.OK.value
+        get_holidays_mock.return_value.json.return_value = [{"name": "New Year"}]
+
+        result = create_user_geolocation.apply(
+            args=(1, "127.0.0.1", "2023-09-01 12:30:00")
+        ).get()
+
+        geolocation_class_mock.objects.create.assert_called_once_with(
+            user=user_mock,
+            ip_address="127.0.0.1",
+            geolocation=geolocation_response_data,
+            signed_up_on_holiday=None,
+        )
+        logger_mock.error.assert_called_once_with(
+            "User_1: Holiday api answered a malformed payload, "
+            "leaving the holiday unknown: KeyError('date_year')!"
+        )
+        update_is_signup_date_holiday_mock.apply_async.assert_not_called()
+        assert result == (
+            "User_1@127.0.0.1: Successfully created geolocation information."
+        )
+
+    @patch("st_auth.tasks.Geolocation")
+    @patch("st_auth.tasks.get_geolocation")
+    @patch("st_auth.tasks.User")
+    def test_geolocation_is_served_from_cache(
+        self,
+        user_class_mock,
+        get_geolocation_mock,
+        geolocation_class_mock,
+        update_is_signup_date_holiday_mock,
+    ):
+        signup_date_utc = "2023-09-01 12:30:00"
+        user_mock = Mock(spec=User, id=1)
+        user_class_mock.objects.filter.return_value.first.return_value = user_mock
+
+        response_mock = Mock(spec=requests.Response, status_code=HTTPStatus.OK.value)
+        response_mock.json.return_value = {"ip_address": "1.1.1.1", "city": "Sydney"}
+        get_geolocation_mock.return_value = response_mock
+
+        create_user_geolocation.apply(args=(1, "1.1.1.1", signup_date_utc)).get()
+        result = create_user_geolocation.apply(
+            args=(1, "1.1.1.2", signup_date_utc)
+        ).get()
+
+        get_geolocation_mock.assert_called_once_with("1.1.1.1")
+        geolocation_class_mock.objects.create.assert_called_with(
+            user=user_mock,
+            ip_address="1.1.1.2",
+            geolocation={"ip_address": "1.1.1.2", "city": "Sydney"},
+            signed_up_on_holiday=None,
+        )
+        update_is_signup_date_holiday_mock.delay.assert_not_called()
+        assert result == (
+            "User_1@1.1.1.2: Successfully created geolocation information from cache."
+        )
+
     @patch("st_auth.tasks.logger")
     @patch("st_auth.tasks.User")
     def test_user_not_found(
@@ -202,13 +299,60 @@ class TestCreateUserGeolocation:
         assert str(exc.value) == str(request_exception)
 
 
+@pytest.mark.celery(result_backend="redis://")
+@patch("st_auth.tasks.get_geolocation")
+@patch("st_auth.tasks.User")
+class TestDeferWhenAPICannotBeCalled:
+    @pytest.mark.parametrize(
+        "exception",
+        [
+            CircuitOpenError("abstractapi_geolocation", 12),
+            RateLimitExceeded("abstractapi_geolocation", 12),
+        ],
+    )
+    @patch.object(create_user_geolocation, "signature_from_request")
+    def test_task_is_deferred_without_counting_a_retry(
+        self,
+        signature_from_request_mock,
+        user_class_mock,
+        get_geolocation_mock,
+        exception,
+    ):
+        get_geolocation_mock.side_effect = exception
+        create_user_geolocation.push_request(
+            retries=2, is_eager=False, called_directly=False
+        )
+
+        try:
+            with pytest.raises(Retry):
+                create_user_geolocation.run(1, "127.0.0.1", "2023-09-01 12:30:00")
+        finally:
+            create_user_geolocation.pop_request()
+
+        signature_from_request_mock.assert_called_once_with(
+            ANY, countdown=12, retries=2
+        )
+        signature_from_request_mock.return_value.apply_async.assert_called_once_with()
+        assert get_geolocation_mock.call_count == 1
+
+    def test_eager_task_is_not_deferred(self, user_class_mock, get_geolocation_mock):
+        get_geolocation_mock.side_effect = CircuitOpenError(
+            "abstractapi_geolocation", 12
+        )
+
+        with pytest.raises(CircuitOpenError):
+            create_user_geolocation.apply(
+                args=(1, "127.0.0.1", "2023-09-01 12:30:00")
+            ).get()
+
+        assert get_geolocation_mock.call_count == 1
+
+
 @pytest.mark.celery(result_backend="redis://")
 class TestUpdateIsSignupDateHoliday:
     @patch("st_auth.tasks.Geolocation")
-    @patch("st_auth.tasks.check_signup_date_is_holiday")
-    def test_task_completes_successfully(
-        self, check_signup_date_is_holiday_mock, geolocation_class_mock
-    ):
+    @patch("st_auth.tasks.is_holiday")
+    def test_task_completes_successfully(self, is_holiday_mock, geolocation_class_mock):
         geolocation_user_id = 1
         log_prefix = f"Geolocation_{geolocation_user_id}: "
         signup_date_utc = "2023-09-01 12:30:00"
@@ -223,28 +367,540 @@ class TestUpdateIsSignupDateHoliday:
         geolocation_class_mock.objects.filter.return_value.first.return_value = (
             user_geolocation_mock
         )
-
-        response_mock = Mock(spec=requests.Response, status_code=HTTPStatus.OK.value)
-        holiday_response_data = [{"dummy": "holiday"}]
-        response_mock.json.return_value = holiday_response_data
-        check_signup_date_is_holiday_mock.return_value = response_mock
+        is_holiday_mock.return_value = True
 
         result = update_is_signup_date_holiday.apply(
             args=(geolocation_user_id, signup_date_utc)
         ).get()
 
-        geolocation_class_mock.objects.filter.assert_called_once_with(
-            id=geolocation_user_id
+        geolocation_class_mock.objects.filter.assert_called_with(pk=geolocation_user_id)
+        is_holiday_mock.assert_called_once_with(country_code, datetime.date(2023, 9, 1))
+        geolocation_class_mock.objects.filter.return_value.update.assert_called_once_with(
+            signed_up_on_holiday=True
         )
-        signup_date_user_country = convert_utc_to_user_time(
-            signup_date_utc, timezone_name
+        assert result == log_prefix + "Successfully updated holiday information."
+
+    @patch("st_auth.tasks.Geolocation")
+    @patch("st_auth.tasks.is_holiday")
+    def test_payload_skips_reading_the_geolocation(
+        self, is_holiday_mock, geolocation_class_mock
+    ):
+        is_holiday_mock.return_value = False
+        geolocation_class_mock.objects.filter.return_value.update.return_value = 1
+
+        result = update_is_signup_date_holiday.apply(
+            args=(1, "2023-09-01 22:30:00"),
+            kwargs={"country_code": "TR", "timezone_name": "Europe/Istanbul"},
+        ).get()
+
+        geolocation_class_mock.objects.filter.return_value.first.assert_not_called()
+        is_holiday_mock.assert_called_once_with("TR", datetime.date(2023, 9, 2))
+        geolocation_class_mock.objects.filter.return_value.update.assert_called_once_with(
+            signed_up_on_holiday=False
         )
-        check_signup_date_is_holiday_mock.assert_called_once_with(
-            country_code, signup_date_user_country
+        assert result == "Geolocation_1: Successfully updated holiday information."
+
+    @pytest.mark.parametrize("status_code", [400, 401, 403])
+    @patch("st_auth.tasks.logger")
+    @patch("st_auth.tasks.Geolocation")
+    @patch("st_auth.tasks.is_holiday")
+    def test_holiday_api_returns_non_retryable_status_code(
+        self, is_holiday_mock, geolocation_class_mock, logger_mock, status_code
+    ):
+        user_geolocation_mock = Mock(spec_set=Geolocation, user_id=1)
+        user_geolocation_mock.geolocation = {
+            "country_code": "TR",
+            "timezone": {"name": "Europe/Istanbul"},
+        }
+        geolocation_class_mock.objects.filter.return_value.first.return_value = (
+            user_geolocation_mock
         )
-        assert user_geolocation_mock.signed_up_on_holiday is True
-        user_geolocation_mock.save.assert_called_once_with()
-        assert result == log_prefix + "Successfully updated holiday information."
+        is_holiday_mock.side_effect = HolidayAPIStatusError(status_code)
+
+        result = update_is_signup_date_holiday.apply(
+            args=(1, "2023-09-01 12:30:00")
+        ).get()
+
+        geolocation_class_mock.objects.filter.return_value.update.assert_not_called()
+        assert result == (
+            f"Geolocation_1: Holiday api response status code {status_code} "
+            "is not good to retry."
+        )
+
+
+@pytest.fixture
+def db_pending_user():
+    user = User.objects.create_user(
+        username="user1@domain.com", password="password", is_active=False
+    )
+    EmailVerification.objects.create(user=user)
+    return user
+
+
+@pytest.mark.django_db
+@pytest.mark.celery(result_backend="redis://")
+@patch("st_auth.tasks.validate_email")
+class TestValidateUserEmail:
+    def test_email_is_verified(self, validate_email_mock, db_pending_user):
+        validate_email_mock.return_value = {"success": "user1@domain.com"}
+
+        result = validate_user_email.apply(args=(db_pending_user.id,)).get()
+
+        validate_email_mock.assert_called_once_with("user1@domain.com")
+        db_pending_user.refresh_from_db()
+        assert db_pending_user.is_active
+        assert (
+            db_pending_user.email_verification.status
+            == EmailVerification.Status.VERIFIED
+        )
+        assert result == (
+            f"User_{db_pending_user.id}: "
+            "Successfully verified email and activated user."
+        )
+
+    def test_email_is_rejected(self, validate_email_mock, db_pending_user):
+        validate_email_mock.return_value = {"validation_error": "unusable_email"}
+
+        validate_user_email.apply(args=(db_pending_user.id,)).get()
+
+        db_pending_user.refresh_from_db()
+        assert not db_pending_user.is_active
+        assert (
+            db_pending_user.email_verification.status
+            == EmailVerification.Status.REJECTED
+        )
+        assert db_pending_user.email_verification.result == {
+            "validation_error": "unusable_email"
+        }
+
+    @patch.object(validate_user_email, "retry")
+    def test_gateway_error_is_retried(
+        self, retry_mock, validate_email_mock, db_pending_user
+    ):
+        validate_email_mock.side_effect = serializers.ValidationError(
+            {"validation_error": "Gateway call failed"}
+        )
+        retry_mock.side_effect = RetryableHTTPStatusException
+
+        with pytest.raises(RetryableHTTPStatusException):
+            validate_user_email.apply(args=(db_pending_user.id,)).get()
+
+        retry_mock.assert_called_once()
+        assert (
+            EmailVerification.objects.get(user=db_pending_user).status
+            == EmailVerification.Status.PENDING
+        )
+
+    @patch.object(validate_user_email, "retry")
+    def test_gateway_error_rejects_once_retries_are_exhausted(
+        self, retry_mock, validate_email_mock, db_pending_user
+    ):
+        validate_email_mock.side_effect = serializers.ValidationError(
+            {"validation_error": "Gateway call failed"}
+        )
+
+        result = validate_user_email.apply(
+            args=(db_pending_user.id,), retries=settings.CELERY_MAX_RETRIES
+        ).get()
+
+        retry_mock.assert_not_called()
+        email_verification = EmailVerification.objects.get(user=db_pending_user)
+        assert email_verification.status == EmailVerification.Status.REJECTED
+        assert email_verification.result == {"validation_error": "Gateway call failed"}
+        assert result == (
+            f"User_{db_pending_user.id}: "
+            "Email validation ran out of retries, rejected the email."
+        )
+
+    def test_no_pending_verification(self, validate_email_mock):
+        result = validate_user_email.apply(args=(1,)).get()
+
+        validate_email_mock.assert_not_called()
+        assert result == (
+            "User_1: Pending email verification cannot be found in DB! "
+            "Skipping email validation."
+        )
+
+
+@patch("st_auth.tasks.process_geolocation_batch")
+@patch("st_auth.tasks.create_user_geolocation")
+@patch("st_auth.tasks.geolocation_batch")
+class TestEnqueueUserGeolocation:
+    def test_task_is_dispatched_without_batch_mode(
+        self, geolocation_batch_mock, create_user_geolocation_mock, _
+    ):
+        enqueue_user_geolocation(1, "1.1.1.1", "2023-09-01 12:30:00")
+
+        create_user_geolocation_mock.delay.assert_called_once_with(
+            1, "1.1.1.1", "2023-09-01 12:30:00"
+        )
+        geolocation_batch_mock.push.assert_not_called()
+
+    @pytest.mark.parametrize("queue_length,triggered", [(3, False), (4, True)])
+    def test_entry_is_queued_in_batch_mode(
+        self,
+        geolocation_batch_mock,
+        create_user_geolocation_mock,
+        process_geolocation_batch_mock,
+        settings,
+        queue_length,
+        triggered,
+    ):
+        settings.GEOLOCATION_BATCH_MODE = True
+        settings.GEOLOCATION_BATCH_SIZE = 2
+        geolocation_batch_mock.push.return_value = queue_length
+
+        enqueue_user_geolocation(1, "1.1.1.1", "2023-09-01 12:30:00")
+
+        geolocation_batch_mock.push.assert_called_once_with(
+            [
+                {
+                    "user_id": 1,
+                    "ip_address": "1.1.1.1",
+                    "signup_date_utc": "2023-09-01 12:30:00",
+                    "attempts": 0,
+                }
+            ]
+        )
+        create_user_geolocation_mock.delay.assert_not_called()
+        assert process_geolocation_batch_mock.delay.called is triggered
+
+    def test_task_is_dispatched_when_redis_is_down(
+        self, geolocation_batch_mock, create_user_geolocation_mock, _, settings
+    ):
+        settings.GEOLOCATION_BATCH_MODE = True
+        geolocation_batch_mock.push.side_effect = redis.ConnectionError
+
+        enqueue_user_geolocation(1, "1.1.1.1", "2023-09-01 12:30:00")
+
+        create_user_geolocation_mock.delay.assert_called_once_with(
+            1, "1.1.1.1", "2023-09-01 12:30:00"
+        )
+
+
+def _geolocation_response(ip_address):
+    response_mock = Mock(spec=requests.Response, status_code=HTTPStatus.OK.value)
+    response_mock.json.return_value = {
+        "ip_address": ip_address,
+        "country_code": "TR",
+        "timezone": {"name": "Europe/Istanbul"},
+    }
+    return response_mock
+
+
+@pytest.mark.django_db
+@pytest.mark.celery(result_backend="redis://")
+@patch("st_auth.tasks.update_is_signup_date_holiday")
+@patch("st_auth.tasks.is_holiday")
+@patch("st_auth.tasks.get_geolocation")
+@patch("st_auth.tasks.geolocation_batch")
+class TestProcessGeolocationBatch:
+    @pytest.fixture
+    def db_users(self):
+        return [
+            User.objects.create_user(username=f"user{user_id}@domain.com", id=user_id)
+            for user_id in range(1, 5)
+        ]
+
+    def test_batch_is_processed(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+        settings,
+        django_assert_max_num_queries,
+    ):
+        settings.GEOLOCATION_BATCH_SIZE = 3
+        entries = [
+            {
+                "user_id": user.id,
+                "ip_address": f"{user.id}.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": 0,
+            }
+            for user in db_users
+        ]
+        geolocation_batch_mock.length.return_value = 4
+        geolocation_batch_mock.pop.side_effect = [entries[:3], entries[3:]]
+        get_geolocation_mock.side_effect = _geolocation_response
+        is_holiday_mock.return_value = True
+
+        with django_assert_max_num_queries(4):
+            result = process_geolocation_batch.apply().get()
+
+        assert result == "Successfully created 4 geolocations from the batch queue."
+        geolocation_batch_mock.pop.assert_has_calls([call(3), call(1)])
+        assert get_geolocation_mock.call_count == 4
+        is_holiday_mock.assert_called_with("TR", datetime.date(2023, 10, 29))
+        assert sorted(
+            Geolocation.objects.values_list(
+                "user_id", "ip_address", "signed_up_on_holiday"
+            )
+        ) == [
+            (1, "1.1.1.1", True),
+            (2, "2.1.1.1", True),
+            (3, "3.1.1.1", True),
+            (4, "4.1.1.1", True),
+        ]
+        update_is_signup_date_holiday_mock.delay.assert_not_called()
+        geolocation_batch_mock.push.assert_not_called()
+        geolocation_batch_mock.ack.assert_has_calls(
+            [call(entries[:3]), call(entries[3:])]
+        )
+        assert geolocation_batch_mock.lock.return_value.reacquire.call_count == 2
+        geolocation_batch_mock.requeue_unacked.assert_called_once_with(
+            settings.GEOLOCATION_BATCH_MAX_ATTEMPTS
+        )
+
+    def test_failed_chunk_is_not_acknowledged(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+    ):
+        geolocation_batch_mock.length.return_value = 1
+        geolocation_batch_mock.pop.return_value = [
+            {
+                "user_id": 1,
+                "ip_address": "1.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": 0,
+            }
+        ]
+        get_geolocation_mock.side_effect = _geolocation_response
+
+        with patch(
+            "st_auth.tasks.Geolocation.objects.bulk_create",
+            side_effect=DatabaseError,
+        ):
+            with pytest.raises(DatabaseError):
+                process_geolocation_batch.apply().get()
+
+        geolocation_batch_mock.ack.assert_not_called()
+        geolocation_batch_mock.lock.return_value.release.assert_called_once_with()
+
+    def test_run_is_skipped_while_another_one_holds_the_lock(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+    ):
+        geolocation_batch_mock.lock.return_value.acquire.return_value = False
+
+        result = process_geolocation_batch.apply().get()
+
+        assert result == "Geolocation batch queue is processed by another run."
+        geolocation_batch_mock.requeue_unacked.assert_not_called()
+        geolocation_batch_mock.pop.assert_not_called()
+
+    def test_open_circuit_defers_entries_and_stops_the_run(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+        settings,
+    ):
+        settings.GEOLOCATION_BATCH_SIZE = 1
+        entries = [
+            {
+                "user_id": user_id,
+                "ip_address": "1.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": 4,
+            }
+            for user_id in [1, 2]
+        ]
+        geolocation_batch_mock.length.return_value = 2
+        geolocation_batch_mock.pop.side_effect = [entries[:1], entries[1:]]
+        get_geolocation_mock.side_effect = CircuitOpenError(
+            "abstractapi_geolocation", 30
+        )
+
+        result = process_geolocation_batch.apply().get()
+
+        assert result == "Successfully created 0 geolocations from the batch queue."
+        geolocation_batch_mock.pop.assert_called_once_with(1)
+        geolocation_batch_mock.push.assert_called_once_with(entries[:1])
+        geolocation_batch_mock.ack.assert_called_once_with(entries[:1])
+
+    def test_failures_are_queued_again(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+        settings,
+    ):
+        settings.GEOLOCATION_BATCH_MAX_ATTEMPTS = 3
+        # Keeps the order of the `get_geolocation` side effects.
+        settings.GEOLOCATION_BATCH_CONCURRENCY = 1
+        entries = [
+            {
+                "user_id": user_id,
+                "ip_address": "1.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": attempts,
+            }
+            for user_id, attempts in [(1, 0), (2, 2), (3, 0)]
+        ]
+        geolocation_batch_mock.length.return_value = 3
+        geolocation_batch_mock.pop.return_value = entries
+        get_geolocation_mock.side_effect = [
+            requests.exceptions.Timeout(),
+            requests.exceptions.Timeout(),
+            Mock(spec=requests.Response, status_code=HTTPStatus.FORBIDDEN.value),
+        ]
+
+        process_geolocation_batch.apply().get()
+
+        geolocation_batch_mock.push.assert_called_once_with(
+            [{**entries[0], "attempts": 1}]
+        )
+        assert not Geolocation.objects.exists()
+
+    def test_holiday_failure_is_deferred_to_task(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+    ):
+        geolocation_batch_mock.length.return_value = 1
+        geolocation_batch_mock.pop.return_value = [
+            {
+                "user_id": 1,
+                "ip_address": "1.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": 0,
+            }
+        ]
+        get_geolocation_mock.side_effect = _geolocation_response
+        is_holiday_mock.side_effect = HolidayAPIStatusError(503)
+
+        process_geolocation_batch.apply().get()
+
+        assert Geolocation.objects.get(user_id=1).signed_up_on_holiday is None
+        update_is_signup_date_holiday_mock.apply_async.assert_called_once_with(
+            args=(1, "2023-10-29 12:30:00"),
+            kwargs={"country_code": "TR", "timezone_name": "Europe/Istanbul"},
+            countdown=None,
+        )
+
+    @patch("st_auth.tasks.time")
+    def test_rate_limit_is_waited_for(
+        self,
+        time_mock,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+    ):
+        time_mock.monotonic.return_value = 100
+        geolocation_batch_mock.length.return_value = 1
+        geolocation_batch_mock.pop.return_value = [
+            {
+                "user_id": 1,
+                "ip_address": "1.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": 0,
+            }
+        ]
+        get_geolocation_mock.side_effect = [
+            RateLimitExceeded("abstractapi_geolocation", 0.25),
+            _geolocation_response("1.1.1.1"),
+        ]
+        is_holiday_mock.side_effect = RateLimitExceeded("abstractapi_holiday", 0.5)
+
+        process_geolocation_batch.apply().get()
+
+        time_mock.sleep.assert_called_once_with(0.25)
+        assert Geolocation.objects.get(user_id=1).signed_up_on_holiday is None
+        geolocation_batch_mock.push.assert_not_called()
+        update_is_signup_date_holiday_mock.apply_async.assert_called_once_with(
+            args=(1, "2023-10-29 12:30:00"),
+            kwargs={"country_code": "TR", "timezone_name": "Europe/Istanbul"},
+            countdown=0.5,
+        )
+
+    @patch("st_auth.tasks.time")
+    def test_long_rate_limit_wait_defers_the_entry(
+        self,
+        time_mock,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+        settings,
+    ):
+        settings.GEOLOCATION_BATCH_LOCK_TIMEOUT = 300
+        time_mock.monotonic.return_value = 100
+        entry = {
+            "user_id": 1,
+            "ip_address": "1.1.1.1",
+            "signup_date_utc": "2023-10-29 12:30:00",
+            "attempts": 0,
+        }
+        geolocation_batch_mock.length.return_value = 1
+        geolocation_batch_mock.pop.return_value = [entry]
+        get_geolocation_mock.side_effect = RateLimitExceeded(
+            "abstractapi_geolocation", 200
+        )
+
+        process_geolocation_batch.apply().get()
+
+        time_mock.sleep.assert_not_called()
+        geolocation_batch_mock.push.assert_called_once_with([entry])
+
+    def test_run_ends_when_the_lock_expired(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+    ):
+        lock_mock = geolocation_batch_mock.lock.return_value
+        lock_mock.reacquire.side_effect = redis.exceptions.LockNotOwnedError
+        geolocation_batch_mock.length.return_value = 1
+
+        process_geolocation_batch.apply().get()
+
+        geolocation_batch_mock.pop.assert_not_called()
+
+    def test_users_with_geolocation_are_skipped(
+        self,
+        geolocation_batch_mock,
+        get_geolocation_mock,
+        is_holiday_mock,
+        update_is_signup_date_holiday_mock,
+        db_users,
+    ):
+        Geolocation.objects.create(user_id=1, ip_address="1.1.1.1", geolocation={})
+        geolocation_batch_mock.length.return_value = 2
+        geolocation_batch_mock.pop.return_value = [
+            {
+                "user_id": user_id,
+                "ip_address": "1.1.1.1",
+                "signup_date_utc": "2023-10-29 12:30:00",
+                "attempts": 0,
+            }
+            for user_id in [1, 99]
+        ]
+
+        result = process_geolocation_batch.apply().get()
+
+        get_geolocation_mock.assert_not_called()
+        assert result == "Successfully created 0 geolocations from the batch queue."
 
 
 class TestConvertUTCToUserTime:
@@ -0,0 +1,208 @@
+from unittest.mock import patch
+
+import pytest
+import redis
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..jwt_helper import RevocableRefreshToken, get_tokens_for_user
+from ..token_revocation import (
+    REVOCATION_VERSION_KEY,
+    REVOKED_TOKENS_KEY,
+    REVOKED_USERS_KEY,
+    RevocationList,
+    TokenRevocationUnavailable,
+    _BloomFilter,
+)
+
+
+@pytest.fixture
+def redis_mock():
+    with patch("st_auth.token_revocation.get_redis") as get_redis_mock:
+        redis_mock = get_redis_mock.return_value
+        redis_mock.get.return_value = b"1"
+        redis_mock.pipeline.return_value.execute.return_value = [b"1", [], []]
+        redis_mock.zscore.return_value = 1700000000.0
+        yield redis_mock
+
+
+@pytest.fixture
+def revocation_list(settings):
+    settings.TOKEN_REVOCATION_SYNC_INTERVAL = 0
+    return RevocationList()
+
+
+@pytest.fixture
+def token():
+    return AccessToken.for_user(User(id=1))
+
+
+class TestBloomFilter:
+    def test_added_items_are_contained(self):
+        bloom_filter = _BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom_filter.add(f"jti-{i}")
+
+        assert all(f"jti-{i}" in bloom_filter for i in range(1000))
+
+    def test_false_positive_rate(self):
+        bloom_filter = _BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom_filter.add(f"jti-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom_filter for i in range(10000))
+        assert false_positives < 300
+
+
+class TestRevocationList:
+    def test_token_is_revoked_until_it_expires(
+        self, redis_mock, revocation_list, token
+    ):
+        revocation_list.revoke(token)
+
+        pipeline_mock = redis_mock.pipeline.return_value
+        pipeline_mock.zadd.assert_called_once_with(
+            REVOKED_TOKENS_KEY, {token["jti"]: token["exp"]}
+        )
+        pipeline_mock.incr.assert_called_once_with(REVOCATION_VERSION_KEY)
+
+    def test_revoking_fails_without_redis(self, redis_mock, revocation_list, token):
+        redis_mock.pipeline.return_value.execute.side_effect = redis.ConnectionError()
+
+        with pytest.raises(TokenRevocationUnavailable):
+            revocation_list.revoke(token)
+
+    def test_token_missing_from_bloom_filter_is_checked_in_process(
+        self, redis_mock, revocation_list, token
+    ):
+        assert revocation_list.is_revoked(token) is False
+
+        redis_mock.zscore.assert_not_called()
+
+    def test_synced_token_is_revoked(self, redis_mock, revocation_list, token):
+        redis_mock.pipeline.return_value.execute.return_value = [
+            b"1",
+            [token["jti"].encode()],
+            [],
+        ]
+
+        assert revocation_list.is_revoked(token) is True
+
+        redis_mock.zscore.assert_called_once_with(REVOKED_TOKENS_KEY, token["jti"])
+
+    def test_bloom_filter_false_positive_is_not_revoked(
+        self, redis_mock, revocation_list, token
+    ):
+        redis_mock.pipeline.return_value.execute.return_value = [
+            b"1",
+            [token["jti"].encode()],
+            [],
+        ]
+        redis_mock.zscore.return_value = None
+
+        assert revocation_list.is_revoked(token) is False
+
+    def test_locally_revoked_token_is_revoked_before_the_next_sync(
+        self, redis_mock, revocation_list, token, settings
+    ):
+        revocation_list.is_revoked(token)
+        settings.TOKEN_REVOCATION_SYNC_INTERVAL = 60
+
+        revocation_list.revoke(token)
+
+        assert revocation_list.is_revoked(token) is True
+
+    def test_tokens_issued_before_revoking_the_user_are_revoked(
+        self, redis_mock, revocation_list, token
+    ):
+        redis_mock.pipeline.return_value.execute.return_value = [
+            b"1",
+            [],
+            [(b"1", float(token["iat"]))],
+        ]
+        later_token = AccessToken.for_user(User(id=1))
+        later_token["iat"] = token["iat"] + 1
+
+        assert revocation_list.is_revoked(token) is True
+        assert revocation_list.is_revoked(later_token) is False
+        assert revocation_list.is_revoked(AccessToken.for_user(User(id=2))) is False
+
+    def test_revoking_the_user_is_stored(
+        self, redis_mock, revocation_list, token, settings
+    ):
+        revocation_list.is_revoked(token)
+        settings.TOKEN_REVOCATION_SYNC_INTERVAL = 60
+
+        with patch("st_auth.token_revocation.time.time", return_value=token["iat"]):
+            revocation_list.revoke_user(1)
+
+        redis_mock.pipeline.return_value.zadd.assert_called_once_with(
+            REVOKED_USERS_KEY, {1: token["iat"]}
+        )
+        assert revocation_list.is_revoked(token) is True
+
+    def test_sync_is_skipped_while_the_version_is_unchanged(
+        self, redis_mock, revocation_list, token
+    ):
+        revocation_list.is_revoked(token)
+        revocation_list.is_revoked(token)
+
+        assert redis_mock.get.call_count == 2
+        redis_mock.pipeline.return_value.execute.assert_called_once()
+
+    def test_sync_waits_for_the_interval(
+        self, redis_mock, revocation_list, token, settings
+    ):
+        settings.TOKEN_REVOCATION_SYNC_INTERVAL = 60
+
+        revocation_list.is_revoked(token)
+        revocation_list.is_revoked(token)
+
+        redis_mock.get.assert_called_once_with(REVOCATION_VERSION_KEY)
+
+    def test_tokens_are_accepted_without_redis(
+        self, redis_mock, revocation_list, token
+    ):
+        redis_mock.get.side_effect = redis.ConnectionError()
+
+        assert revocation_list.is_revoked(token) is False
+
+
+@pytest.mark.django_db
+class TestRevocableTokens:
+    @pytest.fixture
+    def revocation_list_mock(self):
+        with patch("st_auth.jwt_helper.revocation_list") as revocation_list_mock:
+            revocation_list_mock.is_revoked.return_value = True
+            yield revocation_list_mock
+
+    @pytest.fixture
+    def tokens(self):
+        user = User.objects.create_user(username="user1@domain.com", id=1)
+        return get_tokens_for_user(user)
+
+    def test_revoked_access_token_is_not_authenticated(
+        self, revocation_list_mock, tokens
+    ):
+        request = RequestFactory().get(
+            "/api/v1/post", HTTP_AUTHORIZATION=f"Bearer {tokens['access']}"
+        )
+
+        with pytest.raises(InvalidToken):
+            JWTAuthentication().authenticate(request)
+
+    def test_revoked_refresh_token_is_rejected(self, revocation_list_mock, tokens):
+        with pytest.raises(TokenError):
+            RevocableRefreshToken(tokens["refresh"])
+
+    def test_revoked_refresh_token_is_not_refreshed(
+        self, revocation_list_mock, tokens, client
+    ):
+        response = client.post(
+            "/api/v1/auth/token/refresh/", {"refresh": tokens["refresh"]}
+        )
+
+        assert response.status_code == 401
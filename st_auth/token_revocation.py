@@ -0,0 +1,201 @@
+"""
+Revocation of the tokens issued by `jwt_helper.get_tokens_for_user`, checked by their
+token classes. Revoked tokens are kept in Redis until they expire:
+
+* `REVOKED_TOKENS_KEY` is a sorted set of revoked `jti`s, scored by their expiry.
+* `REVOKED_USERS_KEY` is a sorted set of user ids, scored by the time before which every
+  token of the user is revoked.
+
+Every process syncs a Bloom filter of the revoked `jti`s and the revoked users at most
+every `TOKEN_REVOCATION_SYNC_INTERVAL` seconds, so tokens that are not revoked are
+checked without a Redis call. Tokens revoked by other processes are rejected after their
+next sync.
+"""
+import hashlib
+import math
+import threading
+import time
+from logging import getLogger
+
+import redis
+from django.conf import settings
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+from social_text.redis_client import get_redis
+
+logger = getLogger(__name__)
+
+REVOKED_TOKENS_KEY = "st_auth:revoked_tokens"
+REVOKED_USERS_KEY = "st_auth:revoked_users"
+# Incremented by every revocation, syncs skip reading the sets while it is unchanged.
+REVOCATION_VERSION_KEY = "st_auth:revocation_version"
+
+
+class TokenRevocationUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = {"error": "token_revocation_unavailable"}
+    default_code = "token_revocation_unavailable"
+
+
+class _BloomFilter:
+    """Bloom filter sized for `capacity` items with an `error_rate` false positive rate."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str):
+        # Double hashing, the positions are derived from two halves of a single digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """
+    Redis errors while checking tokens are logged and let the tokens through, like in
+    `CircuitBreaker`, except for tokens the Bloom filter has seen. Revoking raises
+    `TokenRevocationUnavailable` instead, logouts must not silently fail.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom_filter: _BloomFilter | None = None
+        self._revoked_users: dict[int, float] = {}
+        self._version: bytes | None = None
+        self._synced_at = -math.inf
+
+    def revoke(self, token: Token) -> None:
+        """Revokes `token` until it expires."""
+        jti = token[api_settings.JTI_CLAIM]
+        try:
+            pipeline = get_redis().pipeline()
+            pipeline.zadd(REVOKED_TOKENS_KEY, {jti: token["exp"]})
+            pipeline.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", time.time())
+            pipeline.incr(REVOCATION_VERSION_KEY)
+            pipeline.execute()
+        except redis.RedisError as exc:
+            logger.error(f"Revoking the token {jti} failed: {exc}")
+            raise TokenRevocationUnavailable() from exc
+
+        with self._lock:
+            if self._bloom_filter is not None:
+                self._bloom_filter.add(jti)
+
+    def revoke_user(self, user_id: int) -> None:
+        """
+        Revokes every token issued to the user until now. Tokens issued in the same second
+        are revoked too, as `iat` claims have a precision of a second.
+        """
+        revoked_before = int(time.time())
+        try:
+            pipeline = get_redis().pipeline()
+            pipeline.zadd(REVOKED_USERS_KEY, {user_id: revoked_before})
+            # Tokens issued before are expired by now.
+            pipeline.zremrangebyscore(
+                REVOKED_USERS_KEY, "-inf", revoked_before - self._max_token_lifetime()
+            )
+            pipeline.incr(REVOCATION_VERSION_KEY)
+            pipeline.execute()
+        except redis.RedisError as exc:
+            logger.error(f"Revoking the tokens of user {user_id} failed: {exc}")
+            raise TokenRevocationUnavailable() from exc
+
+        with self._lock:
+            self._revoked_users[user_id] = revoked_before
+
+    def is_revoked(self, token: Token) -> bool:
+        self._sync_if_due()
+
+        revoked_before = self._revoked_users.get(token.get(api_settings.USER_ID_CLAIM))
+        if revoked_before is not None and token.get("iat", 0) <= revoked_before:
+            return True
+
+        jti = token[api_settings.JTI_CLAIM]
+        bloom_filter = self._bloom_filter
+        if bloom_filter is None or jti not in bloom_filter:
+            return False
+
+        # Rules out false positives of the Bloom filter.
+        try:
+            return get_redis().zscore(REVOKED_TOKENS_KEY, jti) is not None
+        except redis.RedisError as exc:
+            logger.warning(
+                f"Token {jti} is considered revoked, checking it failed: {exc}"
+            )
+            return True
+
+    def _sync_if_due(self) -> None:
+        with self._lock:
+            if (
+                time.monotonic()
+                < self._synced_at + settings.TOKEN_REVOCATION_SYNC_INTERVAL
+            ):
+                return
+
+            # Failed syncs are retried after an interval too. Other threads keep checking
+            # against the previous state meanwhile.
+            self._synced_at = time.monotonic()
+            synced = self._bloom_filter is not None
+            synced_version = self._version
+
+        now = time.time()
+        try:
+            version = get_redis().get(REVOCATION_VERSION_KEY)
+            if synced and version == synced_version:
+                return
+
+            pipeline = get_redis().pipeline()
+            pipeline.get(REVOCATION_VERSION_KEY)
+            pipeline.zrangebyscore(REVOKED_TOKENS_KEY, now, "+inf")
+            pipeline.zrangebyscore(
+                REVOKED_USERS_KEY,
+                now - self._max_token_lifetime(),
+                "+inf",
+                withscores=True,
+            )
+            version, jtis, revoked_users = pipeline.execute()
+        except redis.RedisError as exc:
+            logger.warning(f"Syncing the revoked tokens failed: {exc}")
+            return
+
+        # Leaves room for the tokens revoked until the next sync.
+        bloom_filter = _BloomFilter(
+            max(2 * len(jtis), settings.TOKEN_REVOCATION_BLOOM_CAPACITY),
+            settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+        )
+        for jti in jtis:
+            bloom_filter.add(jti.decode())
+
+        with self._lock:
+            self._bloom_filter = bloom_filter
+            self._revoked_users = {
+                int(user_id): revoked_before
+                for user_id, revoked_before in revoked_users
+            }
+            self._version = version
+
+    @staticmethod
+    def _max_token_lifetime() -> float:
+        return max(
+            api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME
+        ).total_seconds()
+
+
+revocation_list = RevocationList()
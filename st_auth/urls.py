@@ -1,8 +1,14 @@
+from django.conf import settings
 from django.urls import path
 
-from .api import login, signup
+from . import api, async_api
+
+# The async views do not block a thread per request under ASGI, see `async_api`.
+views = async_api if settings.AUTH_ASYNC_VIEWS else api
 
 urlpatterns = [
-    path("signup", signup, name="auth_signup"),
-    path("login", login, name="auth_login"),
+    path("signup", views.signup, name="auth_signup"),
+    path("login", views.login, name="auth_login"),
+    path("logout", api.logout, name="auth_logout"),
+    path("logout/all", api.logout_all, name="auth_logout_all"),
 ]
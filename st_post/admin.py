@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Post, PostLike
+from .models import Follow, Post, PostLike
 
 admin.site.register(Post)
 admin.site.register(PostLike)
+admin.site.register(Follow)
@@ -1,21 +1,137 @@
-from rest_framework import permissions, status
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from drf_spectacular.utils import extend_schema
+from rest_framework import mixins, permissions, status
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from .models import Post, PostLike
-from .serializers import PostLikeSerializer, PostSerializer
+from . import list_cache
+from .conditional import post_etag, post_last_modified, post_list_etag
+from .models import Follow, Post, PostLike, counted_like_count
+from .pagination import OptInCursorPagination
+from .serializers import (
+    FollowSerializer,
+    PostBulkCreateResponseSerializer,
+    PostLikeBulkResponseSerializer,
+    PostLikeBulkSerializer,
+    PostLikeCreateSerializer,
+    PostLikeSerializer,
+    PostSerializer,
+    PostTimelineQuerySerializer,
+    PostTimelineResponseSerializer,
+)
+from .tasks import fan_out_posts
+from .timeline import get_home_timeline
 
 
 class PostViewSet(ModelViewSet):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = PageNumberPagination
+    pagination_class = OptInCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if getattr(self, "swagger_fake_view", False):
+            return queryset
+
+        return queryset.annotate(
+            liked_by_me=Exists(
+                PostLike.objects.filter(user=self.request.user, post=OuterRef("pk"))
+            )
+        )
+
+    @method_decorator(condition(etag_func=post_list_etag))
+    def list(self, request, *args, **kwargs):
+        cache_key, page = list_cache.get_page(request)
+
+        if page is None:
+            response = super().list(request, *args, **kwargs)
+            if cache_key:
+                list_cache.set_page(cache_key, response.data)
+            return response
+
+        post_ids = [result["id"] for result in page["results"]]
+        liked_post_ids = set()
+        if post_ids:
+            liked_post_ids = set(
+                PostLike.objects.filter(
+                    user=request.user, post_id__in=post_ids
+                ).values_list("post_id", flat=True)
+            )
+
+        for result in page["results"]:
+            result["liked_by_me"] = result["id"] in liked_post_ids
+
+        return Response(page)
+
+    @method_decorator(
+        condition(etag_func=post_etag, last_modified_func=post_last_modified)
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        post = serializer.save(user=self.request.user)
+        transaction.on_commit(lambda: fan_out_posts.delay(post.user_id, [post.id]))
+
+    @extend_schema(
+        request=PostSerializer(many=True),
+        responses={status.HTTP_201_CREATED: PostBulkCreateResponseSerializer},
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.POST_BULK_CREATE_MAX_SIZE,
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            posts = Post.objects.bulk_create(
+                [Post(user=request.user, **data) for data in serializer.validated_data]
+            )
+            post_ids = [post.id for post in posts]
+            list_cache.bump_generation()
+            transaction.on_commit(
+                lambda: fan_out_posts.delay(request.user.id, post_ids)
+            )
+
+        return Response({"ids": post_ids}, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        parameters=[PostTimelineQuerySerializer],
+        responses={status.HTTP_200_OK: PostTimelineResponseSerializer},
+    )
+    @action(detail=False, methods=["get"])
+    def timeline(self, request):
+        query_serializer = PostTimelineQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        max_id = query_serializer.validated_data.get("max_id")
+
+        posts, next_max_id = get_home_timeline(
+            self.get_queryset(), request.user.id, max_id, api_settings.PAGE_SIZE
+        )
+
+        next_url = None
+        if next_max_id:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "max_id", next_max_id
+            )
+
+        return Response(
+            {"next": next_url, "results": self.get_serializer(posts, many=True).data}
+        )
 
     def perform_destroy(self, instance):
         if self.request.user != instance.user:
@@ -44,30 +160,149 @@ class PostLikeViewSet(ModelViewSet):
     queryset = PostLike.objects.all()
     serializer_class = PostLikeSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = PageNumberPagination
+    pagination_class = OptInCursorPagination
 
     def create(self, request, *args, **kwargs):
-        if PostLike.objects.filter(
-            user=self.request.user, post_id=request.data["post"]
-        ).exists():
+        input_serializer = PostLikeCreateSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+        post_id = input_serializer.validated_data["post"]
+
+        try:
+            post_like = PostLike.objects.create_if_not_liked(
+                user=self.request.user, post_id=post_id
+            )
+        except Post.DoesNotExist:
+            raise ValidationError(
+                {"post": [f'Invalid pk "{post_id}" - object does not exist.']}
+            )
+
+        if post_like is None:
             raise ValidationError({"error": "user_already_liked_the_post"})
 
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        list_cache.bump_generation()
+
+        serializer = self.get_serializer(post_like)
         headers = self.get_success_headers(serializer.data)
         return Response(
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
+    @transaction.atomic
     def perform_destroy(self, instance):
         if self.request.user != instance.user:
             raise ValidationError({"error": "cannot_delete_other_users_likes"})
 
-        instance.delete()
+        deleted, _ = instance.delete()
+        # A concurrent request may have deleted the like, and decremented the count, first.
+        if not deleted:
+            return
+
+        Post.objects.filter(id=instance.post_id).update(like_count=F("like_count") - 1)
+        list_cache.bump_generation()
 
     def perform_update(self, serializer):
         raise ValidationError({"error": "like_update_not_allowed"})
+
+    @extend_schema(
+        request=PostLikeBulkSerializer,
+        responses={status.HTTP_200_OK: PostLikeBulkResponseSerializer},
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        serializer = PostLikeBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        post_ids = serializer.validated_data["posts"]
+        like = serializer.validated_data["action"] == "like"
+
+        with transaction.atomic():
+            already_liked_by_post_id = dict(
+                Post.objects.filter(id__in=post_ids)
+                .annotate(
+                    already_liked=Exists(
+                        PostLike.objects.filter(user=request.user, post=OuterRef("pk"))
+                    )
+                )
+                .values_list("id", "already_liked")
+            )
+
+            if like:
+                self._bulk_like(
+                    [
+                        post_id
+                        for post_id, already_liked in already_liked_by_post_id.items()
+                        if not already_liked
+                    ]
+                )
+            else:
+                self._bulk_unlike(
+                    [
+                        post_id
+                        for post_id, already_liked in already_liked_by_post_id.items()
+                        if already_liked
+                    ]
+                )
+
+        results = []
+        for post_id in post_ids:
+            if post_id not in already_liked_by_post_id:
+                result = "post_does_not_exist"
+            elif like:
+                result = (
+                    "already_liked" if already_liked_by_post_id[post_id] else "liked"
+                )
+            else:
+                result = "unliked" if already_liked_by_post_id[post_id] else "not_liked"
+
+            results.append({"post": post_id, "result": result})
+
+        return Response({"results": results})
+
+    def _bulk_like(self, post_ids):
+        if not post_ids:
+            return
+
+        PostLike.objects.bulk_create(
+            [PostLike(user=self.request.user, post_id=post_id) for post_id in post_ids],
+            ignore_conflicts=True,
+        )
+        # Recount instead of incrementing, a concurrent like of the same post may have been
+        # skipped by `ignore_conflicts`.
+        Post.objects.filter(id__in=post_ids).update(like_count=counted_like_count())
+        list_cache.bump_generation()
+
+    def _bulk_unlike(self, post_ids):
+        if not post_ids:
+            return
+
+        PostLike.objects.filter(user=self.request.user, post_id__in=post_ids).delete()
+        Post.objects.filter(id__in=post_ids).update(like_count=counted_like_count())
+        list_cache.bump_generation()
+
+
+class FollowViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    queryset = Follow.objects.order_by("id")
+    serializer_class = FollowSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptInCursorPagination
+
+    def get_queryset(self):
+        return super().get_queryset().filter(follower=self.request.user)
+
+    def perform_create(self, serializer):
+        followee = serializer.validated_data["followee"]
+
+        if followee == self.request.user:
+            raise ValidationError({"error": "cannot_follow_yourself"})
+
+        # The unique constraint rejects concurrent follows too, unlike a prior lookup.
+        try:
+            with transaction.atomic():
+                serializer.save(follower=self.request.user)
+        except IntegrityError:
+            raise ValidationError({"error": "user_already_followed"})
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StPostConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "st_post"
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,83 @@
+"""
+Validators for conditional GETs of posts, used with `django.views.decorators.http.condition`
+so unchanged posts are answered with a 304 before any serialization happens.
+
+`like_count` and `liked_by_me` change without touching `updated_at`, so they are only
+covered by the ETag, which takes precedence over `Last-Modified` when clients send both.
+The list ETag is derived from the post list cache generation. `Max(updated_at)` misses
+deletions and like writes, so without the cache the list sends no validator at all.
+"""
+from hashlib import md5
+
+from django.db.models import Exists, OuterRef
+
+from . import list_cache
+from .models import Post, PostLike
+
+
+def _make_etag(*parts) -> str:
+    data = ":".join(str(part) for part in parts).encode()
+    return md5(data, usedforsecurity=False).hexdigest()
+
+
+def _memoize_on_request(func):
+    """`condition` calls both validators, this runs their shared query only once."""
+    attribute = f"_st_post_{func.__name__}"
+
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, attribute):
+            setattr(request, attribute, func(request, *args, **kwargs))
+        return getattr(request, attribute)
+
+    return wrapper
+
+
+@_memoize_on_request
+def _post_state(request, pk, **kwargs):
+    # Invalid pks are left to `get_object`, which answers them with a 404.
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+
+    return (
+        Post.objects.filter(pk=pk)
+        .annotate(
+            liked_by_me=Exists(
+                PostLike.objects.filter(user=request.user, post=OuterRef("pk"))
+            )
+        )
+        .values_list("updated_at", "like_count", "liked_by_me")
+        .first()
+    )
+
+
+def post_etag(request, pk, **kwargs) -> str | None:
+    state = _post_state(request, pk)
+    if state is None:
+        return None
+
+    return _make_etag(pk, *state)
+
+
+def post_last_modified(request, pk, **kwargs):
+    state = _post_state(request, pk)
+    if state is None:
+        return None
+
+    updated_at, _, _ = state
+    return updated_at
+
+
+@_memoize_on_request
+def _post_list_generation(request, **kwargs):
+    return list_cache.get_generation()
+
+
+def post_list_etag(request, **kwargs) -> str | None:
+    # The generation changes after every post or like write, so no query is needed.
+    generation = _post_list_generation(request)
+    if generation is None:
+        return None
+
+    return _make_etag(request.user.id, request.get_full_path(), generation)
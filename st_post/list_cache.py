@@ -0,0 +1,116 @@
+import time
+from functools import wraps
+from logging import getLogger
+from urllib.parse import urlencode
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.request import Request
+
+logger = getLogger(__name__)
+
+GENERATION_KEY = "st_post:post_list:generation"
+PAGE_KEY = "st_post:post_list:{generation}:{host}:{query}"
+STATS_KEY = "st_post:post_list:{result}"
+
+# Per user fields are not shared through the cache, `PostViewSet.list` fills them.
+PER_USER_FIELDS = ("liked_by_me",)
+
+
+def _ignore_cache_errors(default=None):
+    """The cache is an optimization, a Redis outage should not fail post requests."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except redis.RedisError as exc:
+                logger.warning(f"Post list cache call {func.__name__} failed: {exc}")
+                return default
+
+        return wrapper
+
+    return decorator
+
+
+def _incr(key: str, initial: int) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, initial, timeout=None)
+
+
+@_ignore_cache_errors()
+def _incr_generation() -> None:
+    # A lost generation key restarts from the clock, so it never reuses old page keys.
+    _incr(GENERATION_KEY, initial=time.time_ns())
+
+
+def bump_generation() -> None:
+    """
+    Invalidates every cached list page at once: page keys contain the generation, so the
+    old pages are never read again and expire with `POST_LIST_CACHE_TIMEOUT`.
+
+    The bump waits for the current transaction to commit, otherwise a concurrent list
+    request could cache the pre-commit page under the new generation.
+    """
+    transaction.on_commit(_incr_generation)
+
+
+def _get_generation() -> int:
+    return cache.get_or_set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+@_ignore_cache_errors()
+def get_generation() -> int | None:
+    """Returns the current generation, it changes after every post or like write."""
+    return _get_generation()
+
+
+def _get_page_key(request: Request) -> str:
+    return PAGE_KEY.format(
+        generation=_get_generation(),
+        host=request.get_host(),
+        query=urlencode(sorted(request.query_params.lists()), doseq=True),
+    )
+
+
+@_ignore_cache_errors(default=(None, None))
+def get_page(request: Request) -> tuple[str | None, dict | None]:
+    """Returns the cache key of the requested list page and the page if it is cached."""
+    key = _get_page_key(request)
+    page = cache.get(key)
+
+    _incr(STATS_KEY.format(result="hits" if page else "misses"), initial=1)
+
+    return key, page
+
+
+@_ignore_cache_errors()
+def set_page(key: str, page: dict) -> None:
+    page = {
+        **page,
+        "results": [
+            {
+                field: value
+                for field, value in result.items()
+                if field not in PER_USER_FIELDS
+            }
+            for result in page["results"]
+        ],
+    }
+    cache.set(key, page, timeout=settings.POST_LIST_CACHE_TIMEOUT)
+
+
+@_ignore_cache_errors(default={"hits": 0, "misses": 0})
+def get_stats() -> dict:
+    stats = cache.get_many(
+        [STATS_KEY.format(result="hits"), STATS_KEY.format(result="misses")]
+    )
+    return {
+        "hits": stats.get(STATS_KEY.format(result="hits"), 0),
+        "misses": stats.get(STATS_KEY.format(result="misses"), 0),
+    }
@@ -0,0 +1,15 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from st_post import list_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the deployment wide counters of st_post as JSON, e.g. for a cron job."
+    )
+
+    def handle(self, *args, **options):
+        stats = {"post_list_cache": list_cache.get_stats()}
+        self.stdout.write(json.dumps(stats, indent=2))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from st_post import list_cache
+from st_post.models import Post, counted_like_count
+
+
+class Command(BaseCommand):
+    help = "Recomputes Post.like_count from PostLike rows and fixes posts that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Number of posts checked per UPDATE statement.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drifted posts, do not update them.",
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        fixed = 0
+        last_id = 0
+
+        while True:
+            batch_ids = list(
+                Post.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not batch_ids:
+                break
+
+            last_id = batch_ids[-1]
+            drifted = (
+                Post.objects.filter(id__gte=batch_ids[0], id__lte=last_id)
+                .annotate(counted=counted_like_count())
+                .exclude(like_count=F("counted"))
+            )
+
+            if dry_run:
+                fixed += drifted.count()
+            else:
+                fixed += Post.objects.filter(id__in=drifted.values("id")).update(
+                    like_count=counted_like_count()
+                )
+
+        if fixed and not dry_run:
+            list_cache.bump_generation()
+
+        verb = "Found" if dry_run else "Fixed"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {fixed} posts with drifted like_count.")
+        )
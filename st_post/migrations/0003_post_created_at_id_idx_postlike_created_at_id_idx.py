@@ -0,0 +1,27 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:19
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("st_post", "0002_alter_post_user_postlike"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="post",
+            index=models.Index(
+                fields=["created_at", "id"], name="post_created_at_id_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="postlike",
+            index=models.Index(
+                fields=["created_at", "id"], name="postlike_created_at_id_idx"
+            ),
+        ),
+    ]
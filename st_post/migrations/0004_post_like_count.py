@@ -0,0 +1,51 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:22
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 10000
+
+
+def backfill_like_count(apps, schema_editor):
+    """
+    Updates the posts in id ranges of `BATCH_SIZE`, each in its own transaction, so the
+    table is never locked as a whole. Counts drifting during the backfill are fixed by
+    `manage.py reconcile_like_counts`.
+    """
+    Post = apps.get_model("st_post", "Post")
+    PostLike = apps.get_model("st_post", "PostLike")
+
+    like_counts = (
+        PostLike.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    id_range = Post.objects.aggregate(min_id=Min("id"), max_id=Max("id"))
+    if id_range["min_id"] is None:
+        return
+
+    for start in range(id_range["min_id"], id_range["max_id"] + 1, BATCH_SIZE):
+        Post.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE).update(
+            like_count=Coalesce(Subquery(like_counts), 0)
+        )
+
+
+class Migration(migrations.Migration):
+    # Commits the backfill batch by batch instead of in a single transaction.
+    atomic = False
+
+    dependencies = [
+        ("st_post", "0003_post_created_at_id_idx_postlike_created_at_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_like_count, migrations.RunPython.noop),
+    ]
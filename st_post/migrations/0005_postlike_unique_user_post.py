@@ -0,0 +1,75 @@
+# Generated by Django 4.2.5 on 2026-10-18 01:23
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def delete_duplicate_likes(apps, schema_editor):
+    Post = apps.get_model("st_post", "Post")
+    PostLike = apps.get_model("st_post", "PostLike")
+
+    duplicates = (
+        PostLike.objects.values("user", "post")
+        .annotate(first_id=Min("id"), count=Count("id"))
+        .filter(count__gt=1)
+    )
+
+    affected_post_ids = set()
+    for duplicate in duplicates.iterator():
+        PostLike.objects.filter(user=duplicate["user"], post=duplicate["post"]).exclude(
+            id=duplicate["first_id"]
+        ).delete()
+        affected_post_ids.add(duplicate["post"])
+
+    like_counts = (
+        PostLike.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Post.objects.filter(id__in=affected_post_ids).update(
+        like_count=Coalesce(Subquery(like_counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("st_post", "0004_post_like_count"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_likes, migrations.RunPython.noop, atomic=True
+        ),
+        # Build the unique index without blocking writes, then attach the constraint to it.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql=(
+                        "CREATE UNIQUE INDEX CONCURRENTLY postlike_unique_user_post "
+                        "ON st_post_postlike (user_id, post_id)"
+                    ),
+                    reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS postlike_unique_user_post",
+                ),
+                migrations.RunSQL(
+                    sql=(
+                        "ALTER TABLE st_post_postlike ADD CONSTRAINT postlike_unique_user_post "
+                        "UNIQUE USING INDEX postlike_unique_user_post"
+                    ),
+                    reverse_sql="ALTER TABLE st_post_postlike DROP CONSTRAINT postlike_unique_user_post",
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name="postlike",
+                    constraint=models.UniqueConstraint(
+                        fields=("user", "post"), name="postlike_unique_user_post"
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:12
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("st_post", "0006_follow"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="post",
+            index=models.Index(fields=["updated_at"], name="post_updated_at_idx"),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import connection, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class Post(models.Model):
@@ -7,6 +10,57 @@ class Post(models.Model):
     text = models.CharField(max_length=512)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    like_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="post_created_at_id_idx"),
+            models.Index(fields=["updated_at"], name="post_updated_at_idx"),
+        ]
+
+
+class PostLikeManager(models.Manager):
+    def create_if_not_liked(self, user: User, post_id: int) -> "PostLike | None":
+        """
+        Likes the post in a single `INSERT ... ON CONFLICT DO NOTHING` statement which also
+        increments `Post.like_count`. Returns `None` if the user already liked the post and
+        raises `Post.DoesNotExist` if there is no such post.
+        """
+        post_table = Post._meta.db_table
+        post_like_table = self.model._meta.db_table
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH post AS (
+                    SELECT id FROM {post_table} WHERE id = %(post_id)s
+                ), inserted AS (
+                    INSERT INTO {post_like_table} (user_id, post_id, created_at)
+                    SELECT %(user_id)s, id, %(created_at)s FROM post
+                    ON CONFLICT (user_id, post_id) DO NOTHING
+                    RETURNING id, created_at
+                ), counted AS (
+                    UPDATE {post_table} SET like_count = like_count + 1
+                    WHERE id IN (SELECT id FROM post) AND EXISTS (SELECT 1 FROM inserted)
+                )
+                SELECT
+                    EXISTS (SELECT 1 FROM post),
+                    (SELECT id FROM inserted),
+                    (SELECT created_at FROM inserted)
+                """,
+                {"post_id": post_id, "user_id": user.id, "created_at": timezone.now()},
+            )
+            post_exists, post_like_id, created_at = cursor.fetchone()
+
+        if not post_exists:
+            raise Post.DoesNotExist
+
+        if post_like_id is None:
+            return None
+
+        return self.model(
+            id=post_like_id, user=user, post_id=post_id, created_at=created_at
+        )
 
 
 class PostLike(models.Model):
@@ -15,3 +69,53 @@ class PostLike(models.Model):
     )
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="post_likes")
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PostLikeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="postlike_created_at_id_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="postlike_unique_user_post"
+            ),
+        ]
+
+
+def counted_like_count():
+    """
+    Expression that counts the `PostLike` rows of the outer `Post`. Used to reconcile the
+    denormalized `Post.like_count` column.
+    """
+    like_counts = (
+        PostLike.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(like_counts), 0)
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="following"
+    )
+    followee = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="followers"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["follower", "followee"], name="follow_unique_follower_followee"
+            ),
+            models.CheckConstraint(
+                check=~models.Q(follower=models.F("followee")),
+                name="follow_follower_is_not_followee",
+            ),
+        ]
@@ -0,0 +1,55 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    ordering = ("created_at", "id")
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page number pagination by default. Clients can opt in to keyset pagination
+    over `(created_at, id)` with `?pagination=cursor`, which skips the `COUNT(*)`
+    and `OFFSET` scan and returns opaque `next` / `previous` cursors instead.
+    """
+
+    pagination_query_param = "pagination"
+    cursor_pagination_value = "cursor"
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            request.query_params.get(self.pagination_query_param)
+            == self.cursor_pagination_value
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator:
+            return self.cursor_paginator.to_html()
+
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.pagination_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `cursor` to use cursor pagination.",
+                "schema": {"type": "string", "enum": [self.cursor_pagination_value]},
+            },
+            *self.cursor_pagination_class().get_schema_operation_parameters(view),
+        ]
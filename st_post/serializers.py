@@ -1,13 +1,30 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from .models import Post, PostLike
+from .models import Follow, Post, PostLike
 
 
 class PostSerializer(serializers.ModelSerializer):
+    # Annotated by `PostViewSet.get_queryset`, posts that are just created are not liked.
+    liked_by_me = serializers.BooleanField(read_only=True, default=False)
+
     class Meta:
         model = Post
         fields = "__all__"
-        read_only_fields = ("id", "user", "created_at", "updated_at")
+        read_only_fields = ("id", "user", "created_at", "updated_at", "like_count")
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        # `like_count` is maintained with atomic `F()` updates, saving only the edited
+        # fields keeps a stale in-memory value from overwriting it.
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
+
+class PostBulkCreateResponseSerializer(serializers.Serializer):  # noqa
+    ids = serializers.ListField(child=serializers.IntegerField())
 
 
 class PostLikeSerializer(serializers.ModelSerializer):
@@ -15,3 +32,58 @@ class PostLikeSerializer(serializers.ModelSerializer):
         model = PostLike
         fields = "__all__"
         read_only_fields = ("id", "user", "created_at")
+
+
+class PostLikeCreateSerializer(serializers.Serializer):  # noqa
+    post = serializers.IntegerField()
+
+
+class PostLikeBulkSerializer(serializers.Serializer):  # noqa
+    action = serializers.ChoiceField(choices=("like", "unlike"))
+    posts = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    @staticmethod
+    def validate_posts(posts):
+        if len(posts) > settings.POST_LIKE_BULK_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {settings.POST_LIKE_BULK_MAX_SIZE} elements."
+            )
+
+        return list(dict.fromkeys(posts))
+
+
+class PostLikeBulkResultSerializer(serializers.Serializer):  # noqa
+    post = serializers.IntegerField()
+    result = serializers.ChoiceField(
+        choices=(
+            "liked",
+            "already_liked",
+            "unliked",
+            "not_liked",
+            "post_does_not_exist",
+        )
+    )
+
+
+class PostLikeBulkResponseSerializer(serializers.Serializer):  # noqa
+    results = PostLikeBulkResultSerializer(many=True)
+
+
+class PostTimelineQuerySerializer(serializers.Serializer):  # noqa
+    max_id = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Only return posts with smaller ids, used to fetch the next page.",
+    )
+
+
+class PostTimelineResponseSerializer(serializers.Serializer):  # noqa
+    next = serializers.URLField(allow_null=True)
+    results = PostSerializer(many=True)
+
+
+class FollowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Follow
+        fields = "__all__"
+        read_only_fields = ("id", "follower", "created_at")
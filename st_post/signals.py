@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import list_cache
+from .models import Post
+
+
+# `PostLike` writes bump the generation explicitly: they update `like_count` with
+# `QuerySet.update()`, which sends no signal, and a `PostLike` receiver would turn the
+# bulk unlike into a delete per row.
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post_list_cache(**kwargs):
+    list_cache.bump_generation()
@@ -0,0 +1,57 @@
+import redis
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+
+from . import timeline
+from .models import Follow
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(
+    name="st_post.tasks.fan_out_posts",
+    bind=True,
+    acks_late=True,
+    max_retries=settings.CELERY_MAX_RETRIES,
+    default_retry_delay=settings.CELERY_DELAY_BETWEEN_RETRIES,
+    retry_backoff=settings.CELERY_RETRY_BACKOFF,
+)
+def fan_out_posts(self, user_id: int, post_ids: list[int]) -> str:
+    log_prefix = f"User_{user_id}: "
+
+    followers = Follow.objects.filter(followee_id=user_id)
+    # Checking for a follower past the limit is cheaper than counting all followers.
+    max_followers = settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    is_celebrity = followers.order_by("id")[max_followers:].exists()
+
+    try:
+        timeline.set_celebrity(user_id, is_celebrity)
+        # Authors see their own posts in their home timeline.
+        timeline.push_posts(post_ids, [user_id])
+
+        if is_celebrity:
+            return log_prefix + "Celebrity posts are merged into timelines on read."
+
+        follower_count = 0
+        follower_ids = []
+        for follower_id in followers.values_list("follower_id", flat=True).iterator(
+            chunk_size=settings.TIMELINE_FANOUT_BATCH_SIZE
+        ):
+            follower_ids.append(follower_id)
+            if len(follower_ids) == settings.TIMELINE_FANOUT_BATCH_SIZE:
+                timeline.push_posts(post_ids, follower_ids)
+                follower_count += len(follower_ids)
+                follower_ids = []
+
+        if follower_ids:
+            timeline.push_posts(post_ids, follower_ids)
+            follower_count += len(follower_ids)
+
+    except redis.RedisError as exc:
+        logger.warning(log_prefix + f"Fan-out to Redis raised exception: {exc}!")
+        raise self.retry(exc=exc)
+
+    return (
+        log_prefix + f"Fanned out {len(post_ids)} posts to {follower_count} followers."
+    )
@@ -1,12 +1,16 @@
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
+import redis
 from django.contrib.auth.models import User
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from ..api import PostLikeViewSet, PostViewSet
-from ..models import Post, PostLike
+from .. import list_cache
+from ..api import FollowViewSet, PostLikeViewSet, PostViewSet
+from ..models import Follow, Post, PostLike
+from ..pagination import CreatedAtCursorPagination
 
 
 @pytest.fixture
@@ -33,6 +37,89 @@ class TestPostViewSet:
         assert response.status_code == HTTPStatus.CREATED.value
         assert response.data["text"] == "hello world"
         assert response.data["user"] == db_user_1.id
+        assert response.data["liked_by_me"] is False
+
+    @patch("st_post.api.fan_out_posts")
+    def test_create_post_is_fanned_out_after_commit(
+        self, fan_out_posts_mock, db_user_1, django_capture_on_commit_callbacks
+    ):
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/post", data={"text": "hello world"}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostViewSet.as_view({"post": "create"})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = view(request)
+
+        fan_out_posts_mock.delay.assert_called_once_with(
+            db_user_1.id, [response.data["id"]]
+        )
+
+    def test_bulk_create_posts(self, db_user_1, django_assert_max_num_queries):
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/post/bulk",
+            data=[{"text": f"hello {i}"} for i in range(3)],
+            format="json",
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostViewSet.as_view({"post": "bulk"})
+
+        with django_assert_max_num_queries(3):
+            response = view(request)
+
+        assert response.status_code == HTTPStatus.CREATED.value
+        posts = Post.objects.order_by("id")
+        assert response.data["ids"] == [post.id for post in posts]
+        assert [post.text for post in posts] == ["hello 0", "hello 1", "hello 2"]
+        assert all(post.user_id == db_user_1.id for post in posts)
+
+    def test_bulk_create_posts_batch_size_is_limited(self, db_user_1, settings):
+        settings.POST_BULK_CREATE_MAX_SIZE = 2
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/post/bulk",
+            data=[{"text": f"hello {i}"} for i in range(3)],
+            format="json",
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostViewSet.as_view({"post": "bulk"})
+
+        response = view(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert len(Post.objects.all()) == 0
+
+    @patch("st_post.timeline.get_celebrity_ids", return_value=set())
+    @patch("st_post.timeline.read_post_ids")
+    def test_timeline(self, read_post_ids_mock, get_celebrity_ids_mock, db_user_1):
+        posts = [
+            Post.objects.create(user=db_user_1, text=f"hello {i}") for i in range(3)
+        ]
+        read_post_ids_mock.return_value = [posts[2].id]
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.get("api/v1/post/timeline", {"max_id": posts[2].id + 1})
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostViewSet.as_view({"get": "timeline"})
+
+        response = view(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        read_post_ids_mock.assert_called_once_with(db_user_1.id, posts[2].id + 1, 10)
+        assert [result["text"] for result in response.data["results"]] == [
+            "hello 2",
+            "hello 1",
+            "hello 0",
+        ]
+        assert response.data["next"] is None
 
     def test_list_post(self, db_user_1):
         for i in range(3):
@@ -53,6 +140,129 @@ class TestPostViewSet:
             assert result["text"] == f"hello {i}"
             assert result["user"] == db_user_1.id
 
+    @pytest.mark.parametrize("post_count", [2, 6])
+    def test_list_post_liked_by_me_with_constant_queries(
+        self, db_user_1, post_count, django_assert_num_queries
+    ):
+        db_user_2 = User.objects.create_user(
+            username="user2@domain.com", password="password", id=2
+        )
+        posts = [
+            Post.objects.create(user=db_user_2, text=f"hello {i}")
+            for i in range(post_count)
+        ]
+        PostLike.objects.create(user=db_user_1, post=posts[0])
+        PostLike.objects.create(user=db_user_2, post=posts[1])
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostViewSet.as_view({"get": "list"})
+
+        with django_assert_num_queries(2):
+            response = view(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        assert [result["liked_by_me"] for result in response.data["results"]] == [
+            True,
+            *[False] * (post_count - 1),
+        ]
+
+    def test_list_post_is_cached_across_users(
+        self, db_user_1, django_assert_num_queries
+    ):
+        db_user_2 = User.objects.create_user(
+            username="user2@domain.com", password="password", id=2
+        )
+        posts = [
+            Post.objects.create(user=db_user_1, text=f"hello {i}") for i in range(2)
+        ]
+        PostLike.objects.create(user=db_user_2, post=posts[1])
+
+        view = PostViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        first_response = view(request)
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_2)
+        with django_assert_num_queries(1):
+            second_response = view(request)
+
+        assert second_response.status_code == HTTPStatus.OK.value
+        assert second_response.data["count"] == first_response.data["count"] == 2
+        assert [result["liked_by_me"] for result in first_response.data["results"]] == [
+            False,
+            False,
+        ]
+        assert [
+            result["liked_by_me"] for result in second_response.data["results"]
+        ] == [False, True]
+        assert list_cache.get_stats() == {"hits": 1, "misses": 1}
+
+    def test_list_post_cache_is_invalidated_on_write(
+        self, db_user_1, django_capture_on_commit_callbacks
+    ):
+        Post.objects.create(user=db_user_1, text="hello 0")
+
+        view = PostViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        assert view(request).data["count"] == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Post.objects.create(user=db_user_1, text="hello 1")
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        assert view(request).data["count"] == 2
+        assert list_cache.get_stats() == {"hits": 0, "misses": 2}
+
+    def test_list_post_works_when_cache_is_down(self, db_user_1):
+        Post.objects.create(user=db_user_1, text="hello")
+
+        view = PostViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        with patch("st_post.list_cache.cache.get", side_effect=redis.ConnectionError):
+            response = view(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        assert response.data["count"] == 1
+
+    def test_list_post_with_cursor_pagination(self, db_user_1):
+        for i in range(3):
+            Post.objects.create(user=db_user_1, text=f"hello {i}")
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        view = PostViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("api/v1/post", {"pagination": "cursor"})
+        force_authenticate(request, db_user_1, access_token)
+        with patch.object(CreatedAtCursorPagination, "page_size", 2):
+            first_page = view(request)
+
+            assert first_page.status_code == HTTPStatus.OK.value
+            assert "count" not in first_page.data
+            assert first_page.data["previous"] is None
+            assert [result["text"] for result in first_page.data["results"]] == [
+                "hello 0",
+                "hello 1",
+            ]
+
+            request = self.factory.get(first_page.data["next"])
+            force_authenticate(request, db_user_1, access_token)
+            second_page = view(request)
+
+        assert second_page.status_code == HTTPStatus.OK.value
+        assert second_page.data["next"] is None
+        assert second_page.data["previous"] is not None
+        assert [result["text"] for result in second_page.data["results"]] == ["hello 2"]
+
     def test_retrieve_post(self, db_user_1):
         post = Post.objects.create(user=db_user_1, text="hello")
 
@@ -67,6 +277,99 @@ class TestPostViewSet:
         assert response.status_code == HTTPStatus.OK.value
         assert response.data["text"] == "hello"
         assert response.data["user"] == db_user_1.id
+        assert response.data["liked_by_me"] is False
+
+    def test_retrieve_post_with_invalid_pk(self, db_user_1):
+        view = PostViewSet.as_view({"get": "retrieve"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        response = view(request, pk="abc")
+
+        assert response.status_code == HTTPStatus.NOT_FOUND.value
+
+    def test_retrieve_post_not_modified(self, db_user_1, django_assert_num_queries):
+        post = Post.objects.create(user=db_user_1, text="hello")
+
+        view = PostViewSet.as_view({"get": "retrieve"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        response = view(request, pk=post.id)
+        etag = response["ETag"]
+        last_modified = response["Last-Modified"]
+
+        request = self.factory.get("api/v1/post", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, db_user_1)
+        with django_assert_num_queries(1):
+            response = view(request, pk=post.id)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED.value
+
+        request = self.factory.get("api/v1/post", HTTP_IF_MODIFIED_SINCE=last_modified)
+        force_authenticate(request, db_user_1)
+        response = view(request, pk=post.id)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED.value
+
+    def test_retrieve_post_etag_changes_with_likes(self, db_user_1):
+        post = Post.objects.create(user=db_user_1, text="hello")
+
+        view = PostViewSet.as_view({"get": "retrieve"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        etag = view(request, pk=post.id)["ETag"]
+
+        PostLike.objects.create_if_not_liked(user=db_user_1, post_id=post.id)
+
+        request = self.factory.get("api/v1/post", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, db_user_1)
+        response = view(request, pk=post.id)
+        assert response.status_code == HTTPStatus.OK.value
+        assert response.data["like_count"] == 1
+        assert response.data["liked_by_me"] is True
+        assert response["ETag"] != etag
+
+    def test_list_post_not_modified(
+        self, db_user_1, django_capture_on_commit_callbacks
+    ):
+        Post.objects.create(user=db_user_1, text="hello 0")
+
+        view = PostViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        etag = view(request)["ETag"]
+
+        request = self.factory.get("api/v1/post", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, db_user_1)
+        assert view(request).status_code == HTTPStatus.NOT_MODIFIED.value
+
+        request = self.factory.get("api/v1/post", {"page": 1}, HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, db_user_1)
+        assert view(request).status_code == HTTPStatus.OK.value
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Post.objects.create(user=db_user_1, text="hello 1")
+
+        request = self.factory.get("api/v1/post", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, db_user_1)
+        response = view(request)
+        assert response.status_code == HTTPStatus.OK.value
+        assert response.data["count"] == 2
+
+    @patch("st_post.list_cache.get_generation", return_value=None)
+    def test_list_post_without_cache_has_no_validators(self, _, db_user_1):
+        Post.objects.create(user=db_user_1, text="hello")
+
+        view = PostViewSet.as_view({"get": "list"})
+
+        request = self.factory.get("api/v1/post")
+        force_authenticate(request, db_user_1)
+        response = view(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        assert not response.has_header("ETag")
+        assert not response.has_header("Last-Modified")
 
     def test_patch_post(self, db_user_1):
         post = Post.objects.create(user=db_user_1, text="hello")
@@ -85,6 +388,26 @@ class TestPostViewSet:
         assert response.data["text"] == "world"
         assert response.data["user"] == db_user_1.id
 
+    def test_patch_post_does_not_overwrite_like_count(self, db_user_1):
+        post = Post.objects.create(user=db_user_1, text="hello")
+        Post.objects.filter(id=post.id).update(like_count=5)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.patch(
+            "api/v1/post", data={"text": "world", "like_count": 100}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostViewSet.as_view({"patch": "partial_update"})
+
+        with patch.object(PostViewSet, "get_object", return_value=post):
+            response = view(request, pk=post.id)
+
+        assert response.status_code == HTTPStatus.OK.value
+        post.refresh_from_db()
+        assert post.text == "world"
+        assert post.like_count == 5
+
     def test_delete_post(self, db_user_1):
         post = Post.objects.create(user=db_user_1, text="hello")
 
@@ -153,6 +476,39 @@ class TestPostLikeViewSet:
         assert response.data["post"] == post.id
         assert response.data["user"] == db_user_1.id
 
+        post.refresh_from_db()
+        assert post.like_count == 1
+
+    def test_create_like_runs_a_single_query(
+        self, db_user_1, django_assert_num_queries
+    ):
+        post = Post.objects.create(user=db_user_1, text="hello")
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/like", data={"post": post.id}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostLikeViewSet.as_view({"post": "create"})
+
+        with django_assert_num_queries(1):
+            response = view(request)
+
+        assert response.status_code == HTTPStatus.CREATED.value
+        assert PostLike.objects.get(user=db_user_1, post=post).id == response.data["id"]
+
+    def test_cannot_like_non_existing_post(self, db_user_1):
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post("api/v1/like", data={"post": 1}, format="json")
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostLikeViewSet.as_view({"post": "create"})
+
+        response = view(request)
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "post" in response.data
+        assert len(PostLike.objects.all()) == 0
+
     def test_one_user_cannot_create_multiple_like_on_the_same_post(self, db_user_1):
         post = Post.objects.create(user=db_user_1, text="hello")
         PostLike.objects.create(user=db_user_1, post=post)
@@ -169,6 +525,9 @@ class TestPostLikeViewSet:
         assert response.status_code == HTTPStatus.BAD_REQUEST.value
         assert "user_already_liked_the_post" in str(response.data["error"])
 
+        post.refresh_from_db()
+        assert post.like_count == 0
+
     def test_list_like(self, db_user_1):
         posts = []
         for i in range(3):
@@ -225,7 +584,7 @@ class TestPostLikeViewSet:
         assert "like_update_not_allowed" in str(response.data["error"])
 
     def test_delete_like(self, db_user_1):
-        post = Post.objects.create(user=db_user_1, text="hello")
+        post = Post.objects.create(user=db_user_1, text="hello", like_count=1)
         post_like = PostLike.objects.create(user=db_user_1, post=post)
 
         access_token = RefreshToken.for_user(db_user_1).access_token
@@ -239,6 +598,29 @@ class TestPostLikeViewSet:
         assert response.status_code == HTTPStatus.NO_CONTENT.value
         assert len(PostLike.objects.all()) == 0
 
+        post.refresh_from_db()
+        assert post.like_count == 0
+
+    def test_delete_like_deleted_concurrently(self, db_user_1):
+        post = Post.objects.create(user=db_user_1, text="hello", like_count=1)
+        post_like = PostLike.objects.create(user=db_user_1, post=post)
+        PostLike.objects.filter(id=post_like.id).delete()
+        Post.objects.filter(id=post.id).update(like_count=0)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.delete("api/v1/like")
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostLikeViewSet.as_view({"delete": "destroy"})
+
+        with patch.object(PostLikeViewSet, "get_object", return_value=post_like):
+            response = view(request, pk=post_like.id)
+
+        assert response.status_code == HTTPStatus.NO_CONTENT.value
+
+        post.refresh_from_db()
+        assert post.like_count == 0
+
     def test_cannot_delete_others_like(self, db_user_1):
         post = Post.objects.create(user=db_user_1, text="hello")
         post_like = PostLike.objects.create(user=db_user_1, post=post)
@@ -256,3 +638,165 @@ class TestPostLikeViewSet:
 
         assert response.status_code == HTTPStatus.BAD_REQUEST.value
         assert "cannot_delete_other_users_likes" in str(response.data["error"])
+
+    def test_bulk_like(self, db_user_1, django_assert_max_num_queries):
+        posts = [
+            Post.objects.create(user=db_user_1, text=f"hello {i}") for i in range(3)
+        ]
+        PostLike.objects.create(user=db_user_1, post=posts[0])
+        Post.objects.filter(id=posts[0].id).update(like_count=1)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/like/bulk",
+            data={"action": "like", "posts": [post.id for post in posts] + [1000]},
+            format="json",
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostLikeViewSet.as_view({"post": "bulk"})
+
+        with django_assert_max_num_queries(5):
+            response = view(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        assert response.data["results"] == [
+            {"post": posts[0].id, "result": "already_liked"},
+            {"post": posts[1].id, "result": "liked"},
+            {"post": posts[2].id, "result": "liked"},
+            {"post": 1000, "result": "post_does_not_exist"},
+        ]
+        assert PostLike.objects.filter(user=db_user_1).count() == 3
+        assert list(
+            Post.objects.order_by("id").values_list("like_count", flat=True)
+        ) == [1, 1, 1]
+
+    def test_bulk_unlike(self, db_user_1, django_assert_max_num_queries):
+        posts = [
+            Post.objects.create(user=db_user_1, text=f"hello {i}") for i in range(2)
+        ]
+        PostLike.objects.create(user=db_user_1, post=posts[0])
+        Post.objects.filter(id=posts[0].id).update(like_count=1)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/like/bulk",
+            data={"action": "unlike", "posts": [post.id for post in posts]},
+            format="json",
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostLikeViewSet.as_view({"post": "bulk"})
+
+        with django_assert_max_num_queries(5):
+            response = view(request)
+
+        assert response.status_code == HTTPStatus.OK.value
+        assert response.data["results"] == [
+            {"post": posts[0].id, "result": "unliked"},
+            {"post": posts[1].id, "result": "not_liked"},
+        ]
+        assert len(PostLike.objects.all()) == 0
+        assert list(
+            Post.objects.order_by("id").values_list("like_count", flat=True)
+        ) == [0, 0]
+
+    def test_bulk_like_batch_size_is_limited(self, db_user_1, settings):
+        settings.POST_LIKE_BULK_MAX_SIZE = 2
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/like/bulk",
+            data={"action": "like", "posts": [1, 2, 3]},
+            format="json",
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = PostLikeViewSet.as_view({"post": "bulk"})
+
+        response = view(request)
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "posts" in response.data
+
+
+@pytest.mark.django_db
+class TestFollowViewSet:
+    factory = APIRequestFactory()
+
+    @pytest.fixture
+    def db_user_2(self):
+        return User.objects.create_user(
+            username="user2@domain.com", password="password", id=2
+        )
+
+    def test_create_follow(self, db_user_1, db_user_2):
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/follow", data={"followee": db_user_2.id}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = FollowViewSet.as_view({"post": "create"})
+
+        response = view(request)
+        assert response.status_code == HTTPStatus.CREATED.value
+        assert response.data["follower"] == db_user_1.id
+        assert response.data["followee"] == db_user_2.id
+
+    def test_cannot_follow_yourself(self, db_user_1):
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/follow", data={"followee": db_user_1.id}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = FollowViewSet.as_view({"post": "create"})
+
+        response = view(request)
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "cannot_follow_yourself" in str(response.data["error"])
+
+    def test_cannot_follow_twice(self, db_user_1, db_user_2):
+        Follow.objects.create(follower=db_user_1, followee=db_user_2)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.post(
+            "api/v1/follow", data={"followee": db_user_2.id}, format="json"
+        )
+        force_authenticate(request, db_user_1, access_token)
+
+        view = FollowViewSet.as_view({"post": "create"})
+
+        response = view(request)
+        assert response.status_code == HTTPStatus.BAD_REQUEST.value
+        assert "user_already_followed" in str(response.data["error"])
+        assert Follow.objects.count() == 1
+
+    def test_list_only_own_follows(self, db_user_1, db_user_2):
+        Follow.objects.create(follower=db_user_1, followee=db_user_2)
+        Follow.objects.create(follower=db_user_2, followee=db_user_1)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.get("api/v1/follow")
+        force_authenticate(request, db_user_1, access_token)
+
+        view = FollowViewSet.as_view({"get": "list"})
+
+        response = view(request)
+        assert response.status_code == HTTPStatus.OK.value
+        assert response.data["count"] == 1
+        assert response.data["results"][0]["followee"] == db_user_2.id
+
+    def test_delete_follow(self, db_user_1, db_user_2):
+        follow = Follow.objects.create(follower=db_user_1, followee=db_user_2)
+
+        access_token = RefreshToken.for_user(db_user_1).access_token
+        request = self.factory.delete("api/v1/follow")
+        force_authenticate(request, db_user_1, access_token)
+
+        view = FollowViewSet.as_view({"delete": "destroy"})
+
+        response = view(request, pk=follow.id)
+        assert response.status_code == HTTPStatus.NO_CONTENT.value
+        assert len(Follow.objects.all()) == 0
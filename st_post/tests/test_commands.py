@@ -0,0 +1,54 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+
+from .. import list_cache
+from ..models import Post, PostLike
+
+
+@pytest.fixture
+def db_user_1():
+    return User.objects.create_user(
+        username="user1@domain.com", password="password", id=1
+    )
+
+
+@pytest.mark.django_db
+class TestReconcileLikeCounts:
+    def test_drifted_like_counts_are_fixed(self, db_user_1):
+        post_1 = Post.objects.create(user=db_user_1, text="hello", like_count=3)
+        post_2 = Post.objects.create(user=db_user_1, text="world", like_count=0)
+        post_3 = Post.objects.create(user=db_user_1, text="again", like_count=1)
+        PostLike.objects.create(user=db_user_1, post=post_2)
+        PostLike.objects.create(user=db_user_1, post=post_3)
+
+        out = StringIO()
+        call_command("reconcile_like_counts", batch_size=2, stdout=out)
+
+        assert "Fixed 2 posts" in out.getvalue()
+        for post in (post_1, post_2, post_3):
+            post.refresh_from_db()
+        assert [post.like_count for post in (post_1, post_2, post_3)] == [0, 1, 1]
+
+    def test_dry_run_does_not_update(self, db_user_1):
+        post = Post.objects.create(user=db_user_1, text="hello", like_count=3)
+
+        out = StringIO()
+        call_command("reconcile_like_counts", dry_run=True, stdout=out)
+
+        assert "Found 1 posts" in out.getvalue()
+        post.refresh_from_db()
+        assert post.like_count == 3
+
+
+def test_post_stats():
+    cache.set(list_cache.STATS_KEY.format(result="hits"), 3)
+
+    out = StringIO()
+    call_command("post_stats", stdout=out)
+
+    assert json.loads(out.getvalue()) == {"post_list_cache": {"hits": 3, "misses": 0}}
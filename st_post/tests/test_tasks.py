@@ -0,0 +1,65 @@
+from unittest.mock import call, patch
+
+import pytest
+import redis
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from ..models import Follow
+from ..tasks import fan_out_posts
+
+
+@pytest.fixture
+def db_users():
+    return [
+        User.objects.create_user(
+            username=f"user{i}@domain.com", password="password", id=i
+        )
+        for i in range(1, 5)
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.celery(result_backend="redis://")
+@patch("st_post.tasks.timeline")
+class TestFanOutPosts:
+    def test_posts_are_pushed_to_author_and_followers(self, timeline_mock, db_users):
+        author, *followers = db_users
+        for follower in followers:
+            Follow.objects.create(follower=follower, followee=author)
+
+        with patch.object(settings, "TIMELINE_FANOUT_BATCH_SIZE", 2):
+            result = fan_out_posts.apply(args=(author.id, [10, 11])).get()
+
+        timeline_mock.set_celebrity.assert_called_once_with(author.id, False)
+        assert timeline_mock.push_posts.call_args_list == [
+            call([10, 11], [author.id]),
+            call([10, 11], [followers[0].id, followers[1].id]),
+            call([10, 11], [followers[2].id]),
+        ]
+        assert result == f"User_{author.id}: Fanned out 2 posts to 3 followers."
+
+    def test_celebrity_posts_are_not_fanned_out(self, timeline_mock, db_users):
+        author, *followers = db_users
+        for follower in followers:
+            Follow.objects.create(follower=follower, followee=author)
+
+        with patch.object(settings, "TIMELINE_FANOUT_MAX_FOLLOWERS", 2):
+            result = fan_out_posts.apply(args=(author.id, [10])).get()
+
+        timeline_mock.set_celebrity.assert_called_once_with(author.id, True)
+        timeline_mock.push_posts.assert_called_once_with([10], [author.id])
+        assert result == (
+            f"User_{author.id}: Celebrity posts are merged into timelines on read."
+        )
+
+    @patch("st_post.tasks.logger")
+    def test_redis_error_is_retried(self, logger_mock, timeline_mock, db_users):
+        author = db_users[0]
+        timeline_mock.push_posts.side_effect = redis.ConnectionError("redis down")
+
+        with pytest.raises(redis.ConnectionError):
+            _ = fan_out_posts.apply(args=(author.id, [10])).get()
+
+        assert timeline_mock.push_posts.call_count == settings.CELERY_MAX_RETRIES + 1
+        assert logger_mock.warning.call_count == settings.CELERY_MAX_RETRIES + 1
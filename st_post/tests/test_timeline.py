@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import pytest
+import redis
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from ..models import Follow, Post
+from ..timeline import get_home_timeline, push_posts
+
+
+@patch("st_post.timeline.get_redis")
+def test_push_posts(get_redis_mock):
+    pipeline_mock = get_redis_mock.return_value.pipeline.return_value
+
+    push_posts([10, 11], [1, 2])
+
+    assert pipeline_mock.zadd.call_count == 2
+    pipeline_mock.zadd.assert_called_with("st_post:timeline:2", {10: 10, 11: 11})
+    pipeline_mock.zremrangebyrank.assert_called_with(
+        "st_post:timeline:2", 0, -settings.TIMELINE_MAX_LENGTH - 1
+    )
+    pipeline_mock.execute.assert_called_once_with()
+
+
+@pytest.fixture
+def db_users():
+    return [
+        User.objects.create_user(
+            username=f"user{i}@domain.com", password="password", id=i
+        )
+        for i in range(1, 4)
+    ]
+
+
+@pytest.mark.django_db
+@patch("st_post.timeline.get_celebrity_ids")
+@patch("st_post.timeline.read_post_ids")
+class TestGetHomeTimeline:
+    def test_page_is_read_from_redis(
+        self, read_post_ids_mock, get_celebrity_ids_mock, db_users
+    ):
+        reader, followee, _ = db_users
+        Follow.objects.create(follower=reader, followee=followee)
+        posts = [Post.objects.create(user=followee, text=f"hi {i}") for i in range(3)]
+        read_post_ids_mock.return_value = [posts[2].id, posts[1].id]
+        get_celebrity_ids_mock.return_value = set()
+
+        page, next_max_id = get_home_timeline(Post.objects.all(), reader.id, None, 2)
+
+        read_post_ids_mock.assert_called_once_with(reader.id, None, 2)
+        assert page == [posts[2], posts[1]]
+        assert next_max_id == posts[1].id
+
+    def test_celebrity_posts_are_merged(
+        self, read_post_ids_mock, get_celebrity_ids_mock, db_users
+    ):
+        reader, followee, celebrity = db_users
+        Follow.objects.create(follower=reader, followee=followee)
+        Follow.objects.create(follower=reader, followee=celebrity)
+        post_1 = Post.objects.create(user=followee, text="hi")
+        post_2 = Post.objects.create(user=celebrity, text="hi")
+        post_3 = Post.objects.create(user=followee, text="hi")
+        read_post_ids_mock.return_value = [post_3.id, post_1.id]
+        get_celebrity_ids_mock.return_value = {celebrity.id}
+
+        page, next_max_id = get_home_timeline(Post.objects.all(), reader.id, None, 2)
+
+        assert page == [post_3, post_2]
+        assert next_max_id == post_2.id
+
+    def test_short_page_is_filled_from_postgres(
+        self, read_post_ids_mock, get_celebrity_ids_mock, db_users
+    ):
+        reader, followee, stranger = db_users
+        Follow.objects.create(follower=reader, followee=followee)
+        post_1 = Post.objects.create(user=followee, text="hi")
+        Post.objects.create(user=stranger, text="hi")
+        post_3 = Post.objects.create(user=reader, text="hi")
+        read_post_ids_mock.return_value = [post_3.id]
+
+        page, next_max_id = get_home_timeline(Post.objects.all(), reader.id, None, 3)
+
+        get_celebrity_ids_mock.assert_not_called()
+        assert page == [post_3, post_1]
+        assert next_max_id is None
+
+    @patch("st_post.timeline.logger")
+    def test_postgres_fallback_when_redis_is_down(
+        self, logger_mock, read_post_ids_mock, get_celebrity_ids_mock, db_users
+    ):
+        reader, followee, _ = db_users
+        Follow.objects.create(follower=reader, followee=followee)
+        posts = [Post.objects.create(user=followee, text=f"hi {i}") for i in range(3)]
+        read_post_ids_mock.side_effect = redis.ConnectionError("redis down")
+
+        page, next_max_id = get_home_timeline(
+            Post.objects.all(), reader.id, posts[2].id, 2
+        )
+
+        logger_mock.warning.assert_called_once()
+        assert page == [posts[1], posts[0]]
+        assert next_max_id == posts[0].id
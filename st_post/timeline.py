@@ -0,0 +1,99 @@
+from logging import getLogger
+from typing import Iterable
+
+import redis
+from django.conf import settings
+from django.db.models import QuerySet
+
+from social_text.redis_client import get_redis
+
+from .models import Follow, Post
+
+logger = getLogger(__name__)
+
+TIMELINE_KEY = "st_post:timeline:{user_id}"
+CELEBRITIES_KEY = "st_post:timeline:celebrities"
+
+
+def push_posts(post_ids: Iterable[int], user_ids: Iterable[int]) -> None:
+    """
+    Adds the posts to the home timelines of the users. Timelines are sorted sets scored by
+    post id, so they are ordered by creation, and are trimmed to `TIMELINE_MAX_LENGTH`.
+    """
+    posts = {post_id: post_id for post_id in post_ids}
+
+    pipeline = get_redis().pipeline(transaction=False)
+    for user_id in user_ids:
+        key = TIMELINE_KEY.format(user_id=user_id)
+        pipeline.zadd(key, posts)
+        pipeline.zremrangebyrank(key, 0, -settings.TIMELINE_MAX_LENGTH - 1)
+    pipeline.execute()
+
+
+def read_post_ids(user_id: int, max_id: int | None, count: int) -> list[int]:
+    """Returns up to `count` post ids older than `max_id` from the user's home timeline."""
+    post_ids = get_redis().zrevrangebyscore(
+        TIMELINE_KEY.format(user_id=user_id),
+        f"({max_id}" if max_id else "+inf",
+        "-inf",
+        start=0,
+        num=count,
+    )
+    return [int(post_id) for post_id in post_ids]
+
+
+def get_celebrity_ids() -> set[int]:
+    return {int(user_id) for user_id in get_redis().smembers(CELEBRITIES_KEY)}
+
+
+def set_celebrity(user_id: int, is_celebrity: bool) -> None:
+    """
+    Celebrities have too many followers to fan out their posts on write. Their posts are
+    merged into the home timelines of their followers at read time instead.
+    """
+    if is_celebrity:
+        get_redis().sadd(CELEBRITIES_KEY, user_id)
+    else:
+        get_redis().srem(CELEBRITIES_KEY, user_id)
+
+
+def get_home_timeline(
+    queryset: QuerySet, user_id: int, max_id: int | None, count: int
+) -> tuple[list[Post], int | None]:
+    """
+    Returns a page of the user's home timeline and the `max_id` of the next page. Post ids
+    are read from the Redis timeline filled by `fan_out_posts`, posts of celebrity
+    followees are merged from Postgres. Postgres also fills pages the Redis timeline cannot
+    (cold, trimmed or unavailable timelines). Posts are loaded from `queryset`.
+    """
+    followee_ids = set(
+        Follow.objects.filter(follower_id=user_id).values_list("followee_id", flat=True)
+    )
+    followee_ids.add(user_id)
+
+    try:
+        post_ids = read_post_ids(user_id, max_id, count)
+        pulled_user_ids = (
+            followee_ids
+            if len(post_ids) < count
+            else get_celebrity_ids() & followee_ids
+        )
+    except redis.RedisError as exc:
+        logger.warning(f"Cannot read home timeline of user {user_id} from Redis: {exc}")
+        post_ids = []
+        pulled_user_ids = followee_ids
+
+    if pulled_user_ids:
+        pulled_posts = Post.objects.filter(user_id__in=pulled_user_ids)
+        if max_id:
+            pulled_posts = pulled_posts.filter(id__lt=max_id)
+        post_ids += pulled_posts.order_by("-id").values_list("id", flat=True)[:count]
+
+    page_ids = sorted(set(post_ids), reverse=True)[:count]
+    # Filtering by followees drops posts of users who were unfollowed after the fan-out.
+    posts_by_id = queryset.filter(user_id__in=followee_ids).in_bulk(page_ids)
+
+    return (
+        [posts_by_id[post_id] for post_id in page_ids if post_id in posts_by_id],
+        page_ids[-1] if len(page_ids) == count else None,
+    )
@@ -1,10 +1,11 @@
 from rest_framework import routers
 
-from .api import PostLikeViewSet, PostViewSet
+from .api import FollowViewSet, PostLikeViewSet, PostViewSet
 
 router = routers.DefaultRouter()
 
 router.register("post", PostViewSet, basename="st_post")
 router.register("like", PostLikeViewSet, basename="st_post_like")
+router.register("follow", FollowViewSet, basename="st_post_follow")
 
 urlpatterns = router.urls